@@ -1,19 +1,104 @@
+import asyncio
+import importlib
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.config import get_settings
 from app.routers.health import router as health_router
-from app.routers import recommendations
-from app.routers import meal_plan as meal_plan_router
-from app.routers import advice as advice_router
 from app.utils.logger import logger
-from app.utils.ml_config import get_ml_config
+from app.utils.ml_config import get_ml_config_store
+from app.utils.readiness import Readiness
+from app.utils.cpu_executor import shutdown_cpu_executor
+from app.utils.metrics import MetricsMiddleware
 
 settings = get_settings()
 
+# Feature group -> router module. Routers are imported only for enabled features so a
+# recommendations-only worker never loads the RAG stack (numpy, chromadb, models).
+FEATURE_ROUTERS = {
+    "recommendations": "app.routers.recommendations",
+    "meal_plan": "app.routers.meal_plan",
+    "advice": "app.routers.advice",
+}
+
+
+def get_enabled_features() -> list:
+    features = [f.strip() for f in settings.enabled_features.split(",") if f.strip()]
+    unknown = [f for f in features if f not in FEATURE_ROUTERS]
+    if unknown:
+        raise ValueError(f"Unknown features in ENABLED_FEATURES: {unknown}")
+    return features
+
+
+enabled_features = get_enabled_features()
+
+
+async def _warm_up_rag(app: FastAPI) -> None:
+    try:
+        from app.services.rag_service import create_rag_service
+
+        app.state.rag_service = await asyncio.to_thread(create_rag_service, True)
+        app.state.readiness.mark_ready("rag")
+    except Exception as e:
+        logger.error(f"RAG warm-up failed: {str(e)}")
+        app.state.readiness.mark_failed("rag", str(e))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    logger.info(f"Starting {settings.app_name} v{settings.app_version}")
+    logger.info(f"Server running on {settings.host}:{settings.port}")
+    ml_config_store = get_ml_config_store()
+    ml_config = ml_config_store.current()
+    logger.info(f"ML config {ml_config.version} loaded from {ml_config.source}")
+    if settings.ml_config_watch_seconds > 0:
+        ml_config_store.start_watcher(settings.ml_config_watch_seconds)
+
+    app.state.readiness = Readiness()
+    warmup_task = None
+    logger.info(f"Enabled features: {', '.join(enabled_features)}")
+    if settings.warmup_on_startup and "advice" in enabled_features:
+        # Warm up in the background so liveness probes answer while the model loads
+        app.state.readiness.register("rag")
+        warmup_task = asyncio.create_task(_warm_up_rag(app))
+
+    catalog_refresher = None
+    if settings.shared_catalog_enabled and settings.shared_catalog_publisher == "app":
+        from app.services.catalog_service import create_catalog_refresher
+
+        catalog_refresher = create_catalog_refresher()
+        await asyncio.to_thread(catalog_refresher.start)
+
+    price_refresher = None
+    if settings.price_index_enabled and {"recommendations", "meal_plan"} & set(enabled_features):
+        from app.services.price_service import create_price_index_refresher
+
+        price_refresher = create_price_index_refresher()
+        await asyncio.to_thread(price_refresher.start)
+
+    yield
+
+    logger.info("Shutting down AI service")
+    ml_config_store.stop_watcher()
+    if catalog_refresher is not None:
+        catalog_refresher.stop()
+    if price_refresher is not None:
+        price_refresher.stop()
+    if request_capture is not None:
+        await asyncio.to_thread(request_capture.flush)
+    if warmup_task is not None and not warmup_task.done():
+        warmup_task.cancel()
+    rag_service = getattr(app.state, "rag_service", None)
+    if rag_service is not None:
+        await rag_service.close()
+    shutdown_cpu_executor()
+
+
 app = FastAPI(
     title=settings.app_name,
     version=settings.app_version,
     debug=settings.debug,
+    lifespan=lifespan,
 )
 
 app.add_middleware(
@@ -24,27 +109,29 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-app.include_router(health_router)
-app.include_router(recommendations.router)
-app.include_router(meal_plan_router.router)
-app.include_router(advice_router.router)
+request_capture = None
+if settings.capture_enabled:
+    from app.utils.capture import CaptureMiddleware, create_request_capture
 
+    request_capture = create_request_capture()
+    app.add_middleware(CaptureMiddleware, capture=request_capture)
+    logger.info(f"Capturing {request_capture.sample_rate:.2%} of requests to {settings.capture_dir}")
 
-@app.on_event("startup")
-async def startup_event():
-    logger.info(f"Starting {settings.app_name} v{settings.app_version}")
-    logger.info(f"Server running on {settings.host}:{settings.port}")
-    try:
-        ml_cfg = get_ml_config()
-        if not ml_cfg:
-            logger.warning("ML config not found or failed to load (app/ml_config.json)")
-        else:
-            keys = list(ml_cfg.keys())
-            logger.info(f"ML config loaded with keys: {keys}")
-    except Exception as e:
-        logger.warning(f"Error loading ML config: {e}")
+if settings.metrics_enabled:
+    from app.routers.metrics import router as metrics_router
 
+    app.add_middleware(MetricsMiddleware)
+    app.include_router(metrics_router)
+
+app.include_router(health_router)
+if settings.admin_token:
+    from app.routers.admin import router as admin_router
+
+    app.include_router(admin_router)
+if settings.profiler_enabled:
+    from app.routers.debug import router as debug_router
+
+    app.include_router(debug_router)
+for feature in enabled_features:
+    app.include_router(importlib.import_module(FEATURE_ROUTERS[feature]).router)
 
-@app.on_event("shutdown")
-async def shutdown_event():
-    logger.info("Shutting down AI service")
@@ -1,67 +1,42 @@
 """
 Advanced meal plan generation algorithms
 """
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Sequence
 from datetime import date, time
-from app.utils.ml_config import get_ml_config
+import numpy as np
+from app.utils.ml_config import MEAL_TYPES, CompiledMLConfig, current_ml_config
 
 
 class MealPlanner:
-    """Advanced meal planning based on goals, preferences, and Serbian cuisine"""
-    _ML_CONFIG = get_ml_config() or {}
+    """Advanced meal planning based on goals, preferences, and Serbian cuisine
 
-    # Meal distribution (fractions) per goal
-    MEAL_DISTRIBUTION = _ML_CONFIG.get(
-        "MEAL_DISTRIBUTION",
-        {
-            "mass": {"breakfast": 0.25, "lunch": 0.35, "dinner": 0.25, "snacks": 0.15},
-            "cut": {"breakfast": 0.30, "lunch": 0.35, "dinner": 0.25, "snacks": 0.10},
-            "maintain": {"breakfast": 0.25, "lunch": 0.35, "dinner": 0.25, "snacks": 0.15},
-            "endurance": {"breakfast": 0.20, "lunch": 0.30, "dinner": 0.25, "snacks": 0.25},
-        },
-    )
-
-    # Serbian meal times stored as HH:MM strings in config
-    _SERB_TIMES = _ML_CONFIG.get(
-        "SERBIAN_MEAL_TIMES",
-        {"breakfast": "08:00", "snack1": "11:00", "lunch": "13:30", "snack2": "17:00", "dinner": "19:30"},
-    )
-
-    SERBIAN_MEAL_TIMES = {}
-    for k, v in _SERB_TIMES.items():
-        try:
-            # parse HH:MM
-            hh, mm = v.split(":")
-            SERBIAN_MEAL_TIMES[k] = time(int(hh), int(mm))
-        except Exception:
-            # fallback to defaults
-            SERBIAN_MEAL_TIMES[k] = time(8, 0) if k == "breakfast" else time(13, 30)
+    Meal distributions and meal times come from the current `CompiledMLConfig`.
+    """
 
     @staticmethod
     def calculate_meal_distribution(
         total_calories: float,
         goal: str,
         activity_level: str,
+        config: Optional[CompiledMLConfig] = None,
     ) -> Dict[str, float]:
         """
         Calculate calorie distribution across meals based on goal and activity
         """
-        base_distribution = MealPlanner.MEAL_DISTRIBUTION.get(
-            goal, MealPlanner.MEAL_DISTRIBUTION["maintain"]
-        )
+        config = config or current_ml_config()
+        # Copy of the goal's row; the compiled matrix itself is read-only
+        ratios = config.meal_distribution_matrix[config.goal_index(goal)].copy()
         
         # Adjust for activity level
         if activity_level in ["high", "very_high"]:
-            # Shift more calories to post-workout (lunch/dinner)
-            base_distribution["lunch"] *= 1.1
-            base_distribution["snacks"] *= 0.9
+            # Shift more calories to post-workout (lunch/dinner), keeping the daily total
+            planned = ratios.sum()
+            ratios[MEAL_TYPES.index("lunch")] *= 1.1
+            ratios[MEAL_TYPES.index("snacks")] *= 0.9
+            ratios *= planned / ratios.sum()
         
         # Calculate calories per meal
-        distribution = {}
-        for meal_type, ratio in base_distribution.items():
-            distribution[meal_type] = total_calories * ratio
-        
-        return distribution
+        return {meal_type: total_calories * float(ratio) for meal_type, ratio in zip(MEAL_TYPES, ratios)}
 
     @staticmethod
     def calculate_macro_distribution(
@@ -111,9 +86,11 @@ class MealPlanner:
         }
 
     @staticmethod
-    def get_optimal_meal_times(goal: str, activity_level: str) -> Dict[str, str]:
+    def get_optimal_meal_times(
+        goal: str, activity_level: str, config: Optional[CompiledMLConfig] = None
+    ) -> Dict[str, str]:
         """Get optimal meal times based on Serbian schedule and goals"""
-        times = MealPlanner.SERBIAN_MEAL_TIMES.copy()
+        times = dict((config or current_ml_config()).meal_times)
         
         # Adjust for goal
         if goal == "mass":
@@ -314,21 +291,10 @@ class MealPlanner:
         Returns:
             List of selected meals sorted by suitability
         """
-        # Step 1: Filter by preferences and allergies
-        filtered_meals = MealPlanner.filter_meals_by_preferences(
-            available_meals,
-            preferences,
-            exclude_ingredients,
+        filtered_meals = MealPlanner.prepare_candidates(
+            available_meals, preferences, exclude_ingredients, already_selected
         )
         
-        # Step 2: Ensure diversity (avoid repeats)
-        if already_selected:
-            filtered_meals = MealPlanner.ensure_meal_diversity(
-                already_selected,
-                filtered_meals,
-                max_repeats=1,
-            )
-        
         # Step 3: Score meals based on targets and goal
         scored_meals = []
         for meal in filtered_meals:
@@ -378,3 +344,98 @@ class MealPlanner:
         # Return meals (without scores)
         return [item["meal"] for item in scored_meals]
 
+
+    @staticmethod
+    def prepare_candidates(
+        available_meals: List[Dict],
+        preferences: Optional[Dict] = None,
+        exclude_ingredients: Optional[List[str]] = None,
+        already_selected: Optional[List[Dict]] = None,
+    ) -> List[Dict]:
+        """Candidate meals in the order `select_optimal_meals` scores them"""
+        # Step 1: Filter by preferences and allergies
+        filtered_meals = MealPlanner.filter_meals_by_preferences(
+            available_meals,
+            preferences,
+            exclude_ingredients,
+        )
+        
+        # Step 2: Ensure diversity (avoid repeats)
+        if already_selected:
+            filtered_meals = MealPlanner.ensure_meal_diversity(
+                already_selected,
+                filtered_meals,
+                max_repeats=1,
+            )
+        return filtered_meals
+
+    @staticmethod
+    def meal_features(meals: Sequence[Dict]) -> np.ndarray:
+        """Encode meals as (n, 3) float64: calories, protein, Serbian/Balkan cuisine flag"""
+        features = np.zeros((len(meals), 3), dtype=np.float64)
+        for row, meal in enumerate(meals):
+            macros = meal.get("total_macros", {}) or {}
+            cuisine_type = meal.get("cuisine_type", "").lower()
+            features[row] = (
+                macros.get("calories", 0),
+                macros.get("protein", 0),
+                1.0 if "serbian" in cuisine_type or "balkan" in cuisine_type else 0.0,
+            )
+        return features
+
+    @staticmethod
+    def score_meals_batch(
+        features: np.ndarray,
+        target_calories: np.ndarray,
+        target_protein: np.ndarray,
+        goal: str,
+    ) -> np.ndarray:
+        """
+        Vectorized suitability scores of `select_optimal_meals` for several targets.
+
+        Returns a (targets, meals) matrix; each row holds exactly the scores the
+        scalar loop computes for that calorie/protein target. Leading dimensions
+        broadcast: (b, meals, 3) features with (b, targets) targets score b
+        independent candidate sets at once and return (b, targets, meals).
+        """
+        calories = features[..., None, :, 0]
+        protein = features[..., None, :, 1]
+        balkan = features[..., None, :, 2]
+        target_calories = np.asarray(target_calories, dtype=np.float64)[..., :, None]
+        target_protein = np.asarray(target_protein, dtype=np.float64)[..., :, None]
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            calorie_diff = np.abs(calories - target_calories) / target_calories
+            protein_ratio = protein / target_protein
+
+        score = np.zeros(np.broadcast_shapes(calories.shape, target_calories.shape), dtype=np.float64)
+        score = score + np.where(calories > 0, np.maximum(0, 10 * (1 - calorie_diff)), 0.0)
+        protein_score = np.select(
+            [
+                (0.8 <= protein_ratio) & (protein_ratio <= 1.2),
+                (0.6 <= protein_ratio) & (protein_ratio <= 1.4),
+            ],
+            [10.0, 5.0],
+            default=0.0,
+        )
+        score = score + np.where((protein > 0) & (target_protein > 0), protein_score, 0.0)
+
+        if goal == "cut":
+            score = score + np.where(calories < target_calories * 0.9, 5.0, 0.0)
+        elif goal == "mass":
+            score = score + np.where(calories > target_calories * 1.1, 5.0, 0.0)
+
+        return score + balkan * 3
+
+    @staticmethod
+    def best_meal_indices(
+        features: np.ndarray,
+        target_calories: np.ndarray,
+        target_protein: np.ndarray,
+        goal: str,
+    ) -> np.ndarray:
+        """Index of the top-ranked meal per target (first one on ties, like the stable sort)"""
+        if features.shape[0] == 0:
+            return np.full(len(target_calories), -1, dtype=np.intp)
+        scores = MealPlanner.score_meals_batch(features, target_calories, target_protein, goal)
+        return np.argmax(scores, axis=1)
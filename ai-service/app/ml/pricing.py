@@ -0,0 +1,172 @@
+"""
+Product price index for price-value scoring
+
+`PriceIndex` keeps every store offer of every product (from `product_prices`,
+joined with `product_packages` and `stores`) and the cheapest in-stock price
+per serving per product. Updates are incremental: `apply()` takes only the
+rows changed since the last refresh and recomputes the best price of the
+products they touch. Readers never take the lock — the best-price mapping is
+replaced with a new dict on every update, never mutated in place.
+
+Servings come from the price row's package (`servings`, else `weight_grams`
+divided by the product's serving size in grams). Offers whose servings can't
+be determined, out-of-stock offers and offers of inactive stores or
+unavailable products don't count. Store details (delivery fee, minimum
+order) are taken from the same rows.
+"""
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Optional, Sequence
+import re
+import threading
+import time
+import numpy as np
+
+_SERVING_GRAMS = re.compile(r"(\d+(?:[.,]\d+)?)\s*g\b", re.IGNORECASE)
+
+
+def parse_serving_grams(serving_size: Optional[str]) -> Optional[float]:
+    """"30g" / "1 scoop (30 g)" -> 30.0; None when no gram amount is given."""
+    match = _SERVING_GRAMS.search(str(serving_size or ""))
+    if not match:
+        return None
+    grams = float(match.group(1).replace(",", "."))
+    return grams if grams > 0 else None
+
+
+@dataclass(frozen=True)
+class StoreOffer:
+    store_id: str
+    price: float  # package price after discount (RSD)
+    servings: float
+
+    @property
+    def price_per_serving(self) -> float:
+        return self.price / self.servings
+
+
+@dataclass(frozen=True)
+class StoreInfo:
+    store_id: str
+    name: str = ""
+    delivery_fee: float = 0.0
+    min_order_amount: float = 0.0
+
+
+def offer_from_row(row: Dict[str, Any]) -> Optional[StoreOffer]:
+    """The offer a price row describes, or None when it doesn't count."""
+    if not row.get("in_stock", True) or not row.get("store_active", True) or not row.get("product_available", True):
+        return None
+    price = float(row["price"])
+    discount = row.get("discount_price")
+    if discount is not None and 0 < float(discount) < price:
+        price = float(discount)
+
+    servings = row.get("servings")
+    if not servings and row.get("weight_grams"):
+        serving_grams = parse_serving_grams(row.get("serving_size"))
+        if serving_grams:
+            servings = float(row["weight_grams"]) / serving_grams
+    if not servings or price <= 0:
+        return None
+    return StoreOffer(store_id=str(row["store_id"]), price=price, servings=float(servings))
+
+
+class PriceIndex:
+    def __init__(self):
+        self._offers: Dict[str, Dict[str, StoreOffer]] = {}
+        self._best: Dict[str, float] = {}
+        self._stores: Dict[str, StoreInfo] = {}
+        self._lock = threading.Lock()
+        # Latest `changed_at` applied; the next incremental refresh starts there
+        self.watermark: Any = None
+        self.updated_at: Optional[float] = None
+
+    def apply(self, rows: Iterable[Dict[str, Any]], replace: bool = False) -> int:
+        """
+        Apply price rows (`product_id`, `store_id`, `price`, `discount_price`,
+        `in_stock`, `store_active`, `servings`, `weight_grams`, `serving_size`,
+        `store_name`, `delivery_fee`, `min_order_amount`, `changed_at`). With
+        `replace`, the rows are the complete price table.
+
+        Returns the number of products whose best price changed.
+        """
+        with self._lock:
+            offers = {} if replace else self._offers
+            stores = {} if replace else dict(self._stores)
+            touched = set(self._best) if replace else set()
+            watermark = None if replace else self.watermark
+            for row in rows:
+                product_id = str(row["product_id"])
+                store_id = str(row["store_id"])
+                offer = offer_from_row(row)
+                product_offers = offers.setdefault(product_id, {})
+                if offer is None:
+                    product_offers.pop(store_id, None)
+                else:
+                    product_offers[store_id] = offer
+                    stores[store_id] = StoreInfo(
+                        store_id=store_id,
+                        name=row.get("store_name") or "",
+                        delivery_fee=float(row.get("delivery_fee") or 0),
+                        min_order_amount=float(row.get("min_order_amount") or 0),
+                    )
+                touched.add(product_id)
+                changed_at = row.get("changed_at")
+                if changed_at is not None and (watermark is None or changed_at > watermark):
+                    watermark = changed_at
+
+            best = dict(self._best)
+            changed = 0
+            for product_id in touched:
+                product_offers = offers.get(product_id)
+                if not product_offers:
+                    offers.pop(product_id, None)
+                    changed += best.pop(product_id, None) is not None
+                    continue
+                cheapest = min(offer.price_per_serving for offer in product_offers.values())
+                if best.get(product_id) != cheapest:
+                    best[product_id] = cheapest
+                    changed += 1
+
+            self._offers = offers
+            self._best = best
+            self._stores = stores
+            self.watermark = watermark
+            self.updated_at = time.time()
+        return changed
+
+    def price_per_serving(self, product_id: str) -> Optional[float]:
+        return self._best.get(str(product_id))
+
+    def lookup(self, product_ids: Sequence[str]) -> np.ndarray:
+        """Cheapest price per serving for each product id (NaN where unknown)."""
+        best = self._best
+        nan = float("nan")
+        return np.fromiter((best.get(str(pid), nan) for pid in product_ids), dtype=np.float64, count=len(product_ids))
+
+    def offers(self, product_id: str) -> Dict[str, StoreOffer]:
+        """In-stock offers of one product by store id."""
+        with self._lock:
+            return dict(self._offers.get(str(product_id), {}))
+
+    def offers_for(self, product_ids: Sequence[str]) -> Dict[str, Dict[str, StoreOffer]]:
+        """In-stock offers of several products (one consistent view), products without offers omitted."""
+        with self._lock:
+            return {
+                str(pid): dict(self._offers[str(pid)]) for pid in product_ids if self._offers.get(str(pid))
+            }
+
+    def stores(self) -> Dict[str, StoreInfo]:
+        """Stores with at least one counted offer seen so far."""
+        return self._stores
+
+    def __len__(self) -> int:
+        return len(self._best)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "products": len(self._best),
+            "offers": sum(len(offers) for offers in self._offers.values()),
+            "watermark": str(self.watermark) if self.watermark is not None else None,
+            "updated_at": self.updated_at,
+        }
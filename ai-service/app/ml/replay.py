@@ -0,0 +1,387 @@
+"""
+Offline replay of captured requests with two ML configurations
+
+Capture format (one JSON object per line, optionally gzip-compressed; or the
+same fields as Parquet columns):
+
+    {"v": 1, "kind": "recommendations", "ts": 1760000000.0,
+     "profile": {"goal", "activity_level", "age", "gender", "weight", "height"},
+     "needs": {"calories", "protein", "carbs", "fats"} | null,
+     "candidates": [{"id", "type", "macros", "brand", "price_per_serving"}, ...],
+     "base_scores": [...], "penalties": [...], "served_scores": [...]}
+
+    {"v": 1, "kind": "meal_plan", "ts": ...,
+     "goal", "activity_level", "target_calories", "target_protein",
+     "slots": ["breakfast", "lunch", ...],
+     "candidates": [{"id", "total_macros", "cuisine_type"}, ...]}
+
+`penalties` and `served_scores` are optional. Records written by the capture
+middleware (app/utils/capture.py) carry more fields (request, response, status,
+hashed user id); it also writes "advice" records, which are not replayed.
+`replay_batch()` re-scores a batch of records with configurations A and B
+through the vectorized paths (`ProductScorer.calculate_scores_grouped`,
+`MealPlanner.score_meals_batch`): all recommendation requests of a batch are
+scored in one pass per config, with each distinct product encoded once, and the
+metrics are computed for all rankings of equal length at once. For every
+ranking (a recommendation request, or one meal slot) it records Spearman and
+Kendall (tau-b) rank correlation, top-K churn and whether the top item changed.
+With `baseline="served"`, side A is the score served at capture time instead of
+a re-score, which shows the effect of code changes (macro bands and the like)
+rather than config changes.
+"""
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Union
+import gzip
+import time
+import numpy as np
+# Several times faster than json on large capture lines; parsing dominates a replay
+from orjson import loads as _loads
+from app.ml.meal_planner import MealPlanner
+from app.ml.scoring import BASE_SCORE_COLUMN, ProductScorer
+from app.utils.capture_format import CAPTURE_VERSION
+from app.utils.ml_config import CompiledMLConfig
+
+RECORD_KINDS = ("recommendations", "meal_plan")
+# Parquet files keep nested fields as JSON strings
+NESTED_FIELDS = ("profile", "needs", "candidates", "base_scores", "penalties", "served_scores", "slots")
+# Errors of malformed records; the record is counted as skipped
+REPLAY_ERRORS = (KeyError, TypeError, ValueError, AttributeError, ZeroDivisionError)
+
+
+# Cap on ranking rows × candidates² per vectorized metrics step (memory of the pair matrices)
+PAIR_BUDGET = 4_000_000
+
+
+def average_ranks(values: np.ndarray) -> np.ndarray:
+    """Row-wise ranks from 1 of an (m, n) matrix, ties get their average rank."""
+    less = (values[:, None, :] < values[:, :, None]).sum(axis=2)
+    equal = (values[:, None, :] == values[:, :, None]).sum(axis=2)
+    return less + (equal + 1) / 2.0
+
+
+def ranking_metrics(a: np.ndarray, b: np.ndarray, k: int) -> Dict[str, np.ndarray]:
+    """
+    Compare rankings row by row: (m, n) scores of side A and side B.
+
+    Returns per-row Spearman and Kendall tau-b (NaN when a side is constant),
+    top-K churn (share of A's top K missing from B's) and whether the top item
+    changed. Top K follows the service's order: score descending, ties in
+    candidate order.
+    """
+    n = a.shape[1]
+    ra = average_ranks(a) - (n + 1) / 2.0
+    rb = average_ranks(b) - (n + 1) / 2.0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rho = (ra * rb).sum(axis=1) / np.sqrt((ra * ra).sum(axis=1) * (rb * rb).sum(axis=1))
+
+        # Sign matrices are antisymmetric, so full sums are twice the i < j sums
+        da = np.sign(a[:, :, None] - a[:, None, :])
+        db = np.sign(b[:, :, None] - b[:, None, :])
+        concordance = (da * db).sum(axis=(1, 2))
+        tau = concordance / np.sqrt(np.count_nonzero(da, axis=(1, 2)) * np.count_nonzero(db, axis=(1, 2)))
+
+    top_a = np.argsort(-a, axis=1, kind="stable")[:, :k]
+    top_b = np.argsort(-b, axis=1, kind="stable")[:, :k]
+    overlap = (top_a[:, :, None] == top_b[:, None, :]).any(axis=2).sum(axis=1)
+    return {
+        "spearman": rho,
+        "kendall": tau,
+        "churn": 1.0 - overlap / top_a.shape[1],
+        "top1_changed": top_a[:, 0] != top_b[:, 0],
+    }
+
+
+@dataclass
+class ReplayStats:
+    """Per-ranking metrics of a batch; `merge()` combines batches."""
+
+    records: int = 0
+    skipped: int = 0
+    by_kind: Dict[str, int] = field(default_factory=dict)
+    spearman: List[float] = field(default_factory=list)
+    kendall: List[float] = field(default_factory=list)
+    churn: List[float] = field(default_factory=list)
+    top1_changed: List[bool] = field(default_factory=list)
+    encode_seconds: float = 0.0
+    score_seconds_a: float = 0.0
+    score_seconds_b: float = 0.0
+
+    def add_rankings(self, a: np.ndarray, b: np.ndarray, k: int) -> None:
+        """Metrics of equally long rankings, (m, n) scores per side; n < 2 is ignored."""
+        m, n = a.shape
+        if n < 2:
+            return
+        step = max(1, PAIR_BUDGET // (n * n))
+        for begin in range(0, m, step):
+            metrics = ranking_metrics(a[begin:begin + step], b[begin:begin + step], k)
+            self.spearman.extend(metrics["spearman"].tolist())
+            self.kendall.extend(metrics["kendall"].tolist())
+            self.churn.extend(metrics["churn"].tolist())
+            self.top1_changed.extend(metrics["top1_changed"].tolist())
+
+    def merge(self, other: "ReplayStats") -> None:
+        self.records += other.records
+        self.skipped += other.skipped
+        for kind, count in other.by_kind.items():
+            self.by_kind[kind] = self.by_kind.get(kind, 0) + count
+        self.spearman.extend(other.spearman)
+        self.kendall.extend(other.kendall)
+        self.churn.extend(other.churn)
+        self.top1_changed.extend(other.top1_changed)
+        self.encode_seconds += other.encode_seconds
+        self.score_seconds_a += other.score_seconds_a
+        self.score_seconds_b += other.score_seconds_b
+
+    def summary(self) -> Dict[str, Any]:
+        def distribution(values: List[float]) -> Dict[str, Optional[float]]:
+            array = np.array(values, dtype=np.float64)
+            array = array[~np.isnan(array)]
+            if not len(array):
+                return {"mean": None, "p10": None, "p50": None}
+            return {
+                "mean": round(float(array.mean()), 4),
+                "p10": round(float(np.percentile(array, 10)), 4),
+                "p50": round(float(np.percentile(array, 50)), 4),
+            }
+
+        return {
+            "records": self.records,
+            "skipped": self.skipped,
+            "by_kind": dict(self.by_kind),
+            "rankings": len(self.churn),
+            "spearman": distribution(self.spearman),
+            "kendall_tau_b": distribution(self.kendall),
+            "top_k_churn": distribution(self.churn),
+            "top1_changed_rate": round(float(np.mean(self.top1_changed)), 4) if self.top1_changed else None,
+            "encode_seconds": round(self.encode_seconds, 3),
+            "score_seconds": {"a": round(self.score_seconds_a, 3), "b": round(self.score_seconds_b, 3)},
+        }
+
+
+def parse_record(raw: Union[str, bytes, Dict]) -> Optional[Dict]:
+    """A capture record from a JSONL line or a Parquet row; None for blank or foreign lines."""
+    if isinstance(raw, (str, bytes)):
+        if not raw.strip():
+            return None
+        record = _loads(raw)
+        if not isinstance(record, dict):
+            raise ValueError("capture record must be a JSON object")
+    else:
+        record = dict(raw)
+    for key in NESTED_FIELDS:
+        if isinstance(record.get(key), str):
+            record[key] = _loads(record[key])
+    if record.get("kind") not in RECORD_KINDS:
+        return None
+    return record
+
+
+def iter_raw_records(paths: Sequence[str]) -> Iterator[Union[bytes, Dict]]:
+    """
+    Raw records of capture files: lines of `.jsonl` / `.jsonl.gz`, rows of `.parquet`.
+
+    Lines are parsed by the replay workers, not here.
+    """
+    for path in paths:
+        if path.endswith(".parquet"):
+            try:
+                import pyarrow.parquet as pq
+            except ImportError:
+                raise RuntimeError("Reading Parquet captures requires pyarrow (pip install pyarrow)")
+            for batch in pq.ParquetFile(path).iter_batches():
+                yield from batch.to_pylist()
+            continue
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, "rb") as f:
+            yield from f
+
+
+class _Rankings:
+    """Score pairs of a batch, grouped by length so metrics run on (m, n) matrices."""
+
+    def __init__(self) -> None:
+        self.by_length: Dict[int, List] = {}
+
+    def add(self, a: np.ndarray, b: np.ndarray) -> None:
+        self.by_length.setdefault(len(a), []).append((a, b))
+
+    def flush(self, stats: ReplayStats, k: int) -> None:
+        for pairs in self.by_length.values():
+            stats.add_rankings(np.array([a for a, _ in pairs]), np.array([b for _, b in pairs]), k)
+
+
+def _replay_recommendations(
+    records: List[Dict],
+    config_a: CompiledMLConfig,
+    config_b: CompiledMLConfig,
+    baseline: str,
+    rankings: _Rankings,
+    stats: ReplayStats,
+) -> None:
+    """
+    All recommendation records of a batch in one scoring pass per config.
+
+    Candidates are encoded once per distinct (id, price) in the batch and
+    gathered per record; `calculate_scores_grouped` scores every row for its
+    record's profile.
+    """
+    started = time.perf_counter()
+    unique: Dict[Any, int] = {}
+    products: List[Dict] = []
+    rows: List[int] = []
+    base_scores: List[float] = []
+    penalties: List[float] = []
+    offsets = [0]
+    for record in records:
+        candidates = record["candidates"]
+        for product in candidates:
+            product_id = product.get("id")
+            # Products without an id are never shared
+            key = (product_id, product.get("price_per_serving")) if product_id is not None else len(products)
+            row = unique.get(key)
+            if row is None:
+                row = unique[key] = len(products)
+                products.append(product)
+            rows.append(row)
+        base_scores.extend(record.get("base_scores") or [50.0] * len(candidates))
+        penalties.extend(record.get("penalties") or [0.0] * len(candidates))
+        offsets.append(len(rows))
+    if len(base_scores) != len(rows) or len(penalties) != len(rows):
+        raise ValueError("base_scores / penalties don't match the candidates")
+
+    encoded, type_names = ProductScorer.product_features(products, [0.0] * len(products))
+    features = encoded[np.array(rows, dtype=np.intp)]
+    features[:, BASE_SCORE_COLUMN] = base_scores
+    groups = np.repeat(np.arange(len(records)), np.diff(offsets))
+    profiles = [record.get("profile") or {} for record in records]
+    needs = [record.get("needs") for record in records]
+    penalty = np.array(penalties, dtype=np.float64)
+    penalized = penalty != 0
+    stats.encode_seconds += time.perf_counter() - started
+
+    def score(config: CompiledMLConfig) -> np.ndarray:
+        scores = ProductScorer.calculate_scores_grouped(features, type_names, groups, profiles, needs, config)
+        # The service subtracts contraindication penalties after scoring
+        if penalized.any():
+            scores = np.where(penalized, np.maximum(0.0, np.round(scores - penalty, 2)), scores)
+        return scores
+
+    started = time.perf_counter()
+    if baseline == "served":
+        a = np.array([value for record in records for value in record["served_scores"]], dtype=np.float64)
+        if len(a) != len(rows):
+            raise ValueError("served_scores don't match the candidates")
+    else:
+        a = score(config_a)
+    mid = time.perf_counter()
+    b = score(config_b)
+    stats.score_seconds_a += mid - started
+    stats.score_seconds_b += time.perf_counter() - mid
+    for begin, end in zip(offsets, offsets[1:]):
+        rankings.add(a[begin:end], b[begin:end])
+
+
+def _meal_plan_group(record: Dict) -> tuple:
+    """Meal plan records with the same group key are scored in one pass."""
+    slots = tuple(record.get("slots") or ("breakfast", "lunch", "dinner", "snacks"))
+    return record.get("goal", "maintain"), len(record["candidates"]), slots
+
+
+def _replay_meal_plans(
+    records: List[Dict], config_a: CompiledMLConfig, config_b: CompiledMLConfig, rankings: _Rankings, stats: ReplayStats
+) -> None:
+    """
+    Meal plan records of one `_meal_plan_group`: (records, meals, 3) features,
+    (records, slots) targets.
+    """
+    goal, _, slots = _meal_plan_group(records[0])
+    started = time.perf_counter()
+    features = np.array([MealPlanner.meal_features(record["candidates"]) for record in records])
+    stats.encode_seconds += time.perf_counter() - started
+
+    totals = [
+        (float(record["target_calories"]), float(record.get("target_protein") or 0),
+         record.get("activity_level", "moderate"))
+        for record in records
+    ]
+
+    def score(config: CompiledMLConfig) -> np.ndarray:
+        # Slot targets as MealPlanService derives them from the config's distribution
+        calories, protein = [], []
+        for total_calories, total_protein, activity_level in totals:
+            distribution = MealPlanner.calculate_meal_distribution(total_calories, goal, activity_level, config)
+            slot_calories = np.array([distribution.get(slot, total_calories * 0.25) for slot in slots])
+            calories.append(slot_calories)
+            protein.append(total_protein * (slot_calories / total_calories))
+        return MealPlanner.score_meals_batch(features, np.array(calories), np.array(protein), goal)
+
+    started = time.perf_counter()
+    a = score(config_a)
+    mid = time.perf_counter()
+    b = score(config_b)
+    stats.score_seconds_a += mid - started
+    stats.score_seconds_b += time.perf_counter() - mid
+    for record_a, record_b in zip(a, b):
+        for slot in range(len(slots)):
+            rankings.add(record_a[slot], record_b[slot])
+
+
+def replay_batch(
+    raw_records: Iterable[Union[str, bytes, Dict]],
+    config_a: CompiledMLConfig,
+    config_b: CompiledMLConfig,
+    baseline: str = "config",
+    k: int = 10,
+) -> ReplayStats:
+    """
+    Re-score a batch of raw capture records with both configs (module-level, so it
+    runs in a process pool). Malformed records are counted as skipped.
+    """
+    stats = ReplayStats()
+    rankings = _Rankings()
+    recommendations: List[Dict] = []
+    meal_plans: Dict[tuple, List[Dict]] = {}
+    for raw in raw_records:
+        try:
+            record = parse_record(raw)
+            if record is None:
+                continue
+            if not isinstance(record["candidates"], list):
+                raise ValueError("candidates must be a list")
+            if record["kind"] == "recommendations":
+                if baseline == "served" and not record.get("served_scores"):
+                    stats.skipped += 1
+                    continue
+                recommendations.append(record)
+            elif baseline == "served":
+                # Served meal scores aren't captured
+                stats.skipped += 1
+            elif float(record["target_calories"]) <= 0:
+                raise ValueError("target_calories must be positive")
+            else:
+                meal_plans.setdefault(_meal_plan_group(record), []).append(record)
+        except (KeyError, TypeError, ValueError):
+            stats.skipped += 1
+
+    groups = [("recommendations", recommendations)] if recommendations else []
+    groups.extend(("meal_plan", records) for records in meal_plans.values())
+    for kind, records in groups:
+        def run(batch: List[Dict]) -> None:
+            if kind == "recommendations":
+                _replay_recommendations(batch, config_a, config_b, baseline, rankings, stats)
+            else:
+                _replay_meal_plans(batch, config_a, config_b, rankings, stats)
+            stats.records += len(batch)
+            stats.by_kind[kind] = stats.by_kind.get(kind, 0) + len(batch)
+
+        try:
+            run(records)
+        except REPLAY_ERRORS:
+            # One malformed record spoils the shared pass: fall back to one record at a time
+            for record in records:
+                try:
+                    run([record])
+                except REPLAY_ERRORS:
+                    stats.skipped += 1
+    rankings.flush(stats, k)
+    return stats
@@ -2,36 +2,30 @@
 Advanced scoring algorithms for product recommendations
 Enhanced with personalized nutritional needs calculation
 """
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Sequence, Tuple
 import math
-from app.utils.ml_config import get_ml_config
+import numpy as np
+from app.utils.ml_config import PRODUCT_TYPES, UNKNOWN_TYPE_WEIGHT, CompiledMLConfig, current_ml_config
+
+# Type code = column of the compiled goal × type weight matrix
+PRODUCT_TYPE_CODES = {name: code for code, name in enumerate(PRODUCT_TYPES)}
+
+# Columns of the product feature matrix used by batch scoring
+FEATURE_COLUMNS = [
+    "type_code", "has_macros", "protein", "calories", "carbs", "fats", "brand_score", "base_score",
+    "price_per_serving",
+]
+BASE_SCORE_COLUMN = FEATURE_COLUMNS.index("base_score")
+# NaN when the product has no known in-stock price
+PRICE_COLUMN = FEATURE_COLUMNS.index("price_per_serving")
 
 
 class ProductScorer:
-    """Advanced product scoring based on user profile and goals"""
-    # Load configurable ML parameters (fallback to embedded defaults if missing)
-    _ML_CONFIG = get_ml_config() or {}
-
-    GOAL_WEIGHTS = _ML_CONFIG.get(
-        "GOAL_WEIGHTS",
-        {
-            "mass": {"protein": 0.4, "calories": 0.3, "creatine": 0.2, "pre_workout": 0.1},
-            "cut": {"protein": 0.35, "fat_burner": 0.3, "low_calories": 0.25, "vitamin": 0.1},
-            "maintain": {"protein": 0.3, "balanced": 0.3, "vitamin": 0.2, "general": 0.2},
-            "endurance": {"amino": 0.3, "carbs": 0.25, "hydration": 0.25, "protein": 0.2},
-        },
-    )
-
-    ACTIVITY_MULTIPLIERS = _ML_CONFIG.get(
-        "ACTIVITY_MULTIPLIERS",
-        {"low": 0.8, "moderate": 1.0, "high": 1.2, "very_high": 1.4},
-    )
-
-    # Protein requirements per kg by goal (g/kg)
-    PROTEIN_REQUIREMENTS = _ML_CONFIG.get(
-        "PROTEIN_REQUIREMENTS",
-        {"mass": 2.2, "cut": 2.5, "endurance": 1.8, "maintain": 2.0},
-    )
+    """Advanced product scoring based on user profile and goals
+
+    Goal weights, activity multipliers and protein requirements come from the
+    current `CompiledMLConfig`; pass `config` to keep one version for a whole request.
+    """
 
     @staticmethod
     def calculate_score(
@@ -39,6 +33,7 @@ class ProductScorer:
         user_profile: Dict,
         base_score: float = 50.0,
         nutritional_needs: Optional[Dict] = None,
+        config: Optional[CompiledMLConfig] = None,
     ) -> float:
         """
         Calculate comprehensive score for a product based on user profile
@@ -47,13 +42,14 @@ class ProductScorer:
         - Individual nutritional needs calculation
         - Macro deficit/surplus analysis
         - Brand quality consideration
-        - Price-value ratio
+        - Price-value ratio (cost per gram of protein, from `price_per_serving`)
         
         Args:
-            product: Product data with type, macros, etc.
+            product: Product data with type, macros, price_per_serving, etc.
             user_profile: User profile with goal, activity_level, age, etc.
             base_score: Base score from rule-based system
             nutritional_needs: Optional pre-calculated nutritional needs (calories, protein, carbs, fats)
+            config: ML config version to score with (default: the current one)
             
         Returns:
             Enhanced score (0-100)
@@ -71,16 +67,17 @@ class ProductScorer:
         product_type = product.get("type", "")
         macros = product.get("macros", {}) or {}
         
+        config = config or current_ml_config()
+        
         # Calculate or use provided nutritional needs
         if not nutritional_needs:
             nutritional_needs = ProductScorer._calculate_nutritional_needs(
-                user_profile, weight, height, age, gender
+                user_profile, weight, height, age, gender, config
             )
         
         # Apply goal-based scoring (15% of final score)
-        goal_weights = ProductScorer.GOAL_WEIGHTS.get(goal, ProductScorer.GOAL_WEIGHTS["maintain"])
-        activity_mult = ProductScorer.ACTIVITY_MULTIPLIERS.get(activity_level, 1.0)
-        type_score = ProductScorer._score_by_type(product_type, goal_weights)
+        activity_mult = config.activity_multipliers.get(activity_level, 1.0)
+        type_score = ProductScorer._score_by_type(product_type, goal, config)
         score += type_score * activity_mult * 0.15
         
         # Enhanced macro scoring based on individual needs (20% of final score)
@@ -101,31 +98,245 @@ class ProductScorer:
         brand_score = ProductScorer._score_by_brand(product)
         score += brand_score
         
+        # Price-value bonus (up to PRICE_VALUE.max_points)
+        score += ProductScorer._score_by_price_value(product, config)
+        
         # Normalize to 0-100 range
         score = max(0, min(100, score))
         
         return round(score, 2)
 
     @staticmethod
-    def _score_by_type(product_type: str, goal_weights: Dict) -> float:
+    def product_features(
+        products: Sequence[Dict], base_scores: Sequence[float]
+    ) -> Tuple[np.ndarray, List[str]]:
+        """
+        Encode products as a float64 matrix (FEATURE_COLUMNS) for batch scoring.
+
+        Returns the matrix and the type names its `type_code` column indexes into:
+        PRODUCT_TYPES (the goal × type matrix columns), then unknown types.
+        """
+        type_names = list(PRODUCT_TYPES)
+        type_index = dict(PRODUCT_TYPE_CODES)
+        features = np.zeros((len(products), len(FEATURE_COLUMNS)), dtype=np.float64)
+        for row, (product, base_score) in enumerate(zip(products, base_scores)):
+            product_type = product.get("type", "")
+            if product_type not in type_index:
+                type_index[product_type] = len(type_names)
+                type_names.append(product_type)
+            macros = product.get("macros", {}) or {}
+            features[row] = (
+                type_index[product_type],
+                1.0 if macros else 0.0,
+                macros.get("protein", 0),
+                macros.get("calories", 0),
+                macros.get("carbs", 0),
+                macros.get("fats", 0),
+                ProductScorer._score_by_brand(product),
+                base_score,
+                product.get("price_per_serving") or np.nan,
+            )
+        return features, type_names
+
+    @staticmethod
+    def calculate_scores_batch(
+        features: np.ndarray,
+        type_names: List[str],
+        user_profile: Dict,
+        nutritional_needs: Optional[Dict] = None,
+        config: Optional[CompiledMLConfig] = None,
+    ) -> np.ndarray:
+        """
+        Vectorized `calculate_score` over a product feature matrix.
+
+        Performs the same floating point operations in the same order as the scalar
+        path, so every score is identical to `calculate_score` for that product.
+        Type-dependent terms are evaluated once per distinct type and gathered.
+        """
+        return ProductScorer.calculate_scores_grouped(
+            features,
+            type_names,
+            np.zeros(features.shape[0], dtype=np.intp),
+            [user_profile],
+            [nutritional_needs],
+            config,
+        )
+
+    @staticmethod
+    def calculate_scores_grouped(
+        features: np.ndarray,
+        type_names: List[str],
+        groups: np.ndarray,
+        user_profiles: Sequence[Dict],
+        nutritional_needs: Sequence[Optional[Dict]],
+        config: Optional[CompiledMLConfig] = None,
+    ) -> np.ndarray:
+        """
+        `calculate_scores_batch` for many users in one pass: row i is scored for
+        `user_profiles[groups[i]]` (with `nutritional_needs[groups[i]]`).
+
+        User-dependent terms are tabulated per distinct goal, activity level and
+        age/gender and gathered per row, so each row goes through the same
+        operations as in `calculate_scores_batch` for its user alone.
+        """
+        config = config or current_ml_config()
+        goal_codes: Dict[str, int] = {}
+        activity_codes: Dict[str, int] = {}
+        age_codes: Dict[Tuple, int] = {}
+        user_goal, user_activity, user_age, user_mult, user_protein = [], [], [], [], []
+        for user_profile, needs in zip(user_profiles, nutritional_needs):
+            goal = user_profile.get("goal", "maintain")
+            activity_level = user_profile.get("activity_level", "moderate")
+            age = user_profile.get("age", 25)
+            gender = user_profile.get("gender", "male")
+            weight = user_profile.get("weight", 70)
+            height = user_profile.get("height", 175)
+            if not needs:
+                needs = ProductScorer._calculate_nutritional_needs(
+                    user_profile, weight, height, age, gender, config
+                )
+            user_goal.append(goal_codes.setdefault(goal, len(goal_codes)))
+            user_activity.append(activity_codes.setdefault(activity_level, len(activity_codes)))
+            user_age.append(age_codes.setdefault((age, gender), len(age_codes)))
+            user_mult.append(config.activity_multipliers.get(activity_level, 1.0))
+            user_protein.append(needs.get("protein", weight * 2.0))
+
+        n_types = len(type_names)
+        type_scores = np.array([ProductScorer.type_score_table(g, n_types, config) for g in goal_codes])
+        age_scores = np.array(
+            [[ProductScorer._score_by_age(t, age, gender) for t in type_names] for age, gender in age_codes],
+            dtype=np.float64,
+        )
+        activity_scores = np.array(
+            [[ProductScorer._score_by_activity(t, a) for t in type_names] for a in activity_codes],
+            dtype=np.float64,
+        )
+        goal_names = np.array(list(goal_codes), dtype=object)
+
+        groups = np.asarray(groups, dtype=np.intp)
+        row_goal = np.array(user_goal, dtype=np.intp)[groups]
+        row_activity = np.array(user_activity, dtype=np.intp)[groups]
+        row_age = np.array(user_age, dtype=np.intp)[groups]
+        row_mult = np.array(user_mult, dtype=np.float64)[groups]
+        row_protein = np.array(user_protein, dtype=np.float64)[groups]
+
+        codes = features[:, 0].astype(np.intp)
+        score = features[:, 7] * 0.6
+        score = score + type_scores[row_goal, codes] * row_mult * 0.15
+        macro_score = ProductScorer._score_by_macros_batch(features, goal_names[row_goal], row_protein)
+        score = score + macro_score * 0.2
+        score = score + age_scores[row_age, codes]
+        score = score + activity_scores[row_activity, codes]
+        score = score + features[:, 6]
+        score = score + ProductScorer._score_by_price_value_batch(features, config)
+        score = np.clip(score, 0, 100)
+
+        # Python's round() per element keeps results identical to the scalar path
+        return np.array([round(float(value), 2) for value in score], dtype=np.float64)
+
+    @staticmethod
+    def _score_by_macros_batch(
+        features: np.ndarray, goals: np.ndarray, daily_protein: np.ndarray
+    ) -> np.ndarray:
+        """Vectorized `_score_by_macros_enhanced`; goal and daily protein need per row."""
+        has_macros = features[:, 1] > 0
+        protein = features[:, 2]
+        calories = features[:, 3]
+        carbs = features[:, 4]
+        fats = features[:, 5]
+        mass, cut, endurance = goals == "mass", goals == "cut", goals == "endurance"
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            contribution = protein / daily_protein
+            balance = protein / (protein + carbs)
+
+        protein_score = np.select(
+            [
+                (0.10 <= contribution) & (contribution <= 0.25),
+                (0.25 < contribution) & (contribution <= 0.40),
+                (0.05 <= contribution) & (contribution < 0.10),
+            ],
+            [15.0, 12.0, 8.0],
+            default=np.maximum(0, 5 - np.abs(contribution - 0.20) * 10),
+        )
+        score = np.where(protein > 0, protein_score, 0.0)
+
+        # Rows of other goals add 0.0, which leaves their scores unchanged
+        if mass.any():
+            score = score + np.where(mass, np.select(
+                [(150 <= calories) & (calories <= 400), (400 < calories) & (calories <= 600)],
+                [10.0, 8.0],
+                default=np.maximum(0, 5 - np.abs(calories - 300) / 100),
+            ), 0.0)
+        if cut.any():
+            score = score + np.where(cut, np.select(
+                [calories <= 150, (150 < calories) & (calories <= 250)],
+                [12.0, 8.0],
+                default=np.maximum(0, 5 - (calories - 150) / 50),
+            ), 0.0)
+        if endurance.any():
+            score = score + np.where(endurance, np.select(
+                [(100 <= calories) & (calories <= 300) & (carbs >= 20), carbs >= 15],
+                [10.0, 7.0],
+                default=0.0,
+            ), 0.0)
+
+        balanced = (protein > 0) & (carbs > 0) & (0.3 <= balance) & (balance <= 0.7)
+        score = score + np.where(balanced, 5.0, 0.0)
+
+        if cut.any():
+            score = score - np.where(cut & (fats > 10), np.minimum(5, (fats - 10) / 5), 0.0)
+
+        return np.where(has_macros, np.minimum(score, 20), 0.0)
+
+    @staticmethod
+    def _score_by_price_value(product: Dict, config: CompiledMLConfig) -> float:
+        """Points for a low cost per gram of protein; 0 without a price or protein"""
+        price = product.get("price_per_serving")
+        protein = (product.get("macros", {}) or {}).get("protein", 0)
+        if price is None or not price > 0 or not protein > 0:
+            return 0.0
+        cost = price / protein
+        return config.price_value_points * min(1.0, max(0.0, 2 - cost / config.price_reference_cost))
+
+    @staticmethod
+    def _score_by_price_value_batch(features: np.ndarray, config: CompiledMLConfig) -> np.ndarray:
+        """Vectorized `_score_by_price_value` (NaN prices compare false and score 0)."""
+        price = features[:, PRICE_COLUMN]
+        protein = features[:, 2]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            cost = price / protein
+            value = config.price_value_points * np.clip(2 - cost / config.price_reference_cost, 0.0, 1.0)
+            priced = (price > 0) & (protein > 0)
+        return np.where(priced, value, 0.0)
+
+    @staticmethod
+    def type_score_table(goal: str, n_types: int, config: CompiledMLConfig) -> np.ndarray:
+        """
+        Type scores (0-20) indexed by type code: the goal's row of the compiled
+        goal × type weight matrix, extended for the unknown types of a batch.
+        """
+        weights = config.goal_type_weights[config.goal_index(goal)]
+        if n_types > len(weights):
+            weights = np.concatenate([weights, np.full(n_types - len(weights), UNKNOWN_TYPE_WEIGHT)])
+        return weights * 20  # Scale to 0-20 points
+
+    @staticmethod
+    def _score_by_type(product_type: str, goal: str, config: CompiledMLConfig) -> float:
         """Score based on product type alignment with goal"""
-        type_mapping = {
-            "protein": goal_weights.get("protein", 0.1),
-            "creatine": goal_weights.get("creatine", 0.1),
-            "pre_workout": goal_weights.get("pre_workout", 0.1),
-            "post_workout": goal_weights.get("post_workout", 0.1),
-            "fat_burner": goal_weights.get("fat_burner", 0.1),
-            "amino": goal_weights.get("amino", 0.1),
-            "vitamin": goal_weights.get("vitamin", 0.1),
-            "other": goal_weights.get("general", 0.05),
-        }
-        
-        base_score = type_mapping.get(product_type, 0.05)
-        return base_score * 20  # Scale to 0-20 points
+        code = PRODUCT_TYPE_CODES.get(product_type)
+        if code is None:
+            return UNKNOWN_TYPE_WEIGHT * 20
+        return float(config.goal_type_weights[config.goal_index(goal), code]) * 20  # Scale to 0-20 points
 
     @staticmethod
     def _calculate_nutritional_needs(
-        user_profile: Dict, weight: float, height: float, age: int, gender: str
+        user_profile: Dict,
+        weight: float,
+        height: float,
+        age: int,
+        gender: str,
+        config: Optional[CompiledMLConfig] = None,
     ) -> Dict:
         """Calculate individual nutritional needs based on Mifflin-St Jeor formula"""
         goal = user_profile.get("goal", "maintain")
@@ -159,7 +370,7 @@ class ProductScorer:
         calories = tdee * goal_adjustments.get(goal, 1.0)
         
         # Calculate macros
-        protein_per_kg = ProductScorer.PROTEIN_REQUIREMENTS.get(goal, 2.0)
+        protein_per_kg = (config or current_ml_config()).protein_requirements.get(goal, 2.0)
         protein = weight * protein_per_kg
         
         fat_percentage = {
@@ -330,6 +541,7 @@ class ProductScorer:
         user_profile: Dict,
         base_reasons: List[str],
         product: Optional[Dict] = None,
+        config: Optional[CompiledMLConfig] = None,
     ) -> float:
         """
         Calculate confidence level (0-1) for a recommendation
@@ -352,10 +564,13 @@ class ProductScorer:
         confidence = 0.5 + (score / 100) * 0.45
         
         goal = user_profile.get("goal", "maintain")
-        goal_weights = ProductScorer.GOAL_WEIGHTS.get(goal, {})
+        config = config or current_ml_config()
         
-        # Boost confidence if product type strongly aligns with goal
-        type_alignment = ProductScorer._score_by_type(product_type, goal_weights)
+        # Boost confidence if product type strongly aligns with goal (goals without
+        # weights of their own get no boost: default weights stay below both thresholds)
+        type_alignment = (
+            ProductScorer._score_by_type(product_type, goal, config) if goal in config.goal_weights else 0.0
+        )
         if type_alignment > 15:  # Strong alignment
             confidence += 0.08
         elif type_alignment > 10:
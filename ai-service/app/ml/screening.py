@@ -0,0 +1,182 @@
+"""
+Contraindication screening for product recommendations
+
+`ScreeningIndex` stores which products carry which contraindication as a packed
+condition → product bitmap (one bit per product per condition) plus each
+condition's severity. Screening a user matches their diseases, medications and
+allergies against the condition names once per condition (not per product),
+ORs the bitmap rows of the matched conditions by severity and turns the result
+into a keep mask and a score penalty for the whole candidate set:
+
+* high severity — the product is excluded (never scored or returned),
+* medium / low — the score is reduced by SEVERITY_PENALTIES (worst match counts),
+  unless the condition matches one of the user's diseases: the backend already
+  deducted those points from the `score` that arrives as the base score,
+* `exclude_product_ids` — excluded.
+
+Names are matched like the backend does it: case-insensitive, either string
+containing the other.
+"""
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+
+SEVERITY_LEVELS = ("low", "medium", "high")
+# Severity of contraindications stored without one (the database default)
+DEFAULT_SEVERITY = "medium"
+SEVERITY_PENALTIES = {"low": 10.0, "medium": 30.0}
+
+
+@dataclass
+class ScreeningResult:
+    keep: np.ndarray  # bool per product
+    penalty: np.ndarray  # score points to subtract per product
+    matched: np.ndarray  # indices of the conditions that matched the user
+
+    @property
+    def excluded(self) -> int:
+        return int(np.count_nonzero(~self.keep))
+
+
+class ScreeningIndex:
+    def __init__(
+        self,
+        product_ids: Sequence[str],
+        condition_names: Sequence[str],
+        condition_severity: np.ndarray,
+        bitmap: np.ndarray,
+    ):
+        self.product_ids = [str(pid) for pid in product_ids]
+        self.condition_names = list(condition_names)
+        self.condition_severity = condition_severity
+        self.bitmap = bitmap
+        self._lower_names = [name.lower() for name in self.condition_names]
+        self._product_index: Dict[str, int] = {pid: row for row, pid in enumerate(self.product_ids)}
+
+    @classmethod
+    def build(
+        cls, product_ids: Sequence[str], contraindications: Sequence[Optional[Sequence[Dict]]]
+    ) -> "ScreeningIndex":
+        """
+        Build from each product's contraindications (`{id, name | name_key, severity}`),
+        as attached to backend recommendations.
+        """
+        condition_index: Dict[str, int] = {}
+        names: List[str] = []
+        severities: List[int] = []
+        rows: List[int] = []
+        cols: List[int] = []
+        for col, items in enumerate(contraindications):
+            for item in items or []:
+                name = item.get("name") or item.get("name_key") or ""
+                key = str(item.get("id") or name)
+                if not key:
+                    continue
+                row = condition_index.get(key)
+                if row is None:
+                    row = condition_index[key] = len(names)
+                    names.append(name)
+                    severity = item.get("severity") or DEFAULT_SEVERITY
+                    if severity not in SEVERITY_LEVELS:
+                        severity = DEFAULT_SEVERITY
+                    severities.append(SEVERITY_LEVELS.index(severity))
+                rows.append(row)
+                cols.append(col)
+
+        matrix = np.zeros((len(names), len(product_ids)), dtype=bool)
+        matrix[rows, cols] = True
+        return cls(
+            product_ids,
+            names,
+            np.array(severities, dtype=np.int8),
+            np.packbits(matrix, axis=1),
+        )
+
+    def match_conditions(self, terms: Iterable[str]) -> np.ndarray:
+        """Indices of the conditions whose names match any of the user's terms."""
+        terms = [t.strip().lower() for t in terms if t and t.strip()]
+        matched = [
+            i for i, name in enumerate(self._lower_names)
+            if name and any(term in name or name in term for term in terms)
+        ]
+        return np.array(matched, dtype=np.intp)
+
+    def _flagged(self, conditions: np.ndarray) -> np.ndarray:
+        """Products carrying any of `conditions` (bool per product)."""
+        n = len(self.product_ids)
+        if len(conditions) == 0:
+            return np.zeros(n, dtype=bool)
+        packed = np.bitwise_or.reduce(self.bitmap[conditions], axis=0)
+        return np.unpackbits(packed, count=n).astype(bool)
+
+    def screen(
+        self,
+        diseases: Optional[Iterable[str]] = None,
+        medications: Optional[Iterable[str]] = None,
+        allergies: Optional[Iterable[str]] = None,
+        exclude_product_ids: Optional[Iterable[str]] = None,
+    ) -> ScreeningResult:
+        terms = [*(diseases or []), *(medications or []), *(allergies or [])]
+        matched = self.match_conditions(terms)
+        severity = self.condition_severity[matched] if len(matched) else np.zeros(0, dtype=np.int8)
+
+        keep = ~self._flagged(matched[severity == SEVERITY_LEVELS.index("high")])
+        for pid in exclude_product_ids or []:
+            row = self._product_index.get(str(pid))
+            if row is not None:
+                keep[row] = False
+
+        # Disease matches are already deducted by the backend; only medication and
+        # allergy matches cost points here. Worst severity wins: lower levels first
+        unscored = np.setdiff1d(matched, self.match_conditions(diseases or []))
+        unscored_severity = self.condition_severity[unscored]
+        penalty = np.zeros(len(self.product_ids), dtype=np.float64)
+        for level in ("low", "medium"):
+            flagged = self._flagged(unscored[unscored_severity == SEVERITY_LEVELS.index(level)])
+            penalty[flagged] = SEVERITY_PENALTIES[level]
+        penalty[~keep] = 0.0
+        return ScreeningResult(keep=keep, penalty=penalty, matched=matched)
+
+    def warnings_for(self, row: int, matched: np.ndarray) -> List[str]:
+        """Warnings for the matched conditions carried by product `row` (backend wording)."""
+        byte, bit = divmod(row, 8)
+        warnings = []
+        for condition in matched:
+            if self.bitmap[condition, byte] & (0x80 >> bit):
+                severity = SEVERITY_LEVELS[self.condition_severity[condition]]
+                warnings.append(
+                    f"{severity.capitalize()} severity contraindication: {self.condition_names[condition]}"
+                )
+        return warnings
+
+
+def screen_recommendations(
+    recommendations: List[Dict],
+    diseases: Optional[Iterable[str]] = None,
+    medications: Optional[Iterable[str]] = None,
+    allergies: Optional[Iterable[str]] = None,
+    exclude_product_ids: Optional[Iterable[str]] = None,
+) -> Tuple[List[Dict], np.ndarray]:
+    """
+    Drop excluded recommendations and return the rest with their score penalties.
+
+    Kept recommendations that match a lower-severity contraindication get the
+    matching warnings added (without duplicating the backend's own).
+    """
+    index = ScreeningIndex.build(
+        [(rec.get("product") or {}).get("id", "") for rec in recommendations],
+        [rec.get("contraindications") for rec in recommendations],
+    )
+    result = index.screen(diseases, medications, allergies, exclude_product_ids)
+    if result.keep.all() and not result.penalty.any():
+        return recommendations, result.penalty
+
+    kept = []
+    for row in np.flatnonzero(result.keep):
+        rec = recommendations[row]
+        if result.penalty[row]:
+            warnings = list(rec.get("warnings") or [])
+            warnings.extend(w for w in index.warnings_for(row, result.matched) if w not in warnings)
+            rec = {**rec, "warnings": warnings}
+        kept.append(rec)
+    return kept, result.penalty[result.keep]
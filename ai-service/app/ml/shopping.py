@@ -0,0 +1,210 @@
+"""
+Shopping list optimization for generated meal plans
+
+`aggregate_plan()` sums what a (multi-)day plan needs: ingredient grams from
+the meals (scaled by the planned servings) and supplement servings from the
+plan's supplements.
+
+`solve_store_selection()` picks the stores to buy the supplements from. Each
+product's cost in a store is the number of packages needed times the package
+price. For a set of stores every product goes to its cheapest store in the set,
+and every store that gets an order adds its `delivery_fee`, plus a top-up to
+`min_order_amount` when the order is smaller. This is a small uncapacitated
+facility-location (set-cover) problem:
+
+* a greedy pass (add the store that lowers the total most, until no store helps
+  or `max_stores` are chosen) gives the first solution,
+* then every store subset of up to `max_stores` stores is evaluated, vectorized
+  per chunk of subsets, until the time budget runs out.
+
+When the budget runs out first, the best solution found so far (at worst the
+greedy one) is returned and `complete` is False. The result never uses more
+than `max_stores` stores: when no subset within the cap sells every product,
+the cheapest one is returned (a missing product costs more than any purchase,
+so subsets covering more products win) and the rest are marked uncovered.
+"""
+from dataclasses import dataclass
+from itertools import combinations, islice
+from typing import Dict, List, Sequence, Tuple
+import math
+import time
+import numpy as np
+from app.ml.pricing import StoreInfo, StoreOffer, parse_serving_grams
+
+# Store subsets evaluated per vectorized step (and between time budget checks)
+SUBSET_CHUNK = 2048
+
+
+@dataclass
+class StoreSelection:
+    stores: List[int]  # columns of the cost matrix that get an order
+    assignment: np.ndarray  # chosen store column per product row (-1 when uncovered)
+    covered: np.ndarray  # bool per product row: sold by one of the chosen stores
+    total_cost: float  # of the covered products, fees and top-ups included
+    method: str  # "exact" or "greedy"
+    complete: bool  # every subset within max_stores was evaluated
+    evaluated: int  # store subsets evaluated
+
+
+def aggregate_plan(plans: Sequence[Dict]) -> Tuple[Dict[str, Dict], Dict[str, float]]:
+    """
+    Needs of a list of daily plans.
+
+    Returns `(ingredients, supplements)`: ingredient key -> `{ingredient_id, name, grams}`
+    and product id -> servings. A meal's ingredient quantities are for `meal.servings`
+    servings; the plan item's `servings` scales them. Supplement doses in grams are
+    converted with the product's serving size; without one, each entry is one serving.
+    """
+    ingredients: Dict[str, Dict] = {}
+    supplements: Dict[str, float] = {}
+    for plan in plans:
+        for item in plan.get("meals") or []:
+            meal = item.get("meal") or {}
+            scale = float(item.get("servings") or 1) / float(meal.get("servings") or 1)
+            for ingredient in meal.get("ingredients") or []:
+                name = ingredient.get("ingredient_name") or ingredient.get("name") or ""
+                key = str(ingredient.get("ingredient_id") or name)
+                if not key:
+                    continue
+                entry = ingredients.setdefault(
+                    key, {"ingredient_id": ingredient.get("ingredient_id"), "name": name, "grams": 0.0}
+                )
+                entry["grams"] += float(ingredient.get("quantity_grams") or 0) * scale
+
+        for supplement in plan.get("supplements") or []:
+            product = supplement.get("product") or {}
+            product_id = str(supplement.get("product_id") or product.get("id") or "")
+            if not product_id:
+                continue
+            servings = 1.0
+            serving_grams = parse_serving_grams(product.get("serving_size"))
+            if supplement.get("dosage_grams") and serving_grams:
+                servings = float(supplement["dosage_grams"]) / serving_grams
+            supplements[product_id] = supplements.get(product_id, 0.0) + servings
+    return ingredients, supplements
+
+
+def cost_matrix(
+    needs: Dict[str, float],
+    offers: Dict[str, Dict[str, StoreOffer]],
+    stores: Dict[str, StoreInfo],
+) -> Tuple[List[str], List[str], np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Products with at least one offer × stores offering any of them.
+
+    Returns `(product_ids, store_ids, cost, packages, fees, minimums)`; `cost` is
+    inf where a store doesn't sell the product.
+    """
+    product_ids = [pid for pid in needs if offers.get(pid)]
+    store_ids = sorted({sid for pid in product_ids for sid in offers[pid]})
+    column = {sid: col for col, sid in enumerate(store_ids)}
+    cost = np.full((len(product_ids), len(store_ids)), np.inf)
+    packages = np.zeros((len(product_ids), len(store_ids)), dtype=np.int64)
+    for row, pid in enumerate(product_ids):
+        for sid, offer in offers[pid].items():
+            # Tolerance so that 2.0000001 packages is still 2
+            count = max(1, math.ceil(needs[pid] / offer.servings - 1e-9))
+            packages[row, column[sid]] = count
+            cost[row, column[sid]] = count * offer.price
+    info = [stores.get(sid, StoreInfo(sid)) for sid in store_ids]
+    fees = np.array([s.delivery_fee for s in info], dtype=np.float64)
+    minimums = np.array([s.min_order_amount for s in info], dtype=np.float64)
+    return product_ids, store_ids, cost, packages, fees, minimums
+
+
+def _evaluate(
+    cost: np.ndarray, fees: np.ndarray, minimums: np.ndarray, subsets: np.ndarray, uncovered: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Total cost of each store subset (rows of `subsets`, shape m × k).
+
+    Products no store of a subset sells cost `uncovered`. Returns the totals (m)
+    and each product's chosen slot in its subset (n × m).
+    """
+    sub_cost = cost[:, subsets]  # n × m × k
+    slot = np.argmin(sub_cost, axis=2)
+    item_cost = np.take_along_axis(sub_cost, slot[:, :, None], axis=2)[:, :, 0]
+    covered = np.isfinite(item_cost)
+    item_cost = np.where(covered, item_cost, uncovered[:, None])
+
+    k = subsets.shape[1]
+    in_slot = (slot[:, :, None] == np.arange(k)) & covered[:, :, None]
+    subtotal = np.where(in_slot, item_cost[:, :, None], 0.0).sum(axis=0)  # m × k
+    ordered = in_slot.any(axis=0)
+    extra = np.where(ordered, fees[subsets] + np.maximum(0.0, minimums[subsets] - subtotal), 0.0)
+    return item_cost.sum(axis=0) + extra.sum(axis=1), slot
+
+
+def _greedy(
+    cost: np.ndarray, fees: np.ndarray, minimums: np.ndarray, uncovered: np.ndarray, max_stores: int
+) -> Tuple[List[int], float, int]:
+    chosen: List[int] = []
+    best_total = float(uncovered.sum())
+    evaluated = 0
+    candidates = list(range(cost.shape[1]))
+    while candidates and len(chosen) < max_stores:
+        subsets = np.array([chosen + [col] for col in candidates], dtype=np.intp)
+        totals, _ = _evaluate(cost, fees, minimums, subsets, uncovered)
+        evaluated += len(subsets)
+        pick = int(np.argmin(totals))
+        if totals[pick] >= best_total:
+            break
+        best_total = float(totals[pick])
+        chosen.append(candidates.pop(pick))
+    return chosen, best_total, evaluated
+
+
+def solve_store_selection(
+    cost: np.ndarray,
+    fees: np.ndarray,
+    minimums: np.ndarray,
+    max_stores: int = 3,
+    time_budget: float = 0.05,
+) -> StoreSelection:
+    """Choose stores for the product × store `cost` matrix (see the module docstring)."""
+    started = time.perf_counter()
+    n_products, n_stores = cost.shape
+    max_stores = max(1, max_stores)
+    if n_products == 0 or n_stores == 0:
+        return StoreSelection(
+            [], np.full(n_products, -1, dtype=np.intp), np.zeros(n_products, dtype=bool), 0.0, "exact", True, 0
+        )
+
+    # Leaving a product uncovered must cost more than buying it anywhere with any fees
+    finite = np.where(np.isfinite(cost), cost, 0.0)
+    uncovered = finite.max(axis=1) + fees.max() + minimums.max() + 1.0
+
+    best, best_total, evaluated = _greedy(cost, fees, minimums, uncovered, max_stores)
+    method = "greedy"
+    complete = True
+    for k in range(1, min(max_stores, n_stores) + 1):
+        subsets_iter = combinations(range(n_stores), k)
+        while True:
+            chunk = list(islice(subsets_iter, SUBSET_CHUNK))
+            if not chunk:
+                break
+            subsets = np.array(chunk, dtype=np.intp)
+            totals, _ = _evaluate(cost, fees, minimums, subsets, uncovered)
+            evaluated += len(subsets)
+            pick = int(np.argmin(totals))
+            # Strictly better only: ties keep the greedy answer (or the smaller subset)
+            if totals[pick] < best_total - 1e-9:
+                best, best_total, method = list(chunk[pick]), float(totals[pick]), "exact"
+            if time.perf_counter() - started > time_budget:
+                complete = False
+                break
+        if not complete:
+            break
+    if complete:
+        # The exhaustive search confirmed the greedy solution
+        method = "exact"
+
+    subset = np.array([best], dtype=np.intp)
+    _, slot = _evaluate(cost, fees, minimums, subset, uncovered)
+    assignment = subset[0][slot[:, 0]]
+    covered = np.isfinite(cost[np.arange(n_products), assignment])
+    assignment = np.where(covered, assignment, -1)
+    used = sorted({int(col) for col in assignment[covered]})
+    # The total priced uncovered products at the penalty; they aren't bought
+    total = best_total - float(uncovered[~covered].sum())
+    return StoreSelection(used, assignment, covered, total, method, complete, evaluated)
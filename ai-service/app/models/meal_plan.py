@@ -26,4 +26,26 @@ class MealPlanResponse(BaseModel):
     total_fats: float
     generated_at: datetime
     preferences_applied: Dict
+    # Version of the ML config the plan was optimized with
+    ml_config_version: Optional[str] = None
 
+
+
+class ShoppingListRequest(BaseModel):
+    # Generated daily plans (backend format: meals with ingredients, supplements)
+    plans: List[Dict]
+    max_stores: Optional[int] = None
+    exclude_store_ids: Optional[List[str]] = None
+
+
+class ShoppingListResponse(BaseModel):
+    days: int
+    # Aggregated ingredient quantities (there are no ingredient prices to optimize over)
+    ingredients: List[Dict]
+    items: List[Dict]
+    stores: List[Dict]
+    unavailable_product_ids: List[str]
+    total_cost: float
+    currency: str = "RSD"
+    optimization: Dict
+    generated_at: datetime
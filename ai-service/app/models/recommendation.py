@@ -31,4 +31,6 @@ class RecommendationsResponse(BaseModel):
     recommendations: List[ProductRecommendationResponse]
     generated_at: datetime
     user_profile_summary: dict
+    # Version of the ML config the scores were computed with
+    ml_config_version: Optional[str] = None
 
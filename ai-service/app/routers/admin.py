@@ -0,0 +1,70 @@
+from fastapi import APIRouter, Depends, HTTPException
+import asyncio
+from app.routers.debug import require_admin
+from app.utils.logger import logger
+from app.utils.ml_config import MLConfigError, get_ml_config_store
+
+router = APIRouter(prefix="/admin", tags=["admin"], dependencies=[Depends(require_admin)])
+
+
+@router.get("/ml-config")
+async def get_ml_config_info():
+    """Version of the ML config this worker is serving with"""
+    store = get_ml_config_store()
+    return {
+        "success": True,
+        "data": {
+            **store.current().describe(),
+            "path": str(store.path),
+            "reloads": store.reloads,
+            "failed_reloads": store.failed_reloads,
+        },
+    }
+
+
+@router.post("/ml-config/reload")
+async def reload_ml_config():
+    """
+    Re-read and validate the ML config file and make it current in this worker.
+
+    In-flight requests finish with the version they started with. An invalid
+    file is rejected with 422 and the previous version keeps serving. With
+    several gunicorn workers each worker reloads on its own; set
+    ML_CONFIG_WATCH_SECONDS to have all of them pick the change up.
+    """
+    store = get_ml_config_store()
+    previous = store.current().version
+    try:
+        config = await asyncio.to_thread(store.reload)
+    except MLConfigError as e:
+        raise HTTPException(status_code=422, detail=e.errors)
+    except OSError as e:
+        raise HTTPException(status_code=500, detail=f"Could not read ML config: {str(e)}")
+
+    logger.info(f"ML config reload requested: {previous} -> {config.version}")
+    return {
+        "success": True,
+        "data": {**config.describe(), "previous_version": previous, "changed": config.version != previous},
+    }
+
+
+@router.post("/knowledge-index/reload")
+async def reload_knowledge_index():
+    """
+    Rebuild this worker's in-memory knowledge index from the vector store.
+
+    Workers also reload on their own when the collection's document count changes
+    (KNOWLEDGE_INDEX_CHECK_SECONDS); this covers re-ingestion that keeps the count.
+    """
+    from app.services.rag_service import KNOWLEDGE_COLLECTION
+    from app.utils.knowledge_index import get_knowledge_index, invalidate_knowledge_index
+    from app.utils.vector_store import get_vector_store
+
+    invalidate_knowledge_index(KNOWLEDGE_COLLECTION)
+    try:
+        index = await asyncio.to_thread(get_knowledge_index, get_vector_store(), KNOWLEDGE_COLLECTION)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Could not load knowledge index: {str(e)}")
+
+    logger.info(f"Knowledge index reload requested: {len(index)} documents")
+    return {"success": True, "data": {"collection": KNOWLEDGE_COLLECTION, "documents": len(index)}}
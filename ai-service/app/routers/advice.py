@@ -1,16 +1,36 @@
 from fastapi import APIRouter, Header, HTTPException, Depends
+from fastapi.responses import StreamingResponse
 from typing import Optional, Dict, Any
 from pydantic import BaseModel
+import json
 from app.services.rag_service import RagService, get_rag_service
-from app.utils.logger import logger
+from app.services.advice_cache import get_advice_cache
+from app.utils.logger import logger, sampled_logger
 
 router = APIRouter(prefix="/advice", tags=["advice"])
+request_log = sampled_logger("advice.request")
 
 class AdviceRequest(BaseModel):
     user_id: str
     query: str
     user_profile: Optional[Dict[str, Any]] = None
 
+
+def _resolve_profile(request: AdviceRequest) -> Dict[str, Any]:
+    # If profile isn't provided, in a real scenario we might fetch it from Backend API
+    # but for this MVP endpoint we expect it in the request or use defaults.
+    return request.user_profile or {
+        "goal": "maintain",
+        "activity_level": "moderate",
+        "age": 25,
+        "gender": "male"
+    }
+
+
+def _sse(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
 @router.post("/personalized")
 async def get_personalized_advice(
     request: AdviceRequest,
@@ -20,19 +40,12 @@ async def get_personalized_advice(
     Get personalized nutritional advice based on user profile and knowledge base.
     """
     try:
-        logger.info(f"Generating personalized advice for user {request.user_id}")
-        
-        # If profile isn't provided, in a real scenario we might fetch it from Backend API
-        # but for this MVP endpoint we expect it in the request or use defaults.
-        profile = request.user_profile or {
-            "goal": "maintain",
-            "activity_level": "moderate",
-            "age": 25,
-            "gender": "male"
-        }
-        
+        request_log.info(f"Generating personalized advice for user {request.user_id}")
+
+        profile = _resolve_profile(request)
+
         result = await rag_service.generate_personalized_advice(profile, request.query)
-        
+
         return {
             "success": True,
             "data": result
@@ -40,3 +53,42 @@ async def get_personalized_advice(
     except Exception as e:
         logger.error(f"Failed to generate advice: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/personalized/stream")
+async def stream_personalized_advice(
+    request: AdviceRequest,
+    rag_service: RagService = Depends(get_rag_service)
+):
+    """
+    Stream personalized advice as Server-Sent Events.
+
+    Emits `token` events with completion deltas as they arrive from the LLM and
+    a final `done` event carrying the sources and status.
+    """
+    request_log.info(f"Streaming personalized advice for user {request.user_id}")
+    profile = _resolve_profile(request)
+
+    async def event_stream():
+        try:
+            async for event, data in rag_service.stream_personalized_advice(profile, request.query):
+                yield _sse(event, data)
+        except Exception as e:
+            logger.error(f"Failed to stream advice: {str(e)}")
+            yield _sse("error", {"detail": str(e)})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/cache/stats")
+async def get_advice_cache_stats():
+    """Hit/miss counters of the semantic advice cache, including avoided LLM calls."""
+    cache = get_advice_cache()
+    return {
+        "success": True,
+        "data": {"enabled": cache is not None, **(cache.stats() if cache else {})}
+    }
@@ -0,0 +1,45 @@
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import JSONResponse, PlainTextResponse
+from typing import Optional
+import asyncio
+import hmac
+from app.config import get_settings
+from app.utils.logger import logger
+from app.utils.profiler import ProfilerBusyError, get_profiler
+
+router = APIRouter(prefix="/debug", tags=["debug"])
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None, alias="X-Admin-Token")) -> None:
+    admin_token = get_settings().admin_token
+    # An empty ADMIN_TOKEN locks the admin endpoints instead of opening them
+    if not admin_token or not x_admin_token or not hmac.compare_digest(x_admin_token, admin_token):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+
+@router.get("/profile", dependencies=[Depends(require_admin)])
+async def profile(
+    seconds: float = Query(5.0, gt=0),
+    format: str = Query("collapsed", pattern="^(collapsed|speedscope)$"),
+):
+    """
+    Sample the stacks of every thread of this worker for `seconds`.
+
+    Returns collapsed stacks (text) or a speedscope file, both loadable as-is
+    (hence no success/data envelope). The sampler runs in its own thread, so the
+    event loop keeps serving (and is profiled) meanwhile.
+    """
+    profiler = get_profiler()
+    if seconds > profiler.max_seconds:
+        raise HTTPException(
+            status_code=422, detail=f"seconds must be at most {profiler.max_seconds}"
+        )
+    try:
+        result = await asyncio.to_thread(profiler.profile, seconds)
+    except ProfilerBusyError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    logger.info(f"Profile taken: {result.summary()}")
+    if format == "speedscope":
+        return JSONResponse(result.speedscope())
+    return PlainTextResponse(result.collapsed())
@@ -1,5 +1,7 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Request
+from fastapi.responses import JSONResponse
 from datetime import datetime
+from app.utils.cpu_executor import get_cpu_executor
 
 router = APIRouter(prefix="/health", tags=["health"])
 
@@ -11,3 +13,24 @@ async def health_check():
         "timestamp": datetime.utcnow().isoformat(),
         "service": "individual-sports-nutrition-ai-service",
     }
+
+
+@router.get("/ready")
+async def readiness_check(request: Request):
+    """Readiness probe: 503 until startup warm-up has finished."""
+    readiness = getattr(request.app.state, "readiness", None)
+    snapshot = readiness.snapshot() if readiness else {"ready": False, "components": {}}
+    return JSONResponse(
+        status_code=200 if snapshot["ready"] else 503,
+        content={
+            "status": "ready" if snapshot["ready"] else "warming_up",
+            "timestamp": datetime.utcnow().isoformat(),
+            **snapshot,
+        },
+    )
+
+
+@router.get("/executor")
+async def executor_stats():
+    """Queue depth, admission and timing counters of the CPU process pool."""
+    return {"status": "ok", "data": get_cpu_executor().stats()}
@@ -1,10 +1,18 @@
 from fastapi import APIRouter, HTTPException, Header
 from typing import Optional
-from app.models.meal_plan import MealPlanRequest, MealPlanResponse
+from app.models.meal_plan import (
+    MealPlanRequest,
+    MealPlanResponse,
+    ShoppingListRequest,
+    ShoppingListResponse,
+)
 from app.services.meal_plan_service import MealPlanService
+from app.services.price_service import PriceIndexUnavailableError
 from app.config import get_settings
+from app.utils.cpu_executor import ExecutorOverloadedError
+from app.utils.msgpack_codec import NegotiatedRoute, negotiated_response
 
-router = APIRouter(prefix="/meal-plan", tags=["meal-plan"])
+router = APIRouter(prefix="/meal-plan", tags=["meal-plan"], route_class=NegotiatedRoute)
 
 settings = get_settings()
 meal_plan_service = MealPlanService(settings.backend_api_url)
@@ -14,6 +22,7 @@ meal_plan_service = MealPlanService(settings.backend_api_url)
 async def generate_ai_meal_plan(
     request: MealPlanRequest,
     x_user_id: Optional[str] = Header(None, alias="X-User-ID"),
+    accept: Optional[str] = Header(None),
 ):
     """
     Generate AI-powered meal plan
@@ -30,8 +39,30 @@ async def generate_ai_meal_plan(
         request.user_id = user_id
         
         meal_plan = await meal_plan_service.generate_ai_meal_plan(request)
-        return meal_plan
+        # JSON (same bytes as the response_model path) or msgpack, per the Accept header
+        return negotiated_response(meal_plan, accept)
         
+    except ExecutorOverloadedError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+
+@router.post("/shopping-list", response_model=ShoppingListResponse)
+async def build_shopping_list(request: ShoppingListRequest):
+    """
+    Build a priced shopping list for generated meal plans
+
+    Aggregates ingredient and supplement quantities over all days and picks
+    the packages and stores with the lowest total cost, delivery included.
+    """
+    if not request.plans:
+        raise HTTPException(status_code=400, detail="At least one plan is required")
+    try:
+        return await meal_plan_service.build_shopping_list(request)
+    except ExecutorOverloadedError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    except PriceIndexUnavailableError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
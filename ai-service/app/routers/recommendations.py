@@ -6,8 +6,10 @@ from app.models.recommendation import (
 )
 from app.services.recommendation_service import RecommendationService
 from app.config import get_settings
+from app.utils.cpu_executor import ExecutorOverloadedError
+from app.utils.msgpack_codec import NegotiatedRoute, negotiated_response
 
-router = APIRouter(prefix="/recommendations", tags=["recommendations"])
+router = APIRouter(prefix="/recommendations", tags=["recommendations"], route_class=NegotiatedRoute)
 
 settings = get_settings()
 recommendation_service = RecommendationService(settings.backend_api_url)
@@ -17,6 +19,7 @@ recommendation_service = RecommendationService(settings.backend_api_url)
 async def get_ai_recommendations(
     request: ProductRecommendationRequest,
     x_user_id: Optional[str] = Header(None, alias="X-User-ID"),
+    accept: Optional[str] = Header(None),
 ):
     """
     Get AI-powered product recommendations
@@ -33,8 +36,11 @@ async def get_ai_recommendations(
         request.user_id = user_id
         
         recommendations = await recommendation_service.get_ai_recommendations(request)
-        return recommendations
+        # JSON (same bytes as the response_model path) or msgpack, per the Accept header
+        return negotiated_response(recommendations, accept)
         
+    except ExecutorOverloadedError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -0,0 +1,206 @@
+"""
+Semantic response cache for personalized advice
+
+Generated advice is stored per profile bucket (goal, activity level, age band,
+gender and the normalized allergies/diseases/medications, which decide the
+retrieved sources) together with the normalized query embedding. A new question in the same
+bucket whose embedding is close enough (cosine similarity above the threshold)
+is answered from the cache instead of running retrieval and an LLM completion.
+"""
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+import copy
+import itertools
+import time
+import numpy as np
+from app.config import get_settings
+from app.utils.knowledge_index import profile_conditions
+
+# Lower bounds of the age bands used for bucketing
+AGE_BANDS = (18, 25, 35, 45, 55, 65)
+
+BucketKey = Tuple[str, str, str, str, Tuple[str, ...]]
+
+
+def age_band(age: Any) -> str:
+    try:
+        age = int(age)
+    except (TypeError, ValueError):
+        return "unknown"
+    if age < AGE_BANDS[0]:
+        return f"<{AGE_BANDS[0]}"
+    for lower, upper in zip(AGE_BANDS, AGE_BANDS[1:]):
+        if lower <= age < upper:
+            return f"{lower}-{upper - 1}"
+    return f"{AGE_BANDS[-1]}+"
+
+
+def profile_bucket(user_profile: Dict[str, Any]) -> BucketKey:
+    return (
+        str(user_profile.get("goal") or "").lower(),
+        str(user_profile.get("activity_level") or "").lower(),
+        age_band(user_profile.get("age")),
+        str(user_profile.get("gender") or "").lower(),
+        # Advice and sources differ per condition: never share them across condition sets
+        tuple(sorted(set(profile_conditions(user_profile)))),
+    )
+
+
+@dataclass
+class _CacheEntry:
+    bucket: BucketKey
+    embedding: np.ndarray
+    response: Dict[str, Any]
+    created_at: float
+
+
+class _Bucket:
+    """Entries of one profile bucket with a lazily stacked embedding matrix."""
+
+    def __init__(self):
+        self.entry_ids: List[int] = []
+        self._matrix: Optional[np.ndarray] = None
+
+    def add(self, entry_id: int) -> None:
+        self.entry_ids.append(entry_id)
+        self._matrix = None
+
+    def remove(self, entry_id: int) -> None:
+        self.entry_ids.remove(entry_id)
+        self._matrix = None
+
+    def matrix(self, entries: Dict[int, _CacheEntry]) -> np.ndarray:
+        if self._matrix is None:
+            self._matrix = np.vstack([entries[i].embedding for i in self.entry_ids])
+        return self._matrix
+
+
+class SemanticAdviceCache:
+    def __init__(
+        self,
+        similarity_threshold: float = 0.95,
+        ttl_seconds: float = 3600,
+        max_entries: int = 5000,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.similarity_threshold = similarity_threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._clock = clock
+        # Insertion/access order doubles as the LRU order
+        self._entries: "OrderedDict[int, _CacheEntry]" = OrderedDict()
+        self._buckets: Dict[BucketKey, _Bucket] = {}
+        self._ids = itertools.count()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def _normalize(embedding: Sequence[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32).ravel()
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def has_entries(self, user_profile: Dict[str, Any]) -> bool:
+        """Whether a lookup for this profile could hit (so the query is worth embedding)."""
+        bucket = self._buckets.get(profile_bucket(user_profile))
+        if bucket is not None:
+            self._expire(bucket)
+        return bucket is not None and bool(bucket.entry_ids)
+
+    def record_miss(self) -> None:
+        """Count a lookup the caller skipped because `has_entries` was False."""
+        self.misses += 1
+
+    def lookup(
+        self, user_profile: Dict[str, Any], query_embedding: Sequence[float]
+    ) -> Optional[Dict[str, Any]]:
+        """Return a cached response for a semantically equivalent question, if any."""
+        bucket = self._buckets.get(profile_bucket(user_profile))
+        if bucket is not None:
+            self._expire(bucket)
+        if bucket is None or not bucket.entry_ids:
+            self.misses += 1
+            return None
+
+        similarities = bucket.matrix(self._entries) @ self._normalize(query_embedding)
+        best = int(np.argmax(similarities))
+        if similarities[best] < self.similarity_threshold:
+            self.misses += 1
+            return None
+
+        entry_id = bucket.entry_ids[best]
+        self._entries.move_to_end(entry_id)
+        self.hits += 1
+        return copy.deepcopy(self._entries[entry_id].response)
+
+    def store(
+        self,
+        user_profile: Dict[str, Any],
+        query_embedding: Sequence[float],
+        response: Dict[str, Any],
+    ) -> None:
+        key = profile_bucket(user_profile)
+        entry_id = next(self._ids)
+        self._entries[entry_id] = _CacheEntry(
+            bucket=key,
+            embedding=self._normalize(query_embedding),
+            response=copy.deepcopy(response),
+            created_at=self._clock(),
+        )
+        self._buckets.setdefault(key, _Bucket()).add(entry_id)
+
+        while len(self._entries) > self.max_entries:
+            oldest_id = next(iter(self._entries))
+            self._remove(oldest_id)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._buckets.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "buckets": len(self._buckets),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            # Only successful LLM answers are cached, so every hit is an avoided LLM call
+            "llm_calls_avoided": self.hits,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+    def _expire(self, bucket: _Bucket) -> None:
+        cutoff = self._clock() - self.ttl_seconds
+        for entry_id in [i for i in bucket.entry_ids if self._entries[i].created_at < cutoff]:
+            self._remove(entry_id)
+            self.expirations += 1
+
+    def _remove(self, entry_id: int) -> None:
+        entry = self._entries.pop(entry_id)
+        bucket = self._buckets[entry.bucket]
+        bucket.remove(entry_id)
+        if not bucket.entry_ids:
+            del self._buckets[entry.bucket]
+
+
+@lru_cache()
+def get_advice_cache() -> Optional[SemanticAdviceCache]:
+    settings = get_settings()
+    if not settings.advice_cache_enabled:
+        return None
+    return SemanticAdviceCache(
+        similarity_threshold=settings.advice_cache_similarity_threshold,
+        ttl_seconds=settings.advice_cache_ttl_seconds,
+        max_entries=settings.advice_cache_max_entries,
+    )
@@ -0,0 +1,174 @@
+"""
+Catalog loading and publishing into the shared-memory segment
+
+`CatalogRefresher` (one per host — a dedicated process spawned by the gunicorn
+master, or the app process itself for single-process runs) periodically fetches
+the product and meal catalogs from the backend, encodes them with the same
+feature functions the scorers use and publishes a new generation. Workers read
+it through `get_catalog_snapshot()`.
+"""
+from typing import Dict, List, Optional
+import multiprocessing
+import os
+import signal
+import threading
+import time
+import httpx
+from app.config import get_settings
+from app.ml.meal_planner import MealPlanner
+from app.ml.scoring import ProductScorer
+from app.utils.logger import logger
+from app.utils.shared_catalog import (
+    CatalogData,
+    CatalogSnapshot,
+    SharedCatalogPublisher,
+    SharedCatalogReader,
+)
+
+# Catalog rows carry the neutral base score; requests overwrite it with the backend's
+DEFAULT_BASE_SCORE = 50.0
+# How often a refresher process checks that the gunicorn master is still alive
+PARENT_CHECK_SECONDS = 1.0
+
+
+def build_catalog(products: List[Dict], meals: List[Dict]) -> CatalogData:
+    product_features, type_names = ProductScorer.product_features(
+        products, [DEFAULT_BASE_SCORE] * len(products)
+    )
+    return CatalogData(
+        product_ids=[str(p.get("id", "")) for p in products],
+        product_features=product_features,
+        type_names=type_names,
+        meal_ids=[str(m.get("id", "")) for m in meals],
+        meal_features=MealPlanner.meal_features(meals),
+    )
+
+
+class CatalogLoader:
+    """Fetches the full catalog from the backend API (blocking; runs off the event loop)."""
+
+    def __init__(self, backend_api_url: str, meals_path: str = "", page_size: int = 500, timeout: float = 30.0):
+        self.backend_api_url = backend_api_url.rstrip("/")
+        self.meals_path = meals_path
+        self.page_size = page_size
+        self.timeout = timeout
+
+    def load(self) -> CatalogData:
+        with httpx.Client(base_url=self.backend_api_url, timeout=self.timeout) as client:
+            brands = {b.get("id"): b for b in self._get_data(client, "/api/v1/products/brands")}
+            products = self._get_paginated(client, "/api/v1/products")
+            for product in products:
+                if not product.get("brand") and product.get("brand_id") in brands:
+                    product["brand"] = brands[product["brand_id"]]
+            meals = self._get_data(client, self.meals_path) if self.meals_path else []
+        return build_catalog(products, meals)
+
+    @staticmethod
+    def _get_data(client: httpx.Client, path: str, params: Optional[Dict] = None) -> List[Dict]:
+        response = client.get(path, params=params)
+        response.raise_for_status()
+        body = response.json()
+        return body.get("data", []) if isinstance(body, dict) else body
+
+    def _get_paginated(self, client: httpx.Client, path: str) -> List[Dict]:
+        items: List[Dict] = []
+        while True:
+            page = self._get_data(client, path, {"limit": self.page_size, "offset": len(items)})
+            items.extend(page)
+            if len(page) < self.page_size:
+                return items
+
+
+class CatalogRefresher:
+    """Background thread that publishes a new catalog generation every `interval` seconds."""
+
+    def __init__(self, publisher: SharedCatalogPublisher, loader: CatalogLoader, interval: float):
+        self.publisher = publisher
+        self.loader = loader
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def refresh(self) -> bool:
+        try:
+            self.publisher.publish(self.loader.load())
+            return True
+        except Exception as e:
+            # Keep serving the previous generation
+            logger.warning(f"Catalog refresh failed: {str(e)}")
+            return False
+
+    def start(self) -> None:
+        # First generation synchronously, so workers forked afterwards find it
+        self.refresh()
+        self._thread = threading.Thread(target=self._run, name="catalog-refresher", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.refresh()
+
+    def serve(self, parent_pid: Optional[int] = None) -> None:
+        """Refresh in the calling thread until stopped or until `parent_pid` exits, then unlink."""
+        next_refresh = time.monotonic() + self.interval
+        try:
+            while not self._stop.wait(min(PARENT_CHECK_SECONDS, max(0.0, next_refresh - time.monotonic()))):
+                if parent_pid is not None and os.getppid() != parent_pid:
+                    logger.warning("Catalog refresher parent exited, stopping")
+                    break
+                if time.monotonic() >= next_refresh:
+                    self.refresh()
+                    next_refresh = time.monotonic() + self.interval
+        finally:
+            self.publisher.close()
+
+    def stop(self, unlink: bool = True) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self.publisher.close(unlink=unlink)
+
+
+def create_catalog_refresher() -> CatalogRefresher:
+    settings = get_settings()
+    return CatalogRefresher(
+        SharedCatalogPublisher(settings.shared_catalog_name),
+        CatalogLoader(settings.backend_api_url, meals_path=settings.shared_catalog_meals_path),
+        interval=settings.shared_catalog_refresh_seconds,
+    )
+
+
+def run_catalog_refresher(parent_pid: int) -> None:
+    """Entry point of the refresher process; continues the generations already published."""
+    refresher = create_catalog_refresher()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, lambda *_: refresher._stop.set())
+    refresher.serve(parent_pid)
+
+
+def start_catalog_refresher_process() -> multiprocessing.Process:
+    """Spawn the periodic refresher; the caller publishes the first generation itself."""
+    # Spawned, not forked: the gunicorn master must stay free of extra threads and state
+    process = multiprocessing.get_context("spawn").Process(
+        target=run_catalog_refresher, args=(os.getpid(),), name="catalog-refresher", daemon=True
+    )
+    process.start()
+    return process
+
+
+_catalog_reader: Optional[SharedCatalogReader] = None
+
+
+def get_catalog_snapshot() -> Optional[CatalogSnapshot]:
+    """Current shared catalog generation, or None when disabled or not yet published."""
+    global _catalog_reader
+    settings = get_settings()
+    if not settings.shared_catalog_enabled:
+        return None
+    if _catalog_reader is None:
+        _catalog_reader = SharedCatalogReader(settings.shared_catalog_name)
+    try:
+        return _catalog_reader.snapshot()
+    except Exception as e:
+        logger.warning(f"Shared catalog unavailable: {str(e)}")
+        return None
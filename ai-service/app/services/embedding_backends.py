@@ -0,0 +1,134 @@
+"""
+Inference backends for EmbeddingService
+
+* `TorchBackend` — the sentence-transformers model on PyTorch (default).
+* `OnnxBackend` — the same model exported to ONNX (optionally int8-quantized,
+  see scripts/export_onnx_model.py) and run with onnxruntime. It loads the model
+  and tokenizer from a local directory only and never touches the network.
+
+Both return L2-normalized float32 sentence embeddings of shape (n, dim), so they
+are interchangeable; scripts/bench_embedding_backends.py checks parity and speed.
+"""
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import List, Optional
+import os
+import numpy as np
+
+ONNX_MODEL_FILE = "model.onnx"
+ONNX_QUANTIZED_MODEL_FILE = "model_quantized.onnx"
+TOKENIZER_FILE = "tokenizer.json"
+
+
+def mean_pool_normalize(token_embeddings: np.ndarray, attention_mask: np.ndarray) -> np.ndarray:
+    """
+    Sentence-transformers pooling for MiniLM: mean over non-padding tokens, then L2 norm.
+
+    Args:
+        token_embeddings: (batch, seq_len, dim) last hidden state.
+        attention_mask: (batch, seq_len) with 1 for real tokens.
+    """
+    mask = attention_mask[..., None].astype(np.float32)
+    summed = (token_embeddings * mask).sum(axis=1)
+    counts = np.clip(mask.sum(axis=1), 1e-9, None)
+    pooled = summed / counts
+    norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+    return (pooled / np.clip(norms, 1e-12, None)).astype(np.float32)
+
+
+class EmbeddingBackend(ABC):
+    name = "base"
+
+    @abstractmethod
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """L2-normalized float32 embeddings, one row per text."""
+
+
+class TorchBackend(EmbeddingBackend):
+    name = "torch"
+
+    def __init__(self, model_name: str):
+        # Imported here: sentence_transformers pulls in torch, which dominates boot time
+        from sentence_transformers import SentenceTransformer
+
+        self.model = SentenceTransformer(model_name)
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        return np.asarray(
+            self.model.encode(texts, normalize_embeddings=True), dtype=np.float32
+        )
+
+
+class OnnxBackend(EmbeddingBackend):
+    name = "onnx"
+
+    def __init__(
+        self,
+        model_dir: str,
+        quantized: bool = False,
+        max_length: int = 256,
+        batch_size: int = 32,
+        intra_op_threads: int = 0,
+    ):
+        model_path = Path(model_dir) / (ONNX_QUANTIZED_MODEL_FILE if quantized else ONNX_MODEL_FILE)
+        tokenizer_path = Path(model_dir) / TOKENIZER_FILE
+        for path in (model_path, tokenizer_path):
+            if not path.is_file():
+                raise FileNotFoundError(
+                    f"{path} not found; export the model with scripts/export_onnx_model.py"
+                )
+
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if intra_op_threads:
+            options.intra_op_num_threads = intra_op_threads
+        self.session = ort.InferenceSession(
+            str(model_path), sess_options=options, providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+        self.tokenizer = Tokenizer.from_file(str(tokenizer_path))
+        self.tokenizer.enable_truncation(max_length=max_length)
+        pad_token = self.tokenizer.padding["pad_token"] if self.tokenizer.padding else "[PAD]"
+        pad_id = self.tokenizer.token_to_id(pad_token) or 0
+        self.tokenizer.enable_padding(pad_id=pad_id, pad_token=pad_token)
+        self.batch_size = batch_size
+        self.model_path = str(model_path)
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        batches = [
+            self._encode_batch(texts[start:start + self.batch_size])
+            for start in range(0, len(texts), self.batch_size)
+        ]
+        return np.vstack(batches) if batches else np.zeros((0, 0), dtype=np.float32)
+
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self.input_names:
+            feeds["token_type_ids"] = np.array([e.type_ids for e in encodings], dtype=np.int64)
+        token_embeddings = self.session.run(None, feeds)[0]
+        return mean_pool_normalize(token_embeddings, attention_mask)
+
+
+def create_backend(
+    backend: str,
+    model_name: str,
+    onnx_path: Optional[str] = None,
+    quantized: bool = False,
+    intra_op_threads: int = 0,
+) -> EmbeddingBackend:
+    if backend == "torch":
+        return TorchBackend(model_name)
+    if backend == "onnx":
+        return OnnxBackend(
+            onnx_path or os.path.join("data", "models", model_name),
+            quantized=quantized,
+            intra_op_threads=intra_op_threads,
+        )
+    raise ValueError(f"Unknown embedding backend: {backend!r} (expected 'torch' or 'onnx')")
@@ -1,21 +1,38 @@
-from typing import List, Union
-import numpy as np
-from sentence_transformers import SentenceTransformer
+from typing import List, Optional, Union
+from app.services.embedding_backends import create_backend
+from app.config import get_settings
 from app.utils.logger import logger
 from functools import lru_cache
 
 class EmbeddingService:
-    def __init__(self, model_name: str = "all-MiniLM-L6-v2"):
+    def __init__(
+        self,
+        model_name: str = "all-MiniLM-L6-v2",
+        backend: str = "torch",
+        onnx_path: Optional[str] = None,
+        onnx_quantized: bool = False,
+        onnx_threads: int = 0,
+    ):
         """
         Initialize the embedding service with a pre-trained model.
         
         Args:
             model_name: Name of the sentence-transformers model to use.
                         "all-MiniLM-L6-v2" is fast and relatively accurate.
+            backend: "torch" (sentence-transformers) or "onnx" (onnxruntime, local files only).
+            onnx_path: Directory with the exported ONNX model and tokenizer.json.
+            onnx_quantized: Use the int8-quantized ONNX model.
+            onnx_threads: onnxruntime intra-op threads (0 = runtime default).
         """
         try:
-            logger.info(f"Loading embedding model: {model_name}")
-            self.model = SentenceTransformer(model_name)
+            logger.info(f"Loading embedding model: {model_name} ({backend} backend)")
+            self.backend = create_backend(
+                backend,
+                model_name,
+                onnx_path=onnx_path,
+                quantized=onnx_quantized,
+                intra_op_threads=onnx_threads,
+            )
             logger.info("Embedding model loaded successfully")
         except Exception as e:
             logger.error(f"Failed to load embedding model: {str(e)}")
@@ -32,14 +49,20 @@ class EmbeddingService:
             A single embedding (list of floats) or a list of embeddings.
         """
         try:
-            embeddings = self.model.encode(texts)
             if isinstance(texts, str):
-                return embeddings.tolist()
-            return embeddings.tolist()
+                return self.backend.encode([texts])[0].tolist()
+            return self.backend.encode(list(texts)).tolist()
         except Exception as e:
             logger.error(f"Error generating embeddings: {str(e)}")
             raise
 
 @lru_cache()
 def get_embedding_service() -> EmbeddingService:
-    return EmbeddingService()
+    settings = get_settings()
+    return EmbeddingService(
+        model_name=settings.embedding_model_name,
+        backend=settings.embedding_backend,
+        onnx_path=settings.embedding_onnx_path or None,
+        onnx_quantized=settings.embedding_onnx_quantized,
+        onnx_threads=settings.embedding_onnx_threads,
+    )
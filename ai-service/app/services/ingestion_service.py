@@ -0,0 +1,245 @@
+"""
+Incremental knowledge ingestion pipeline
+
+Streams documents from files and directories in chunks, hashes each document's
+content and metadata, embeds only new or changed documents in batches on a
+worker pool, upserts them and deletes ids that disappeared from the sources.
+"""
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, TypeVar
+import hashlib
+import json
+import time
+from app.utils.knowledge_index import invalidate_knowledge_index
+from app.utils.logger import logger
+
+HASH_METADATA_KEY = "content_hash"
+SUPPORTED_SUFFIXES = (".jsonl", ".json", ".md", ".txt")
+
+T = TypeVar("T")
+
+
+@dataclass
+class KnowledgeDocument:
+    id: str
+    content: str
+    metadata: Dict[str, Any] = field(default_factory=dict)
+
+    def content_hash(self) -> str:
+        """Stable hash of the content and metadata; changes whenever either changes."""
+        payload = json.dumps(
+            {"content": self.content, "metadata": self.metadata},
+            sort_keys=True,
+            ensure_ascii=False,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class IngestionStats:
+    seen: int = 0
+    new: int = 0
+    changed: int = 0
+    unchanged: int = 0
+    deleted: int = 0
+    skipped: int = 0
+    batches: int = 0
+    duration_seconds: float = 0.0
+
+    @property
+    def embedded(self) -> int:
+        return self.new + self.changed
+
+
+def _document_from_record(record: Dict[str, Any], source: str) -> Optional[KnowledgeDocument]:
+    doc_id = record.get("id")
+    content = record.get("content")
+    if not doc_id or not content:
+        logger.warning(f"Skipping record without id/content in {source}")
+        return None
+    return KnowledgeDocument(id=str(doc_id), content=content, metadata=record.get("metadata") or {})
+
+
+def _iter_file(path: Path, root: Path) -> Iterator[KnowledgeDocument]:
+    suffix = path.suffix.lower()
+    source = str(path)
+
+    if suffix == ".jsonl":
+        # Read line by line so large corpora are never loaded at once
+        with path.open("r", encoding="utf-8") as f:
+            for line_no, line in enumerate(f, start=1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError as e:
+                    logger.warning(f"Skipping invalid JSON at {source}:{line_no}: {e}")
+                    continue
+                document = _document_from_record(record, source)
+                if document:
+                    yield document
+
+    elif suffix == ".json":
+        with path.open("r", encoding="utf-8") as f:
+            data = json.load(f)
+        records = data.get("documents", []) if isinstance(data, dict) else data
+        for record in records:
+            document = _document_from_record(record, source)
+            if document:
+                yield document
+
+    elif suffix in (".md", ".txt"):
+        content = path.read_text(encoding="utf-8").strip()
+        if content:
+            relative = path.relative_to(root) if path != root else Path(path.name)
+            yield KnowledgeDocument(
+                id=relative.with_suffix("").as_posix(),
+                content=content,
+                metadata={"source": relative.as_posix()},
+            )
+
+
+def iter_documents(paths: Iterable[str]) -> Iterator[KnowledgeDocument]:
+    """Stream documents from files and (recursively) directories in a stable order."""
+    for raw_path in paths:
+        path = Path(raw_path)
+        if path.is_dir():
+            files = sorted(
+                p for p in path.rglob("*") if p.is_file() and p.suffix.lower() in SUPPORTED_SUFFIXES
+            )
+            for file_path in files:
+                yield from _iter_file(file_path, path)
+        elif path.is_file():
+            yield from _iter_file(path, path.parent)
+        else:
+            logger.warning(f"Knowledge source not found: {path}")
+
+
+def iter_chunks(items: Iterable[T], size: int) -> Iterator[List[T]]:
+    chunk: List[T] = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class IngestionPipeline:
+    """Content-hashed, incremental ingestion into a vector store collection."""
+
+    def __init__(
+        self,
+        embedding_service,
+        vector_store,
+        collection_name: str = "nutritional_knowledge",
+        batch_size: int = 64,
+        workers: int = 4,
+        chunk_size: int = 1000,
+    ):
+        self.embedding_service = embedding_service
+        self.vector_store = vector_store
+        self.collection_name = collection_name
+        self.batch_size = batch_size
+        self.workers = max(1, workers)
+        self.chunk_size = chunk_size
+
+    def run(self, paths: Sequence[str], prune: bool = True) -> IngestionStats:
+        """
+        Synchronize the collection with the documents found in `paths`.
+
+        Args:
+            paths: Files or directories (.jsonl, .json, .md, .txt).
+            prune: Delete documents whose ids were not seen in this run.
+
+        Returns:
+            Counts of new, changed, unchanged and deleted documents.
+        """
+        started = time.perf_counter()
+        stats = IngestionStats()
+
+        existing = {
+            doc_id: metadata.get(HASH_METADATA_KEY)
+            for doc_id, metadata in self.vector_store.iter_metadatas(self.collection_name)
+        }
+        seen = set()
+
+        # Bounded number of in-flight embedding batches keeps memory flat while streaming
+        max_pending = self.workers * 2
+        pending: List[Future] = []
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            for chunk in iter_chunks(iter_documents(paths), self.chunk_size):
+                to_embed: List[Tuple[KnowledgeDocument, str]] = []
+                for document in chunk:
+                    if document.id in seen:
+                        logger.warning(f"Duplicate document id {document.id}, keeping the first one")
+                        stats.skipped += 1
+                        continue
+                    seen.add(document.id)
+                    stats.seen += 1
+
+                    digest = document.content_hash()
+                    previous = existing.get(document.id)
+                    if previous == digest:
+                        stats.unchanged += 1
+                        continue
+                    if document.id in existing:
+                        stats.changed += 1
+                    else:
+                        stats.new += 1
+                    to_embed.append((document, digest))
+
+                for batch in iter_chunks(to_embed, self.batch_size):
+                    pending.append(pool.submit(self._embed_batch, batch))
+                    if len(pending) >= max_pending:
+                        self._upsert(pending.pop(0).result())
+                        stats.batches += 1
+
+            for future in pending:
+                self._upsert(future.result())
+                stats.batches += 1
+
+        if prune:
+            stale = [doc_id for doc_id in existing if doc_id not in seen]
+            if stale and not seen:
+                # An empty or mistyped source must not wipe the collection
+                logger.warning(f"No documents read, refusing to delete {len(stale)} existing ids")
+            else:
+                for ids in iter_chunks(stale, self.chunk_size):
+                    self.vector_store.delete_documents(self.collection_name, ids)
+                stats.deleted = len(stale)
+
+        if stats.embedded or stats.deleted:
+            invalidate_knowledge_index(self.collection_name)
+
+        stats.duration_seconds = round(time.perf_counter() - started, 3)
+        logger.info(
+            f"Ingestion into {self.collection_name} finished: {stats.new} new, "
+            f"{stats.changed} changed, {stats.unchanged} unchanged, {stats.deleted} deleted "
+            f"in {stats.duration_seconds}s"
+        )
+        return stats
+
+    def _embed_batch(
+        self, batch: List[Tuple[KnowledgeDocument, str]]
+    ) -> Tuple[List[KnowledgeDocument], List[str], List[List[float]]]:
+        documents = [document for document, _ in batch]
+        digests = [digest for _, digest in batch]
+        embeddings = self.embedding_service.generate_embeddings([d.content for d in documents])
+        return documents, digests, embeddings
+
+    def _upsert(self, result: Tuple[List[KnowledgeDocument], List[str], List[List[float]]]) -> None:
+        documents, digests, embeddings = result
+        # Upserts run on the calling thread; only embedding is parallelized
+        self.vector_store.upsert_documents(
+            collection_name=self.collection_name,
+            ids=[d.id for d in documents],
+            embeddings=embeddings,
+            metadatas=[{**d.metadata, HASH_METADATA_KEY: digest} for d, digest in zip(documents, digests)],
+            documents=[d.content for d in documents],
+        )
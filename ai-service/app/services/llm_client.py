@@ -0,0 +1,86 @@
+"""
+Async client for OpenAI-compatible chat completion APIs
+
+Completions are awaited on the event loop instead of blocking it, and every call
+(blocking or streaming) holds a slot of a semaphore so the number of in-flight
+LLM requests per worker stays bounded.
+"""
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional
+import asyncio
+from app.utils.logger import logger
+
+
+class LLMUnavailableError(Exception):
+    """Raised when no LLM slot frees up within the queue timeout."""
+
+
+class LLMClient:
+    def __init__(
+        self,
+        api_key: str,
+        model: str,
+        base_url: Optional[str] = None,
+        max_concurrency: int = 8,
+        queue_timeout: float = 10.0,
+        timeout: float = 30.0,
+        temperature: float = 0.7,
+        max_tokens: int = 500,
+    ):
+        self.model = model
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+        self.max_concurrency = max_concurrency
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        # Deferred so workers that never call the LLM don't pay for importing openai
+        from openai import AsyncOpenAI
+
+        self._client = AsyncOpenAI(api_key=api_key, base_url=base_url or None, timeout=timeout)
+
+    @asynccontextmanager
+    async def _slot(self):
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"All {self.max_concurrency} LLM slots busy for {self.queue_timeout}s")
+            raise LLMUnavailableError("LLM concurrency limit reached")
+
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+
+    async def complete(self, messages: List[Dict[str, str]]) -> str:
+        """Return the full completion text for a chat conversation."""
+        async with self._slot():
+            response = await self._client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                temperature=self.temperature,
+                max_tokens=self.max_tokens,
+            )
+        return response.choices[0].message.content or ""
+
+    async def stream(self, messages: List[Dict[str, str]]) -> AsyncIterator[str]:
+        """Yield completion text deltas as they arrive."""
+        async with self._slot():
+            stream = await self._client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                temperature=self.temperature,
+                max_tokens=self.max_tokens,
+                stream=True,
+            )
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    yield delta
+
+    async def close(self) -> None:
+        await self._client.close()
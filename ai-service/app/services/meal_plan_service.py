@@ -2,18 +2,35 @@
 AI-powered meal plan generation service
 Uses ML models to generate personalized meal plans
 """
-from typing import List, Dict
+from typing import List, Dict, Optional
 from datetime import datetime, date
-from app.models.meal_plan import MealPlanRequest, MealPlanResponse
+from app.config import get_settings
+from app.models.meal_plan import (
+    MealPlanRequest,
+    MealPlanResponse,
+    ShoppingListRequest,
+    ShoppingListResponse,
+)
 from app.ml.meal_planner import MealPlanner
-from app.utils.logger import logger
-import httpx
+from app.ml.shopping import aggregate_plan, cost_matrix, solve_store_selection
+from app.services.catalog_service import get_catalog_snapshot
+from app.services.price_service import PriceIndexUnavailableError, get_price_index
+from app.utils.capture import capture_active, capture_note
+from app.utils.cpu_executor import ExecutorOverloadedError, get_cpu_executor
+from app.utils.http_client import AsyncHTTPClient, decode_response
+from app.utils.logger import sampled_logger
+from app.utils.metrics import timed
+from app.utils.ml_config import CompiledMLConfig, current_ml_config
+import numpy as np
+
+request_log = sampled_logger("meal_plan.request")
 
 
 class MealPlanService:
     def __init__(self, backend_api_url: str):
         self.backend_api_url = backend_api_url
-        self.client = httpx.AsyncClient(timeout=30.0)
+        # A single attempt: plan generation is a POST
+        self.client = AsyncHTTPClient(timeout=30.0, max_retries=1, accept_msgpack=get_settings().backend_msgpack)
         self.meal_planner = MealPlanner()
 
     async def generate_ai_meal_plan(
@@ -31,47 +48,63 @@ class MealPlanService:
             # For now, delegate to backend API
             # In future, this will use ML models for meal selection and optimization
             
-            response = await self.client.post(
-                f"{self.backend_api_url}/api/v1/meal-plan/generate",
-                json={
-                    "date": request.date.isoformat(),
-                    "preferences": {
-                        "cuisine_types": request.cuisine_types,
-                        "exclude_ingredients": request.exclude_ingredients,
-                        "meal_times": request.meal_times,
+            with timed("meal_plan.fetch_base"):
+                response = await self.client.post(
+                    f"{self.backend_api_url}/api/v1/meal-plan/generate",
+                    json={
+                        "date": request.date.isoformat(),
+                        "preferences": {
+                            "cuisine_types": request.cuisine_types,
+                            "exclude_ingredients": request.exclude_ingredients,
+                            "meal_times": request.meal_times,
+                        },
                     },
-                },
-                headers={"X-User-ID": request.user_id},
-            )
+                    headers={"X-User-ID": request.user_id},
+                )
             
             if response.status_code != 200:
                 raise Exception(f"Backend API returned {response.status_code}")
             
-            data = response.json()
+            data = decode_response(response)
             meal_plan_data = data.get("data", {})
             
-            # Enhance with AI optimization
-            enhanced_plan = self._enhance_meal_plan(meal_plan_data, request)
+            # Enhance with AI optimization, with one config version for the whole request
+            config = current_ml_config()
+            enhanced_plan = await self._enhance_meal_plan(meal_plan_data, request, config)
             
-            logger.info(f"Generated enhanced meal plan for user {request.user_id}")
+            request_log.info(f"Generated enhanced meal plan for user {request.user_id}")
             
-            return MealPlanResponse(
+            # Built without re-validating the (large) meals; totals from the backend
+            # may be ints, float() gives the JSON validation would ("2400.0")
+            return MealPlanResponse.model_construct(
                 meal_plan_id=enhanced_plan.get("id", ""),
                 date=request.date,
                 meals=enhanced_plan.get("meals", []),
-                total_calories=enhanced_plan.get("total_calories", request.target_calories),
-                total_protein=enhanced_plan.get("total_protein", request.target_protein),
-                total_carbs=enhanced_plan.get("total_carbs", request.target_carbs),
-                total_fats=enhanced_plan.get("total_fats", request.target_fats),
+                total_calories=float(enhanced_plan.get("total_calories", request.target_calories)),
+                total_protein=float(enhanced_plan.get("total_protein", request.target_protein)),
+                total_carbs=float(enhanced_plan.get("total_carbs", request.target_carbs)),
+                total_fats=float(enhanced_plan.get("total_fats", request.target_fats)),
                 generated_at=datetime.utcnow(),
                 preferences_applied=request.preferences or {},
+                ml_config_version=config.version,
             )
             
+        except ExecutorOverloadedError:
+            raise
         except Exception as e:
             raise Exception(f"Failed to generate meal plan: {str(e)}")
 
-    def _enhance_meal_plan(
-        self, base_plan: Dict, request: MealPlanRequest
+    def _meal_features(self, meals: List[Dict]) -> np.ndarray:
+        """Meal feature rows from the shared catalog, parsed from the dicts if missing there."""
+        snapshot = get_catalog_snapshot()
+        rows = snapshot.meal_rows([m.get("id", "") for m in meals]) if snapshot else None
+        if rows is None:
+            return self.meal_planner.meal_features(meals)
+        return snapshot.meals[rows]
+
+    @timed("meal_plan.enhance")
+    async def _enhance_meal_plan(
+        self, base_plan: Dict, request: MealPlanRequest, config: Optional[CompiledMLConfig] = None
     ) -> Dict:
         """
         Enhance meal plan with AI optimization
@@ -82,6 +115,7 @@ class MealPlanService:
         - Better Serbian cuisine prioritization
         - Improved macro balancing
         """
+        config = config or current_ml_config()
         preferences = request.preferences or {}
         goal = preferences.get("goal", "maintain")
         activity_level = preferences.get("activity_level", "moderate")
@@ -91,14 +125,17 @@ class MealPlanService:
             request.target_calories,
             goal,
             activity_level,
+            config,
         )
         
         # Get optimal meal times
-        meal_times = self.meal_planner.get_optimal_meal_times(goal, activity_level)
+        meal_times = self.meal_planner.get_optimal_meal_times(goal, activity_level, config)
         
         # Optimize meals if available
         if "meals" in base_plan and base_plan["meals"]:
-            available_meals = base_plan["meals"]
+            # Plan items wrap the meal under "meal"; candidates are the meals themselves
+            # (assigning an item into another item's "meal" would create a cycle)
+            available_meals = [item["meal"] for item in base_plan["meals"] if item.get("meal")]
             
             # Step 1: Filter by allergies and excluded ingredients
             available_meals = self.meal_planner.filter_meals_by_preferences(
@@ -122,8 +159,10 @@ class MealPlanService:
                 if meal_item.get("meal"):
                     selected_meals.append(meal_item["meal"])
             
-            # Optimize meal selection for each meal type
+            # Optimize meal selection for each meal type: the candidates are the same
+            # for every slot, so all slots are ranked in one batch
             optimized_meals = []
+            slots = []
             for meal_item in base_plan.get("meals", []):
                 meal_type = meal_item.get("meal_type", "")
                 
@@ -131,23 +170,39 @@ class MealPlanService:
                     # Get target macros for this meal
                     meal_target_calories = meal_distribution.get(meal_type, request.target_calories * 0.25)
                     meal_target_protein = request.target_protein * (meal_target_calories / request.target_calories)
-                    
-                    # Select optimal meals
-                    optimal = self.meal_planner.select_optimal_meals(
-                        available_meals,
-                        meal_target_calories,
-                        meal_target_protein,
-                        meal_type,
+                    slots.append((meal_item, meal_target_calories, meal_target_protein))
+            
+            candidates = self.meal_planner.prepare_candidates(
+                available_meals,
+                preferences,
+                request.exclude_ingredients,
+                selected_meals,
+            )
+            if capture_active():
+                capture_note(
+                    goal=goal,
+                    activity_level=activity_level,
+                    target_calories=request.target_calories,
+                    target_protein=request.target_protein,
+                    slots=[meal_item.get("meal_type") for meal_item, _, _ in slots],
+                    candidates=list(candidates),
+                    ml_config_version=config.version,
+                )
+            if slots and candidates:
+                # Same choice as select_optimal_meals(...)[0] for each slot
+                with timed("meal_plan.rank"):
+                    best = await get_cpu_executor().run(
+                        MealPlanner.best_meal_indices,
+                        [self._meal_features(candidates)],
+                        np.array([calories for _, calories, _ in slots]),
+                        np.array([protein for _, _, protein in slots]),
                         goal,
-                        preferences,
-                        request.exclude_ingredients,
-                        selected_meals,
+                        size=len(candidates) * len(slots),
                     )
-                    
+                for (meal_item, _, _), index in zip(slots, best):
                     # Use best matching meal
-                    if optimal:
-                        meal_item["meal"] = optimal[0]
-                        optimized_meals.append(optimal[0])
+                    meal_item["meal"] = candidates[index]
+                    optimized_meals.append(candidates[index])
             
             # Ensure diversity across all selected meals
             if optimized_meals:
@@ -172,6 +227,7 @@ class MealPlanService:
         base_plan["optimization"] = {
             "meal_distribution": meal_distribution,
             "algorithm_version": "1.1",  # Updated version
+            "ml_config_version": config.version,
             "enhanced": True,
             "diversity_optimized": True,
             "allergies_checked": bool(request.exclude_ingredients or preferences.get("allergies")),
@@ -179,3 +235,85 @@ class MealPlanService:
         
         return base_plan
 
+    @timed("meal_plan.shopping_list")
+    async def build_shopping_list(self, request: ShoppingListRequest) -> ShoppingListResponse:
+        """
+        Turn generated daily plans into a priced basket.
+
+        Ingredient quantities are aggregated and listed; supplements are bought
+        from the store set that minimizes packages + delivery fees + minimum
+        order top-ups (see app/ml/shopping.py).
+        """
+        price_index = get_price_index()
+        if price_index is None:
+            raise PriceIndexUnavailableError("Shopping lists need the price index (PRICE_INDEX_ENABLED)")
+        settings = get_settings()
+
+        ingredients, needs = aggregate_plan(request.plans)
+        offers = price_index.offers_for(list(needs))
+        excluded = set(request.exclude_store_ids or [])
+        if excluded:
+            offers = {
+                pid: {sid: offer for sid, offer in by_store.items() if sid not in excluded}
+                for pid, by_store in offers.items()
+            }
+        stores = price_index.stores()
+        product_ids, store_ids, cost, packages, fees, minimums = cost_matrix(needs, offers, stores)
+
+        selection = await get_cpu_executor().run(
+            solve_store_selection,
+            [cost, fees, minimums],
+            request.max_stores or settings.shopping_max_stores,
+            settings.shopping_time_budget_ms / 1000,
+            size=cost.size,
+        )
+
+        items = []
+        for row, (pid, col) in enumerate(zip(product_ids, selection.assignment)):
+            if not selection.covered[row]:
+                continue
+            offer = offers[pid][store_ids[col]]
+            items.append({
+                "product_id": pid,
+                "store_id": store_ids[col],
+                "servings_needed": round(needs[pid], 2),
+                "package_servings": offer.servings,
+                "package_quantity": int(packages[row, col]),
+                "unit_price": offer.price,
+                "total_price": round(float(cost[row, col]), 2),
+            })
+        orders = []
+        for col in selection.stores:
+            subtotal = sum(item["total_price"] for item in items if item["store_id"] == store_ids[col])
+            info = stores.get(store_ids[col])
+            orders.append({
+                "store_id": store_ids[col],
+                "store_name": info.name if info else "",
+                "subtotal": round(subtotal, 2),
+                "delivery_fee": float(fees[col]),
+                "min_order_amount": float(minimums[col]),
+                "min_order_top_up": round(max(0.0, float(minimums[col]) - subtotal), 2),
+            })
+
+        request_log.info(
+            f"Shopping list: {len(items)} products from {len(orders)} stores "
+            f"({selection.method}, {selection.evaluated} store sets)"
+        )
+        return ShoppingListResponse(
+            days=len(request.plans),
+            ingredients=[
+                {**entry, "grams": round(entry["grams"], 1)} for entry in ingredients.values()
+            ],
+            items=items,
+            stores=orders,
+            # Products without offers, and those no store within max_stores sells
+            unavailable_product_ids=[pid for pid in needs if pid not in offers or not offers[pid]]
+            + [pid for row, pid in enumerate(product_ids) if not selection.covered[row]],
+            total_cost=round(selection.total_cost, 2),
+            optimization={
+                "method": selection.method,
+                "complete": selection.complete,
+                "store_sets_evaluated": selection.evaluated,
+            },
+            generated_at=datetime.utcnow(),
+        )
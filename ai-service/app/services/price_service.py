@@ -0,0 +1,139 @@
+"""
+Loading and refreshing the product price index from the database
+
+The backend only exposes prices per product, so the index reads
+`product_prices` (with `product_packages`, `stores` and `products`) directly.
+`PriceIndexRefresher` fetches the rows changed since the index watermark every
+`PRICE_INDEX_REFRESH_SECONDS` and reloads the whole table every
+`PRICE_INDEX_FULL_REFRESH_SECONDS` (deleted rows leave nothing to pick up
+incrementally). Each process keeps its own index; `get_price_index()` returns
+it, or None when the index is disabled.
+"""
+from typing import Any, Dict, List, Optional
+import threading
+import time
+from app.config import get_settings
+from app.ml.pricing import PriceIndex
+from app.utils.logger import logger
+
+PRICE_ROWS_SQL = """
+SELECT pp.product_id::text AS product_id,
+       pp.store_id::text AS store_id,
+       pp.price,
+       pp.discount_price,
+       pp.in_stock,
+       s.active AS store_active,
+       s.name AS store_name,
+       s.delivery_fee,
+       s.min_order_amount,
+       p.available AS product_available,
+       pk.servings,
+       pk.weight_grams,
+       p.serving_size,
+       GREATEST(pp.updated_at, s.updated_at, p.updated_at, COALESCE(pk.updated_at, pp.updated_at)) AS changed_at
+FROM product_prices pp
+JOIN stores s ON s.id = pp.store_id
+JOIN products p ON p.id = pp.product_id
+LEFT JOIN product_packages pk ON pk.id = pp.package_id
+"""
+# Rows changed in the same instant as the watermark may have been committed after the
+# last read, so the boundary is re-read (applying a row twice is harmless)
+CHANGED_SINCE_SQL = (
+    PRICE_ROWS_SQL
+    + "WHERE GREATEST(pp.updated_at, s.updated_at, p.updated_at, COALESCE(pk.updated_at, pp.updated_at)) >= %s\n"
+)
+
+
+class PriceIndexUnavailableError(RuntimeError):
+    """Raised for features that need prices while the price index is disabled."""
+
+
+class PriceLoader:
+    """Reads price rows from PostgreSQL (blocking; runs off the event loop)."""
+
+    def __init__(self, database_url: str, connect_timeout: int = 10):
+        self.database_url = database_url
+        self.connect_timeout = connect_timeout
+
+    def load(self, since: Any = None) -> List[Dict[str, Any]]:
+        # Imported here: only deployments with the price index need the driver
+        import psycopg2
+        import psycopg2.extras
+
+        connection = psycopg2.connect(self.database_url, connect_timeout=self.connect_timeout)
+        try:
+            with connection.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cursor:
+                if since is None:
+                    cursor.execute(PRICE_ROWS_SQL)
+                else:
+                    cursor.execute(CHANGED_SINCE_SQL, (since,))
+                return [dict(row) for row in cursor.fetchall()]
+        finally:
+            connection.close()
+
+
+class PriceIndexRefresher:
+    """Background thread applying changed price rows every `interval` seconds."""
+
+    def __init__(self, index: PriceIndex, loader: PriceLoader, interval: float, full_interval: float):
+        self.index = index
+        self.loader = loader
+        self.interval = interval
+        self.full_interval = full_interval
+        self._last_full: Optional[float] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def refresh(self) -> bool:
+        full = (
+            self._last_full is None
+            or self.index.watermark is None
+            or time.monotonic() - self._last_full >= self.full_interval
+        )
+        try:
+            rows = self.loader.load(None if full else self.index.watermark)
+            changed = self.index.apply(rows, replace=full)
+        except Exception as e:
+            # Keep scoring with the prices we have
+            logger.warning(f"Price index refresh failed: {str(e)}")
+            return False
+        if full:
+            self._last_full = time.monotonic()
+            logger.info(f"Price index loaded: {len(self.index)} products with in-stock prices")
+        elif changed:
+            logger.debug(f"Price index: {changed} products changed their best price")
+        return True
+
+    def start(self) -> None:
+        self.refresh()
+        self._thread = threading.Thread(target=self._run, name="price-index-refresher", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.refresh()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+
+_price_index: Optional[PriceIndex] = None
+
+
+def create_price_index_refresher() -> PriceIndexRefresher:
+    global _price_index
+    settings = get_settings()
+    _price_index = PriceIndex()
+    return PriceIndexRefresher(
+        _price_index,
+        PriceLoader(settings.database_url),
+        interval=settings.price_index_refresh_seconds,
+        full_interval=settings.price_index_full_refresh_seconds,
+    )
+
+
+def get_price_index() -> Optional[PriceIndex]:
+    """This process's price index, or None when disabled (products then score without a price bonus)."""
+    return _price_index
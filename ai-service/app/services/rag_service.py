@@ -1,48 +1,158 @@
-from typing import List, Dict, Any, Optional
+import asyncio
+import threading
+from typing import AsyncIterator, List, Dict, Any, Optional, Tuple
+import numpy as np
+from fastapi import HTTPException, Request
 from app.services.embedding_service import EmbeddingService, get_embedding_service
+from app.services.llm_client import LLMClient
+from app.services.advice_cache import SemanticAdviceCache, get_advice_cache
 from app.utils.vector_store import VectorStore, get_vector_store
+from app.utils.knowledge_index import KnowledgeIndex, get_knowledge_index
+from app.utils.bm25_index import reciprocal_rank_fusion
 from app.utils.logger import logger
+from app.utils.metrics import timed
 from app.config import get_settings
-from openai import OpenAI
+
+KNOWLEDGE_COLLECTION = "nutritional_knowledge"
+
 
 class RagService:
     def __init__(
         self, 
         embedding_service: EmbeddingService, 
-        vector_store: VectorStore
+        vector_store: VectorStore,
+        advice_cache: Optional[SemanticAdviceCache] = None
     ):
         self.embedding_service = embedding_service
         self.vector_store = vector_store
-        self.collection_name = "nutritional_knowledge"
+        self.advice_cache = advice_cache
+        self.collection_name = KNOWLEDGE_COLLECTION
         self.settings = get_settings()
         
-        # Initialize OpenAI client if key is provided
-        self.openai_client = None
+        # Initialize async LLM client if key is provided
+        self.llm_client: Optional[LLMClient] = None
         if self.settings.openai_api_key:
             try:
-                self.openai_client = OpenAI(api_key=self.settings.openai_api_key)
+                self.llm_client = LLMClient(
+                    api_key=self.settings.openai_api_key,
+                    model=self.settings.openai_model,
+                    base_url=self.settings.openai_base_url,
+                    max_concurrency=self.settings.llm_max_concurrency,
+                    queue_timeout=self.settings.llm_queue_timeout_seconds,
+                    timeout=self.settings.llm_timeout_seconds,
+                )
                 logger.info("OpenAI client initialized for RAG")
             except Exception as e:
                 logger.error(f"Failed to initialize OpenAI client: {str(e)}")
 
-    async def get_relevant_context(self, query: str, n_results: int = 3) -> List[str]:
+    async def close(self) -> None:
+        if self.llm_client:
+            await self.llm_client.close()
+
+    @timed("rag.retrieve")
+    async def get_relevant_context(
+        self,
+        query: str,
+        n_results: int = 3,
+        user_profile: Optional[Dict[str, Any]] = None,
+        facets: Optional[Dict[str, Any]] = None,
+        query_embedding: Optional[List[float]] = None,
+    ) -> List[str]:
         """
         Retrieve relevant knowledge context for a given query.
+
+        When a user profile or explicit facets are given, the search is restricted to
+        documents whose metadata matches them (goal, targeted conditions, ...) using the
+        prebuilt facet bitmaps of the in-memory knowledge index.
+
+        The retrieval mode comes from `Settings.rag_retrieval_mode`; in "hybrid" mode
+        BM25 and dense results are fused with reciprocal rank fusion. A precomputed
+        `query_embedding` is reused instead of encoding the query again.
         """
         try:
-            query_embedding = self.embedding_service.generate_embeddings(query)
+            index = self._get_knowledge_index()
+            if index is not None and len(index):
+                mask = index.build_mask(user_profile, facets)
+                mode = self.settings.rag_retrieval_mode
+                if mode == "lexical":
+                    hits = index.lexical.search(query, n_results=n_results, mask=mask)
+                elif mode == "hybrid":
+                    hits = await self._hybrid_search(index, query, n_results, mask, query_embedding)
+                else:
+                    if query_embedding is None:
+                        query_embedding = await self._embed_query(query)
+                    hits = index.search(query_embedding, n_results=n_results, mask=mask)
+                return [index.documents[row] for row, _ in hits]
+
+            if query_embedding is None:
+                query_embedding = await self._embed_query(query)
             results = self.vector_store.query(
                 collection_name=self.collection_name,
                 query_embeddings=[query_embedding],
-                n_results=n_results
+                n_results=n_results,
+                where=self._build_where(facets),
             )
-            
+
             documents = results.get("documents", [[]])[0]
             return documents
         except Exception as e:
             logger.error(f"Error retrieving context for query '{query}': {str(e)}")
             return []
 
+    async def _hybrid_search(
+        self,
+        index: KnowledgeIndex,
+        query: str,
+        n_results: int,
+        mask: Optional[np.ndarray],
+        query_embedding: Optional[List[float]] = None,
+    ) -> List[Tuple[int, float]]:
+        """Run BM25 and dense search concurrently and fuse them with RRF."""
+        # Exact-term queries ("HMB", "ZMA") are answered lexically without embedding
+        if index.lexical.is_exact_term_query(query, self.settings.rag_exact_term_max_terms):
+            hits = index.lexical.search(query, n_results=n_results, mask=mask)
+            if hits:
+                return hits
+
+        candidates = max(n_results * 3, 10)
+        dense_task = None
+        if query_embedding is None:
+            dense_task = asyncio.create_task(self._embed_query(query))
+        lexical_hits = index.lexical.search(query, n_results=candidates, mask=mask)
+        if dense_task is not None:
+            query_embedding = await dense_task
+        dense_hits = index.search(query_embedding, n_results=candidates, mask=mask)
+
+        fused = reciprocal_rank_fusion([lexical_hits, dense_hits], k=self.settings.rag_rrf_k)
+        return fused[:n_results]
+
+    @timed("rag.embed")
+    async def _embed_query(self, query: str) -> List[float]:
+        # Encoding is CPU-bound; keep it off the event loop
+        return await asyncio.to_thread(self.embedding_service.generate_embeddings, query)
+
+    def _get_knowledge_index(self) -> Optional[KnowledgeIndex]:
+        try:
+            return get_knowledge_index(
+                self.vector_store, self.collection_name, self.settings.knowledge_index_check_seconds
+            )
+        except Exception as e:
+            logger.warning(f"Knowledge index unavailable, falling back to vector store query: {str(e)}")
+            return None
+
+    @staticmethod
+    def _build_where(facets: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Translate explicit facets into a ChromaDB `where` filter."""
+        if not facets:
+            return None
+        clauses = []
+        for field, values in facets.items():
+            if isinstance(values, (list, tuple, set)):
+                clauses.append({field: {"$in": list(values)}})
+            else:
+                clauses.append({field: values})
+        return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
     async def generate_personalized_advice(
         self, 
         user_profile: Dict[str, Any], 
@@ -50,8 +160,140 @@ class RagService:
     ) -> Dict[str, Any]:
         """
         Generate personalized advice based on user profile and retrieved knowledge using LLM.
+
+        Answers to semantically equivalent questions from the same profile bucket are
+        served from the advice cache without retrieval or an LLM call.
+        """
+        query_embedding, cached = await self._lookup_cached_advice(user_profile, query)
+        if cached is not None:
+            return cached
+
+        context = await self.get_relevant_context(
+            query, user_profile=user_profile, query_embedding=query_embedding
+        )
+        messages = self._build_messages(user_profile, query, context)
+
+        if self.llm_client:
+            try:
+                with timed("rag.llm"):
+                    advice = await self.llm_client.complete(messages)
+                status = "success"
+            except Exception as e:
+                logger.error(f"OpenAI API error: {str(e)}")
+                advice = self._generate_placeholder_advice(context)
+                status = "error_fallback"
+        else:
+            advice = self._generate_placeholder_advice(context)
+            status = "no_llm_key_fallback"
+
+        result = {
+            "advice": advice,
+            "sources": context,
+            "status": status
+        }
+        await self._store_advice(user_profile, query, query_embedding, result)
+        return result
+
+    async def stream_personalized_advice(
+        self,
+        user_profile: Dict[str, Any],
+        query: str
+    ) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Stream personalized advice as (event, data) pairs.
+
+        Yields a "token" event per completion delta and a final "done" event with the
+        sources and status. Without an LLM (or if it fails before the first token)
+        the placeholder advice is sent as a single token, as is a cached answer.
         """
-        context = await self.get_relevant_context(query)
+        query_embedding, cached = await self._lookup_cached_advice(user_profile, query)
+        if cached is not None:
+            yield "token", {"token": cached["advice"]}
+            yield "done", {"sources": cached["sources"], "status": cached["status"], "cached": True}
+            return
+
+        context = await self.get_relevant_context(
+            query, user_profile=user_profile, query_embedding=query_embedding
+        )
+        messages = self._build_messages(user_profile, query, context)
+
+        if not self.llm_client:
+            yield "token", {"token": self._generate_placeholder_advice(context)}
+            yield "done", {"sources": context, "status": "no_llm_key_fallback"}
+            return
+
+        tokens = []
+        status = "success"
+        try:
+            with timed("rag.llm_stream"):
+                async for token in self.llm_client.stream(messages):
+                    tokens.append(token)
+                    yield "token", {"token": token}
+        except Exception as e:
+            logger.error(f"OpenAI streaming error: {str(e)}")
+            if tokens:
+                status = "error"
+            else:
+                status = "error_fallback"
+                yield "token", {"token": self._generate_placeholder_advice(context)}
+
+        if status == "success":
+            await self._store_advice(
+                user_profile,
+                query,
+                query_embedding,
+                {"advice": "".join(tokens), "sources": context, "status": status},
+            )
+        yield "done", {"sources": context, "status": status}
+
+    async def _lookup_cached_advice(
+        self, user_profile: Dict[str, Any], query: str
+    ) -> Tuple[Optional[List[float]], Optional[Dict[str, Any]]]:
+        """Embed the query once and check the advice cache with it."""
+        if self.advice_cache is None:
+            return None, None
+        if not self.advice_cache.has_entries(user_profile):
+            # Nothing to compare against: don't undo the exact-term path's skipped embedding
+            self.advice_cache.record_miss()
+            return None, None
+        try:
+            query_embedding = await self._embed_query(query)
+        except Exception as e:
+            logger.error(f"Error embedding query for advice cache: {str(e)}")
+            return None, None
+
+        with timed("rag.cache_lookup"):
+            cached = self.advice_cache.lookup(user_profile, query_embedding)
+        if cached is not None:
+            logger.debug("Serving personalized advice from semantic cache")
+            cached["cached"] = True
+        return query_embedding, cached
+
+    async def _store_advice(
+        self,
+        user_profile: Dict[str, Any],
+        query: str,
+        query_embedding: Optional[List[float]],
+        result: Dict[str, Any]
+    ) -> None:
+        # Fallback answers are not worth caching
+        if self.advice_cache is None or result["status"] != "success":
+            return
+        if query_embedding is None:
+            # The lookup skipped embedding (empty bucket); an LLM answer is worth one encode
+            try:
+                query_embedding = await self._embed_query(query)
+            except Exception as e:
+                logger.error(f"Error embedding query for advice cache: {str(e)}")
+                return
+        self.advice_cache.store(user_profile, query_embedding, result)
+
+    def _build_messages(
+        self,
+        user_profile: Dict[str, Any],
+        query: str,
+        context: List[str]
+    ) -> List[Dict[str, str]]:
         context_str = "\n".join([f"- {doc}" for doc in context])
         
         # Construct the internal prompt
@@ -78,32 +320,10 @@ class RagService:
         Provide your personalized advice:
         """
 
-        if self.openai_client:
-            try:
-                response = self.openai_client.chat.completions.create(
-                    model=self.settings.openai_model,
-                    messages=[
-                        {"role": "system", "content": system_prompt},
-                        {"role": "user", "content": user_context_prompt}
-                    ],
-                    temperature=0.7,
-                    max_tokens=500
-                )
-                advice = response.choices[0].message.content
-                status = "success"
-            except Exception as e:
-                logger.error(f"OpenAI API error: {str(e)}")
-                advice = self._generate_placeholder_advice(context)
-                status = "error_fallback"
-        else:
-            advice = self._generate_placeholder_advice(context)
-            status = "no_llm_key_fallback"
-
-        return {
-            "advice": advice,
-            "sources": context,
-            "status": status
-        }
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_context_prompt}
+        ]
 
     def _generate_placeholder_advice(self, context: List[str]) -> str:
         """Fallback advice generation when LLM is unavailable."""
@@ -115,14 +335,51 @@ class RagService:
             advice += "I'll be able to provide more detailed advice once the knowledge base is fully populated and the LLM is connected."
         return advice
 
-def get_rag_service() -> RagService:
-    return RagService(
-        embedding_service=get_embedding_service(),
-        vector_store=get_vector_store()
-    )
+def create_rag_service(warm_up: bool = True) -> RagService:
+    """
+    Build the process-wide RagService.
 
-def get_rag_service() -> RagService:
-    return RagService(
+    With `warm_up` the embedding model is loaded and a dummy encode is run, and the
+    in-memory knowledge index is built, so the first user request doesn't pay for it.
+    Blocking; the app lifespan runs it in a worker thread.
+    """
+    service = RagService(
         embedding_service=get_embedding_service(),
-        vector_store=get_vector_store()
+        vector_store=get_vector_store(),
+        advice_cache=get_advice_cache()
     )
+    if warm_up:
+        service.embedding_service.generate_embeddings("warm-up query")
+        service._get_knowledge_index()
+        logger.info("RAG service warmed up")
+    return service
+
+
+async def get_rag_service(request: Request) -> RagService:
+    """
+    FastAPI dependency returning the RagService owned by the app lifespan.
+
+    Requests arriving before the startup warm-up has finished get a 503.
+    Without startup warm-up the service is created on first use.
+    """
+    service = getattr(request.app.state, "rag_service", None)
+    if service is not None:
+        return service
+
+    readiness = getattr(request.app.state, "readiness", None)
+    if readiness is not None and readiness.is_pending("rag"):
+        raise HTTPException(status_code=503, detail="AI advice service is warming up")
+
+    return await asyncio.to_thread(_create_on_first_use, request.app.state)
+
+
+_rag_service_lock = threading.Lock()
+
+
+def _create_on_first_use(state) -> RagService:
+    with _rag_service_lock:
+        service = getattr(state, "rag_service", None)
+        if service is None:
+            service = create_rag_service(warm_up=False)
+            state.rag_service = service
+        return service
@@ -4,20 +4,33 @@ Uses ML models to provide personalized product recommendations
 """
 from typing import List, Dict, Optional
 from datetime import datetime
+import math
+from app.config import get_settings
 from app.models.recommendation import (
     ProductRecommendationRequest,
     ProductRecommendationResponse,
     RecommendationsResponse,
 )
-from app.ml.scoring import ProductScorer
-from app.utils.logger import logger
-from app.utils.http_client import AsyncHTTPClient
+from app.ml.scoring import BASE_SCORE_COLUMN, PRICE_COLUMN, ProductScorer
+from app.ml.screening import screen_recommendations
+from app.services.catalog_service import get_catalog_snapshot
+from app.services.price_service import get_price_index
+from app.utils.capture import capture_active, capture_note
+from app.utils.cpu_executor import ExecutorOverloadedError, get_cpu_executor
+from app.utils.logger import logger, sampled_logger
+from app.utils.http_client import AsyncHTTPClient, decode_response
+from app.utils.metrics import timed
+from app.utils.ml_config import CompiledMLConfig, current_ml_config
+
+request_log = sampled_logger("recommendations.request")
 
 
 class RecommendationService:
     def __init__(self, backend_api_url: str):
         self.backend_api_url = backend_api_url
-        self.client = AsyncHTTPClient(timeout=30.0, max_retries=3, backoff_factor=0.5)
+        self.client = AsyncHTTPClient(
+            timeout=30.0, max_retries=3, backoff_factor=0.5, accept_msgpack=get_settings().backend_msgpack
+        )
         self.scorer = ProductScorer()
 
     async def get_ai_recommendations(
@@ -28,46 +41,72 @@ class RecommendationService:
         
         Enhanced implementation that:
         1. Fetches base recommendations from backend API
-        2. Fetches nutritional needs for personalized scoring
-        3. Enhances them with advanced AI scoring
-        4. Returns improved recommendations with confidence scores
+        2. Screens out contraindicated and excluded products
+        3. Fetches nutritional needs for personalized scoring
+        4. Enhances them with advanced AI scoring
+        5. Returns improved recommendations with confidence scores
         """
         try:
-            logger.info(f"Generating AI recommendations for user {request.user_id}")
+            request_log.info(f"Generating AI recommendations for user {request.user_id}")
+            # One config version for the whole request, even if a reload happens meanwhile
+            config = current_ml_config()
             
             # Fetch base recommendations from backend
-            rec_response = await self.client.get(
-                f"{self.backend_api_url}/api/v1/recommendations",
-                headers={"X-User-ID": request.user_id},
-            )
+            with timed("recommendations.fetch_base"):
+                rec_response = await self.client.get(
+                    f"{self.backend_api_url}/api/v1/recommendations",
+                    headers={"X-User-ID": request.user_id},
+                )
             
             if rec_response.status_code != 200:
                 logger.warning(f"Backend API returned {rec_response.status_code}")
                 raise Exception(f"Backend API returned {rec_response.status_code}")
             
-            data = rec_response.json()
+            data = decode_response(rec_response)
             base_recommendations = data.get("data", [])
+            backend_recommendations = base_recommendations
+            
+            # Unsafe and excluded products are dropped before anything is scored
+            with timed("recommendations.screen"):
+                base_recommendations, penalties = screen_recommendations(
+                    base_recommendations,
+                    request.diseases,
+                    request.medications,
+                    request.allergies,
+                    request.exclude_product_ids,
+                )
+            if capture_active():
+                kept = {(rec.get("product") or {}).get("id") for rec in base_recommendations}
+                capture_note(
+                    screened_out_ids=[
+                        product_id
+                        for product_id in ((rec.get("product") or {}).get("id") for rec in backend_recommendations)
+                        if product_id not in kept
+                    ]
+                )
             
             if not base_recommendations:
                 logger.warning("No base recommendations found")
-                return RecommendationsResponse(
+                return RecommendationsResponse.model_construct(
                     recommendations=[],
                     generated_at=datetime.utcnow(),
                     user_profile_summary={
                         "goal": request.goal,
                         "activity_level": request.activity_level,
                     },
+                    ml_config_version=config.version,
                 )
             
             # Fetch nutritional needs for enhanced scoring
             nutritional_needs = None
             try:
-                nutrition_response = await self.client.get(
-                    f"{self.backend_api_url}/api/v1/nutrition/calculate",
-                    headers={"X-User-ID": request.user_id},
-                )
+                with timed("recommendations.fetch_needs"):
+                    nutrition_response = await self.client.get(
+                        f"{self.backend_api_url}/api/v1/nutrition/calculate",
+                        headers={"X-User-ID": request.user_id},
+                    )
                 if nutrition_response.status_code == 200:
-                    nutrition_data = nutrition_response.json()
+                    nutrition_data = decode_response(nutrition_response)
                     if nutrition_data.get("success"):
                         needs_data = nutrition_data.get("data", {})
                         nutritional_needs = {
@@ -76,37 +115,130 @@ class RecommendationService:
                             "carbs": needs_data.get("carbs", 0),
                             "fats": needs_data.get("fats", 0),
                         }
-                        logger.info(f"Using nutritional needs: {nutritional_needs}")
+                        logger.debug(f"Using nutritional needs: {nutritional_needs}")
             except Exception as e:
                 logger.warning(f"Could not fetch nutritional needs: {str(e)}, using defaults")
             
+            # Score the whole batch (in the CPU process pool for large catalogs)
+            ai_scores = await self._score_products(
+                base_recommendations, self._build_user_profile(request), nutritional_needs, config
+            )
+            if penalties.any():
+                # Lower-severity contraindications cost score points
+                ai_scores = [max(0.0, round(score - float(penalty), 2)) for score, penalty in zip(ai_scores, penalties)]
+            if capture_active():
+                capture_note(
+                    profile=self._build_user_profile(request),
+                    needs=nutritional_needs,
+                    penalties=penalties.tolist(),
+                    served_scores=ai_scores,
+                    ml_config_version=config.version,
+                )
+            
             # Enhance with AI scoring
             enhanced = self._enhance_recommendations(
-                base_recommendations, request, nutritional_needs
+                base_recommendations, request, nutritional_needs, ai_scores, config
             )
             
-            logger.info(f"Generated {len(enhanced)} enhanced recommendations")
+            request_log.info(f"Generated {len(enhanced)} enhanced recommendations")
             
-            return RecommendationsResponse(
-                recommendations=enhanced,
-                generated_at=datetime.utcnow(),
-                user_profile_summary={
-                    "goal": request.goal,
-                    "activity_level": request.activity_level,
-                    "age": request.age,
-                    "gender": request.gender,
-                },
-            )
+            with timed("recommendations.build_response"):
+                # Built from values that already have the field types: no re-validation
+                return RecommendationsResponse.model_construct(
+                    recommendations=enhanced,
+                    generated_at=datetime.utcnow(),
+                    user_profile_summary={
+                        "goal": request.goal,
+                        "activity_level": request.activity_level,
+                        "age": request.age,
+                        "gender": request.gender,
+                    },
+                    ml_config_version=config.version,
+                )
             
+        except ExecutorOverloadedError:
+            raise
         except Exception as e:
             logger.error(f"Failed to get recommendations: {str(e)}")
             raise Exception(f"Failed to get recommendations: {str(e)}")
 
+    @staticmethod
+    def _build_user_profile(request: ProductRecommendationRequest) -> Dict:
+        return {
+            "goal": request.goal,
+            "activity_level": request.activity_level,
+            "age": request.age,
+            "gender": request.gender,
+            "weight": request.weight,
+            "height": request.height if hasattr(request, "height") else 175,
+        }
+
+    @timed("recommendations.score")
+    async def _score_products(
+        self,
+        base_recommendations: List[Dict],
+        user_profile: Dict,
+        nutritional_needs: Optional[Dict] = None,
+        config: Optional[CompiledMLConfig] = None,
+    ) -> List[float]:
+        """
+        Batch-score all products with `ProductScorer.calculate_scores_batch`.
+
+        Prices per serving come from the price index, when enabled. Large batches
+        run in the CPU process pool with the feature matrix passed through shared
+        memory; small ones run inline. The config is passed
+        explicitly so pool processes score with the same version as this worker.
+        """
+        products = [rec.get("product", {}) for rec in base_recommendations]
+        base_scores = [rec.get("score", 50) for rec in base_recommendations]
+        features, type_names = self._catalog_features(products, base_scores)
+        if features is None:
+            features, type_names = self.scorer.product_features(products, base_scores)
+        price_index = get_price_index()
+        if price_index is not None:
+            features[:, PRICE_COLUMN] = price_index.lookup([p.get("id", "") for p in products])
+        if capture_active():
+            # Candidates as scored, with the index price the replay would not know
+            prices = features[:, PRICE_COLUMN].tolist()
+            capture_note(
+                candidates=[
+                    {**product, "price_per_serving": price} if not math.isnan(price) else product
+                    for product, price in zip(products, prices)
+                ],
+                base_scores=base_scores,
+            )
+        scores = await get_cpu_executor().run(
+            ProductScorer.calculate_scores_batch,
+            [features],
+            type_names,
+            user_profile,
+            nutritional_needs,
+            config or current_ml_config(),
+        )
+        return scores.tolist()
+
+    @staticmethod
+    def _catalog_features(products: List[Dict], base_scores: List[float]):
+        """Feature rows from the shared catalog, or (None, None) if a product isn't in it."""
+        snapshot = get_catalog_snapshot()
+        if snapshot is None:
+            return None, None
+        rows = snapshot.product_rows([p.get("id", "") for p in products])
+        if rows is None:
+            return None, None
+        # Fancy indexing copies just these rows out of the shared segment
+        features = snapshot.products[rows]
+        features[:, BASE_SCORE_COLUMN] = base_scores
+        return features, snapshot.type_names
+
+    @timed("recommendations.enhance")
     def _enhance_recommendations(
         self,
         base_recommendations: List[Dict],
         request: ProductRecommendationRequest,
         nutritional_needs: Optional[Dict] = None,
+        ai_scores: Optional[List[float]] = None,
+        config: Optional[CompiledMLConfig] = None,
     ) -> List[ProductRecommendationResponse]:
         """
         Enhance recommendations with AI scoring
@@ -115,29 +247,29 @@ class RecommendationService:
             base_recommendations: Base recommendations from backend
             request: Request with user profile data
             nutritional_needs: Optional pre-calculated nutritional needs
+            ai_scores: Optional precomputed scores (one per recommendation)
+            config: ML config version (default: the current one)
         """
         enhanced = []
+        config = config or current_ml_config()
         
-        user_profile = {
-            "goal": request.goal,
-            "activity_level": request.activity_level,
-            "age": request.age,
-            "gender": request.gender,
-            "weight": request.weight,
-            "height": request.height if hasattr(request, "height") else 175,
-        }
+        user_profile = self._build_user_profile(request)
         
-        for rec in base_recommendations:
+        for i, rec in enumerate(base_recommendations):
             product = rec.get("product", {})
             base_score = rec.get("score", 50)
             
             # Calculate enhanced AI score with nutritional needs
-            ai_score = self.scorer.calculate_score(
-                product,
-                user_profile,
-                base_score,
-                nutritional_needs,
-            )
+            if ai_scores is not None:
+                ai_score = ai_scores[i]
+            else:
+                ai_score = self.scorer.calculate_score(
+                    product,
+                    user_profile,
+                    base_score,
+                    nutritional_needs,
+                    config,
+                )
             
             # Calculate confidence with product data
             confidence = self.scorer.calculate_confidence(
@@ -146,6 +278,7 @@ class RecommendationService:
                 user_profile,
                 rec.get("reasons", []),
                 product,  # Pass product for brand verification
+                config,
             )
             
             # Enhance reasons based on AI analysis
@@ -157,10 +290,11 @@ class RecommendationService:
             )
             
             enhanced.append(
-                ProductRecommendationResponse(
+                ProductRecommendationResponse.model_construct(
                     product_id=product.get("id", ""),
-                    score=ai_score,
-                    confidence=round(confidence, 2),
+                    # float() as validation would: the JSON must read 0.0, not 0
+                    score=float(ai_score),
+                    confidence=float(round(confidence, 2)),
                     reasons=enhanced_reasons,
                     warnings=rec.get("warnings", []),
                     dosage_recommendation=self._suggest_dosage(product, user_profile),
@@ -174,6 +308,7 @@ class RecommendationService:
         max_products = request.max_products or 10
         return enhanced[:max_products]
 
+    @timed("recommendations.reasons")
     def _generate_ai_reasons(
         self,
         product: Dict,
@@ -259,7 +394,8 @@ class RecommendationService:
         if product_type == "protein":
             # Protein: 1.6-2.2g per kg bodyweight
             daily_protein_needs = weight * 2.0
-            serving_protein = product.get("macros", {}).get("protein", 20)
+            # Missing or zero protein per serving falls back to a typical 20g scoop
+            serving_protein = (product.get("macros") or {}).get("protein") or 20
             servings = max(1, int(daily_protein_needs / (serving_protein * 3)))  # Split across meals
             dosage["servings_per_day"] = servings
             dosage["timing"] = "post_workout and between meals"
@@ -0,0 +1,143 @@
+"""
+In-memory BM25 inverted index for lexical retrieval.
+
+Short supplement names (HMB, ZMA, beta-alanine) are matched exactly here instead of
+relying on sentence embeddings. Per-posting BM25 weights are precomputed at build
+time, so a query is a scatter-add over the postings of its terms.
+"""
+from typing import Dict, List, Optional, Sequence, Tuple
+import math
+import re
+import numpy as np
+
+_TOKEN_RE = re.compile(r"[^\W_]+(?:-[^\W_]+)*", re.UNICODE)
+
+STOPWORDS = frozenset(
+    {
+        "a", "an", "and", "are", "as", "at", "be", "by", "can", "do", "does", "for",
+        "from", "how", "i", "in", "is", "it", "my", "of", "on", "or", "should", "the",
+        "to", "what", "when", "which", "with", "you", "your",
+    }
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercase word tokens without stopwords.
+
+    Hyphenated compounds are kept whole and also split into their parts, so
+    "beta-alanine" matches both "beta-alanine" and "alanine".
+    """
+    tokens = []
+    for match in _TOKEN_RE.finditer(text.lower()):
+        token = match.group(0)
+        if token in STOPWORDS:
+            continue
+        tokens.append(token)
+        if "-" in token:
+            tokens.extend(part for part in token.split("-") if part not in STOPWORDS)
+    return tokens
+
+
+def query_terms(text: str) -> List[str]:
+    """Distinct whole-word terms of a query (hyphenated compounds not split)."""
+    seen = []
+    for match in _TOKEN_RE.finditer(text.lower()):
+        token = match.group(0)
+        if token not in STOPWORDS and token not in seen:
+            seen.append(token)
+    return seen
+
+
+class BM25Index:
+    """Okapi BM25 over a fixed list of documents addressed by row number."""
+
+    def __init__(self, documents: Sequence[str], k1: float = 1.5, b: float = 0.75):
+        self.size = len(documents)
+        self.k1 = k1
+        self.b = b
+
+        term_rows: Dict[str, Dict[int, int]] = {}
+        doc_lengths = np.zeros(self.size, dtype=np.float32)
+        for row, document in enumerate(documents):
+            tokens = tokenize(document or "")
+            doc_lengths[row] = len(tokens)
+            for token in tokens:
+                counts = term_rows.setdefault(token, {})
+                counts[row] = counts.get(row, 0) + 1
+
+        avg_length = float(doc_lengths.mean()) if self.size else 0.0
+        self._postings: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        for term, counts in term_rows.items():
+            rows = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+            tfs = np.fromiter(counts.values(), dtype=np.float32, count=len(counts))
+            df = len(counts)
+            idf = math.log(1 + (self.size - df + 0.5) / (df + 0.5))
+            norm = k1 * (1 - b + b * doc_lengths[rows] / avg_length) if avg_length else k1
+            weights = idf * tfs * (k1 + 1) / (tfs + norm)
+            self._postings[term] = (rows, weights.astype(np.float32))
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __contains__(self, term: str) -> bool:
+        return term in self._postings
+
+    def is_exact_term_query(self, query: str, max_terms: int = 3) -> bool:
+        """True for short queries whose terms all occur verbatim in the corpus."""
+        terms = query_terms(query)
+        return 0 < len(terms) <= max_terms and all(term in self._postings for term in terms)
+
+    def scores(self, query: str) -> np.ndarray:
+        scores = np.zeros(self.size, dtype=np.float32)
+        for term in set(tokenize(query)):
+            posting = self._postings.get(term)
+            if posting is not None:
+                rows, weights = posting
+                scores[rows] += weights
+        return scores
+
+    def search(
+        self,
+        query: str,
+        n_results: int = 3,
+        mask: Optional[np.ndarray] = None,
+    ) -> List[Tuple[int, float]]:
+        """
+        Rank documents by BM25 score.
+
+        Returns:
+            List of (row, score) pairs with a positive score, best first.
+        """
+        if not self.size or n_results <= 0:
+            return []
+
+        scores = self.scores(query)
+        if mask is not None:
+            scores[~mask] = 0.0
+
+        rows = np.flatnonzero(scores > 0)
+        if rows.size == 0:
+            return []
+
+        k = min(n_results, rows.size)
+        top = rows[np.argpartition(-scores[rows], k - 1)[:k]]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(int(row), float(scores[row])) for row in top]
+
+
+def reciprocal_rank_fusion(
+    result_lists: Sequence[Sequence[Tuple[int, float]]],
+    k: int = 60,
+) -> List[Tuple[int, float]]:
+    """
+    Fuse several ranked (row, score) lists with reciprocal rank fusion.
+
+    Each list contributes 1 / (k + rank) per row; raw scores are ignored, so
+    lexical and dense scores on different scales can be combined.
+    """
+    fused: Dict[int, float] = {}
+    for results in result_lists:
+        for rank, (row, _) in enumerate(results, start=1):
+            fused[row] = fused.get(row, 0.0) + 1.0 / (k + rank)
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
@@ -0,0 +1,352 @@
+"""
+Sampled request capture for offline replay
+
+`CaptureMiddleware` samples a fraction of the requests to the capture routes
+(`/recommendations/ai`, `/meal-plan/generate/ai`, `/advice/personalized`).
+For a sampled request it keeps the raw request and response bodies, and the
+services add what they scored through `capture_note()`:
+
+    if capture_active():
+        capture_note(candidates=products, base_scores=base_scores)
+
+(the backend candidates, profile, targets and served scores; see the capture
+format in app/ml/replay.py). Notes must not be mutated after they are noted.
+
+The request path only appends the record to a bounded queue. A writer thread
+parses the bodies, replaces user ids with keyed hashes (HMAC-SHA256, so the
+same user gets the same id across records without the id being recoverable),
+and writes gzip-compressed JSON lines. Files are rotated by size and age; the
+file being written ends with `.open` and is renamed to `.jsonl.gz` when done.
+When the queue is full, records are dropped and counted.
+"""
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+import gzip
+import hashlib
+import hmac
+import json
+import os
+import queue
+import random
+import threading
+import time
+from app.utils.capture_format import CAPTURE_VERSION
+from app.utils.metrics import CAPTURE_DROPPED, CAPTURE_WRITTEN
+from app.utils.msgpack_codec import is_msgpack, unpackb
+
+# Route -> record kind (the replay harness reads "recommendations" and "meal_plan")
+CAPTURE_ROUTES = {
+    "/recommendations/ai": "recommendations",
+    "/meal-plan/generate/ai": "meal_plan",
+    "/advice/personalized": "advice",
+}
+
+# Keys whose values identify a user; hashed wherever they occur in a record
+ID_FIELDS = frozenset({"user_id", "userId", "x-user-id"})
+
+_notes: ContextVar[Optional[Dict[str, Any]]] = ContextVar("capture_notes", default=None)
+
+
+def capture_active() -> bool:
+    """Whether the current request is being captured."""
+    return _notes.get() is not None
+
+
+def capture_note(**fields: Any) -> None:
+    """Add fields to the current request's capture record (no-op when not sampled)."""
+    notes = _notes.get()
+    if notes is not None:
+        notes.update(fields)
+
+
+def hash_id(value: Any, key: bytes) -> str:
+    return hmac.new(key, str(value).encode("utf-8"), hashlib.sha256).hexdigest()[:16]
+
+
+def redact(value: Any, key: bytes) -> Any:
+    """Copy of a JSON-like value with every ID_FIELDS value hashed."""
+    if isinstance(value, dict):
+        return {
+            k: (hash_id(v, key) if k in ID_FIELDS and v is not None else redact(v, key))
+            for k, v in value.items()
+        }
+    if isinstance(value, list):
+        return [redact(v, key) for v in value]
+    return value
+
+
+def _parse_body(body: bytes, content_type: Optional[str] = None) -> Any:
+    if not body:
+        return None
+    try:
+        # Bodies are JSON or, when negotiated, msgpack; records are JSON either way
+        return unpackb(body) if is_msgpack(content_type) else json.loads(body)
+    except ValueError:
+        return {"unparsed_bytes": len(body)}
+
+
+class RotatingCaptureFile:
+    """
+    gzip JSON lines in `directory`, one file per `max_bytes` (compressed) or
+    `max_age` seconds. At most `max_files` finished files are kept.
+    """
+
+    SUFFIX = ".jsonl.gz"
+
+    def __init__(self, directory: str, prefix: str = "capture", max_bytes: int = 64 << 20,
+                 max_age: float = 3600.0, max_files: int = 200):
+        self.directory = directory
+        self.prefix = prefix
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.max_files = max_files
+        self._raw = None
+        self._gzip: Optional[gzip.GzipFile] = None
+        self._path = ""
+        self._opened = 0.0
+
+    def write(self, lines: List[bytes]) -> None:
+        if self._gzip is None:
+            self._open()
+        self._gzip.write(b"".join(lines))
+        if self._raw.tell() >= self.max_bytes:
+            self.close()
+
+    def rotate_if_old(self) -> None:
+        if self._gzip is not None and time.monotonic() - self._opened >= self.max_age:
+            self.close()
+
+    def close(self) -> None:
+        """Finish the current file and make it visible under its final name."""
+        if self._gzip is None:
+            return
+        self._gzip.close()
+        self._raw.close()
+        os.replace(self._path + ".open", self._path)
+        self._gzip = self._raw = None
+        self._prune()
+
+    def _open(self) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S")
+        # The pid keeps workers of one host apart, the random suffix fast rotations
+        name = f"{self.prefix}_{stamp}_{os.getpid()}_{random.randrange(1 << 16):04x}{self.SUFFIX}"
+        self._path = os.path.join(self.directory, name)
+        self._raw = open(self._path + ".open", "wb")
+        self._gzip = gzip.GzipFile(fileobj=self._raw, mode="wb", compresslevel=6)
+        self._opened = time.monotonic()
+
+    def _prune(self) -> None:
+        finished = sorted(
+            name for name in os.listdir(self.directory)
+            if name.startswith(self.prefix + "_") and name.endswith(self.SUFFIX)
+        )
+        for name in finished[:max(0, len(finished) - self.max_files)]:
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                pass
+
+
+class RequestCapture:
+    """
+    Sampling decision plus the background writer.
+
+    Args:
+        output: Where encoded lines go (a RotatingCaptureFile).
+        sample_rate: Fraction of capture-route requests recorded.
+        hash_key: HMAC key for user ids.
+        max_queue: Records buffered before new ones are dropped.
+    """
+
+    def __init__(self, output: RotatingCaptureFile, sample_rate: float, hash_key: bytes, max_queue: int = 1000):
+        self.output = output
+        self.sample_rate = min(max(sample_rate, 0.0), 1.0)
+        self.hash_key = hash_key
+        self.max_queue = max_queue
+        self.written = 0
+        self.dropped = 0
+        self._start()
+        # A forked worker inherits the queue but not the writer thread
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._start)
+
+    def _start(self) -> None:
+        self._queue: queue.Queue = queue.Queue(maxsize=self.max_queue)
+        self._thread = threading.Thread(target=self._run, name="capture-writer", daemon=True)
+        self._thread.start()
+
+    def sample(self) -> bool:
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def submit(self, entry: Dict[str, Any]) -> None:
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            self.dropped += 1
+            CAPTURE_DROPPED.inc(kind=entry["kind"])
+
+    def encode(self, entry: Dict[str, Any]) -> bytes:
+        """A queued entry as a capture line (replay format, see app/ml/replay.py)."""
+        request = _parse_body(entry.pop("request_body"), entry.pop("request_type", None))
+        response = _parse_body(entry.pop("response_body"), entry.pop("response_type", None))
+        notes = entry.pop("notes")
+        user_id = entry.pop("user_id") or (request.get("user_id") if isinstance(request, dict) else None)
+        record = {
+            "v": CAPTURE_VERSION,
+            **entry,
+            "user": hash_id(user_id, self.hash_key) if user_id else None,
+            "request": request,
+            "response": response,
+            **notes,
+        }
+        record = redact(record, self.hash_key)
+        return (json.dumps(record, ensure_ascii=False, default=str) + "\n").encode("utf-8")
+
+    def _run(self) -> None:
+        while True:
+            try:
+                batch = [self._queue.get(timeout=1.0)]
+            except queue.Empty:
+                self._safely(self.output.rotate_if_old)
+                continue
+            while len(batch) < 256:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            lines = []
+            for entry in batch:
+                kind = entry["kind"]
+                try:
+                    lines.append(self.encode(entry))
+                    CAPTURE_WRITTEN.inc(kind=kind)
+                except Exception:
+                    self.dropped += 1
+                    CAPTURE_DROPPED.inc(kind=kind)
+            if lines and self._safely(self.output.write, lines):
+                self.written += len(lines)
+            self._safely(self.output.rotate_if_old)
+            for _ in batch:
+                self._queue.task_done()
+
+    @staticmethod
+    def _safely(fn, *args) -> bool:
+        # A full disk must not kill the writer thread
+        try:
+            fn(*args)
+            return True
+        except OSError:
+            return False
+
+    def flush(self, timeout: float = 5.0) -> None:
+        """Wait (bounded) for queued records, then finish the current file."""
+        done = threading.Event()
+        threading.Thread(target=lambda: (self._queue.join(), done.set()), daemon=True).start()
+        done.wait(timeout)
+        self._safely(self.output.close)
+
+    def stats(self) -> Dict:
+        return {
+            "sample_rate": self.sample_rate,
+            "queued": self._queue.qsize(),
+            "max_queue": self.max_queue,
+            "written": self.written,
+            "dropped": self.dropped,
+        }
+
+
+class CaptureMiddleware:
+    """ASGI middleware recording sampled requests to the capture routes."""
+
+    def __init__(self, app, capture: RequestCapture, routes: Optional[Dict[str, str]] = None):
+        self.app = app
+        self.capture = capture
+        self.routes = routes or CAPTURE_ROUTES
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST":
+            await self.app(scope, receive, send)
+            return
+        kind = self.routes.get(scope["path"])
+        if kind is None or not self.capture.sample():
+            await self.app(scope, receive, send)
+            return
+
+        request_chunks: List[bytes] = []
+        response_chunks: List[bytes] = []
+        status = 500
+        response_type: Optional[bytes] = None
+
+        async def receive_and_keep():
+            message = await receive()
+            if message["type"] == "http.request":
+                request_chunks.append(message.get("body", b""))
+            return message
+
+        async def send_and_keep(message):
+            nonlocal status, response_type
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                response_type = dict(message.get("headers") or []).get(b"content-type")
+            elif message["type"] == "http.response.body":
+                response_chunks.append(message.get("body", b""))
+            await send(message)
+
+        notes: Dict[str, Any] = {}
+        token = _notes.set(notes)
+        ts = time.time()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive_and_keep, send_and_keep)
+        finally:
+            _notes.reset(token)
+            headers = dict(scope.get("headers") or [])
+            user_id = headers.get(b"x-user-id")
+            request_type = headers.get(b"content-type")
+            self.capture.submit({
+                "kind": kind,
+                "ts": round(ts, 3),
+                "route": scope["path"],
+                "status": status,
+                "duration_ms": round((time.perf_counter() - started) * 1000, 2),
+                "user_id": user_id.decode("latin-1") if user_id else None,
+                "request_body": b"".join(request_chunks),
+                "response_body": b"".join(response_chunks),
+                "request_type": request_type.decode("latin-1") if request_type else None,
+                "response_type": response_type.decode("latin-1") if response_type else None,
+                "notes": notes,
+            })
+
+
+_capture: Optional[RequestCapture] = None
+
+
+def create_request_capture() -> RequestCapture:
+    """The process-wide capture writer from settings."""
+    global _capture
+    if _capture is None:
+        from app.config import get_settings
+        from app.utils.logger import logger
+
+        settings = get_settings()
+        key = settings.capture_hash_key
+        if not key:
+            # Still unlinkable, but hashes differ between processes and restarts
+            key = os.urandom(32).hex()
+            logger.warning("CAPTURE_HASH_KEY is not set: captured user ids use a random per-process key")
+        output = RotatingCaptureFile(
+            settings.capture_dir,
+            max_bytes=int(settings.capture_max_file_mb * (1 << 20)),
+            max_age=settings.capture_rotate_seconds,
+            max_files=settings.capture_max_files,
+        )
+        _capture = RequestCapture(
+            output, settings.capture_sample_rate, key.encode("utf-8"), max_queue=settings.capture_queue_size
+        )
+    return _capture
+
+
+def get_request_capture() -> Optional[RequestCapture]:
+    return _capture
@@ -0,0 +1,9 @@
+"""
+Version of the capture record format
+
+Shared by the capture middleware (app/utils/capture.py), which writes records,
+and the offline replay harness (app/ml/replay.py, scripts/replay.py), which
+reads them. Kept free of imports so the offline side doesn't load the web stack.
+"""
+
+CAPTURE_VERSION = 1
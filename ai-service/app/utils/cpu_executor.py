@@ -0,0 +1,225 @@
+"""
+Process-pool executor for CPU-bound planning and scoring stages
+
+Heavy numeric stages (batch product scoring, meal ranking) run in a
+`ProcessPoolExecutor` so a large request doesn't stall the event loop of the
+worker. Input arrays are handed to the child processes through
+`multiprocessing.shared_memory` instead of being pickled; only small arguments
+and the result travel through the pool's pipe.
+
+* Admission limit — at most `max_pending` tasks may be submitted or running;
+  further requests fail fast with `ExecutorOverloadedError` (mapped to 503).
+* Inline fallback — inputs smaller than `inline_threshold` items run directly in
+  the calling thread, where process start-up and IPC would cost more than the work.
+* Metrics — queue depth, peak, rejections and task timings via `stats()`.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from multiprocessing import get_context
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+import asyncio
+import threading
+import time
+import numpy as np
+from app.config import get_settings
+from app.utils.logger import logger
+
+
+class ExecutorOverloadedError(Exception):
+    """Raised when the CPU executor already has `max_pending` tasks in flight."""
+
+
+@dataclass(frozen=True)
+class SharedArrayHandle:
+    """Picklable reference to a numpy array living in a shared memory segment."""
+    name: str
+    shape: Tuple[int, ...]
+    dtype: str
+
+
+class SharedArray:
+    """Owner side of a shared array: copies the data in, unlinks on close."""
+
+    def __init__(self, array: np.ndarray):
+        array = np.ascontiguousarray(array)
+        # Zero-sized segments are not allowed
+        self._shm = SharedMemory(create=True, size=max(array.nbytes, 1))
+        view = np.ndarray(array.shape, dtype=array.dtype, buffer=self._shm.buf)
+        view[...] = array
+        del view
+        self.handle = SharedArrayHandle(self._shm.name, array.shape, array.dtype.str)
+
+    def close(self) -> None:
+        self._shm.close()
+        self._shm.unlink()
+
+
+def call_with_shared_arrays(
+    fn: Callable[..., Any], handles: Sequence[SharedArrayHandle], args: Tuple
+) -> Any:
+    """
+    Child-side entry point: attach the shared arrays and call `fn(*arrays, *args)`.
+
+    `fn` must not return views of its input arrays, since the segments are
+    detached as soon as it returns.
+    """
+    segments: List[SharedMemory] = []
+    arrays: List[np.ndarray] = []
+    try:
+        for handle in handles:
+            # Pool processes share the owner's resource tracker, so attaching here
+            # doesn't register the segment a second time; the owner unlinks it
+            shm = SharedMemory(name=handle.name)
+            segments.append(shm)
+            arrays.append(np.ndarray(handle.shape, dtype=np.dtype(handle.dtype), buffer=shm.buf))
+        return fn(*arrays, *args)
+    finally:
+        del arrays
+        for shm in segments:
+            shm.close()
+
+
+class CpuExecutor:
+    def __init__(
+        self,
+        max_workers: int = 2,
+        max_pending: int = 16,
+        inline_threshold: int = 2000,
+        enabled: bool = True,
+        start_method: str = "spawn",
+    ):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.inline_threshold = inline_threshold
+        self.enabled = enabled and max_workers > 0
+        self.start_method = start_method
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+        self.pending = 0
+        self.peak_pending = 0
+        self.submitted = 0
+        self.inline = 0
+        self.rejected = 0
+        self.completed = 0
+        self.failed = 0
+        self._task_seconds = 0.0
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                # Spawned (not forked) children: the parent runs an event loop and
+                # library thread pools that must not be duplicated by fork
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers, mp_context=get_context(self.start_method)
+                )
+                logger.info(f"CPU executor started with {self.max_workers} processes")
+            return self._pool
+
+    async def run(
+        self,
+        fn: Callable[..., Any],
+        arrays: Sequence[np.ndarray],
+        *args: Any,
+        size: Optional[int] = None,
+    ) -> Any:
+        """
+        Run `fn(*arrays, *args)`, in the process pool unless the input is small.
+
+        Args:
+            fn: Module-level (picklable) function.
+            arrays: Large inputs, passed through shared memory.
+            args: Small picklable arguments.
+            size: Work size compared with `inline_threshold` (defaults to len(arrays[0])).
+        """
+        if size is None:
+            size = len(arrays[0]) if arrays else 0
+        if not self.enabled or size < self.inline_threshold:
+            self.inline += 1
+            return fn(*arrays, *args)
+
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise ExecutorOverloadedError(
+                f"CPU executor is at capacity ({self.pending} tasks pending)"
+            )
+
+        self.pending += 1
+        self.submitted += 1
+        self.peak_pending = max(self.peak_pending, self.pending)
+        shared: List[SharedArray] = []
+        started = time.perf_counter()
+        try:
+            shared = [SharedArray(array) for array in arrays]
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(
+                self._get_pool(),
+                call_with_shared_arrays,
+                fn,
+                [s.handle for s in shared],
+                args,
+            )
+            self.completed += 1
+            return result
+        except BrokenProcessPool:
+            self.failed += 1
+            logger.error("CPU executor process pool broke; it will be restarted on next use")
+            with self._lock:
+                self._pool = None
+            raise
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self._task_seconds += time.perf_counter() - started
+            self.pending -= 1
+            for array in shared:
+                array.close()
+
+    def stats(self) -> Dict[str, Any]:
+        finished = self.completed + self.failed
+        return {
+            "enabled": self.enabled,
+            "workers": self.max_workers,
+            "max_pending": self.max_pending,
+            "inline_threshold": self.inline_threshold,
+            "pending": self.pending,
+            # Tasks waiting for a free process
+            "queue_depth": max(0, self.pending - self.max_workers),
+            "peak_pending": self.peak_pending,
+            "submitted": self.submitted,
+            "inline": self.inline,
+            "rejected": self.rejected,
+            "completed": self.completed,
+            "failed": self.failed,
+            "avg_task_ms": round(self._task_seconds / finished * 1000, 3) if finished else 0.0,
+        }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+
+_cpu_executor: Optional[CpuExecutor] = None
+
+
+def get_cpu_executor() -> CpuExecutor:
+    global _cpu_executor
+    if _cpu_executor is None:
+        settings = get_settings()
+        _cpu_executor = CpuExecutor(
+            max_workers=settings.cpu_executor_workers,
+            max_pending=settings.cpu_executor_max_pending,
+            inline_threshold=settings.cpu_executor_inline_threshold,
+            enabled=settings.cpu_executor_enabled,
+        )
+    return _cpu_executor
+
+
+def shutdown_cpu_executor() -> None:
+    if _cpu_executor is not None:
+        _cpu_executor.shutdown()
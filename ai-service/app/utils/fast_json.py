@@ -0,0 +1,79 @@
+"""
+Fast JSON responses for models the service built itself
+
+FastAPI's default path for a `response_model` route re-validates the returned
+model, dumps it to Python objects (`mode="json"`) and encodes those with the
+stdlib `json` module. For recommendation and meal plan responses, which carry
+large nested `Dict` blobs, the dump + encode dominates.
+
+`FastJSONResponse` encodes a model straight to bytes with orjson (nested models
+through their field dicts). The output is identical to the default path except
+for numbers Python writes in exponent notation (below 1e-4 and from 1e16 up)
+and values orjson can't encode (integers beyond 64 bits, Decimal, sets). Such
+bodies are detected (a few substring probes, then a regex only when a probe
+hits, e.g. on hex ids) and re-rendered on the default path, so a response has
+the same bytes as without the fast path. The one exception is NaN/Infinity,
+which are not valid JSON: the default path fails the request with a 500,
+orjson writes null.
+
+Routes return `FastJSONResponse(model)` (keeping `response_model` for the
+OpenAPI schema); services build these models with `model_construct()` from
+values that already have the field types, since validation would not change them.
+Only for models without aliases or custom serializers.
+"""
+from typing import Any
+import json
+import re
+import orjson
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+# A number token (after ":", "," or "[") that orjson and the stdlib format differently:
+# exponent notation, or below 1e-4 (orjson writes 1e-05 as 0.00001)
+_DIVERGENT_NUMBER = re.compile(rb"[:,\[]-?(?:\d+(?:\.\d+)?e|0\.0000)")
+# Every digit -> "0", so that one substring test finds a digit followed by "e"
+_DIGITS_TO_ZERO = bytes.maketrans(b"123456789", b"000000000")
+
+
+def _may_diverge(body: bytes) -> bool:
+    # The regex costs more than the encoding itself; most bodies pass the probes
+    if b"0e" not in body.translate(_DIGITS_TO_ZERO) and b"0.0000" not in body:
+        return False
+    return _DIVERGENT_NUMBER.search(body) is not None
+
+
+def _model_fields(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        return value.__dict__
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def render_default(model: BaseModel) -> bytes:
+    """What FastAPI's response_model path + JSONResponse produce for `model`."""
+    return json.dumps(
+        model.model_dump(mode="json", by_alias=True),
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+def render_model(model: BaseModel) -> bytes:
+    try:
+        # OPT_UTC_Z: aware UTC datetimes end in "Z", as pydantic writes them
+        body = orjson.dumps(model, default=_model_fields, option=orjson.OPT_UTC_Z)
+    except TypeError:
+        return render_default(model)
+    if _may_diverge(body):
+        return render_default(model)
+    return body
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse that renders pydantic models with orjson instead of dump + stdlib encode."""
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, BaseModel):
+            return render_model(content)
+        return super().render(content)
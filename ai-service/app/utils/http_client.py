@@ -1,25 +1,65 @@
 import asyncio
+import time
 from typing import Optional, Any, Dict
+from urllib.parse import urlsplit
 import httpx
 import logging
+import orjson
+from app.utils.metrics import BACKEND_DURATION, BACKEND_FAILURES
+from app.utils.msgpack_codec import ACCEPT_MSGPACK, is_msgpack, unpackb
 
 logger = logging.getLogger(__name__)
 
 
+def decode_response(response: httpx.Response) -> Any:
+    """
+    Body of a backend response in whichever format the server chose:
+    `application/msgpack`, or JSON decoded with orjson (2-3x faster than the
+    stdlib on candidate lists).
+    """
+    if is_msgpack(response.headers.get("content-type")):
+        return unpackb(response.content)
+    try:
+        return orjson.loads(response.content)
+    except orjson.JSONDecodeError:
+        # Non-UTF-8 encodings, NaN literals, integers beyond 64 bits
+        return response.json()
+
+
 class AsyncHTTPClient:
     """Simple Async HTTP client with retry and exponential backoff.
 
     Wraps `httpx.AsyncClient` and retries on network errors.
     Returns `httpx.Response` so existing code calling `.status_code` and `.json()` keeps working.
+    With `accept_msgpack`, requests ask for MessagePack (JSON still accepted); read
+    bodies with `decode_response()`, which handles either format.
     """
 
-    def __init__(self, timeout: float = 10.0, max_retries: int = 3, backoff_factor: float = 0.5):
+    def __init__(self, timeout: float = 10.0, max_retries: int = 3, backoff_factor: float = 0.5,
+                 accept_msgpack: bool = False):
         self.timeout = timeout
         self.max_retries = max_retries
         self.backoff_factor = backoff_factor
+        self.accept_msgpack = accept_msgpack
         self._client = httpx.AsyncClient(timeout=self.timeout)
 
     async def _request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        # Label by path only: query strings and hosts would blow up cardinality
+        path = urlsplit(url).path or "/"
+        started = time.perf_counter()
+        try:
+            return await self._request_with_retries(method, url, **kwargs)
+        except Exception:
+            BACKEND_FAILURES.inc(method=method, path=path)
+            raise
+        finally:
+            BACKEND_DURATION.observe(time.perf_counter() - started, method=method, path=path)
+
+    async def _request_with_retries(self, method: str, url: str, **kwargs) -> httpx.Response:
+        if self.accept_msgpack:
+            headers = kwargs.get("headers") or {}
+            if not any(name.lower() == "accept" for name in headers):
+                kwargs["headers"] = {**headers, "Accept": ACCEPT_MSGPACK}
         last_exc = None
         for attempt in range(1, self.max_retries + 1):
             try:
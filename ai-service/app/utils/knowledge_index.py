@@ -0,0 +1,280 @@
+"""
+In-memory snapshot of a knowledge collection with prebuilt facet bitmaps
+and a BM25 lexical index over the same documents.
+
+Every metadata facet value (e.g. goal=mass, target=lactose_intolerance) maps to a
+boolean row bitmap, so a profile-aware filter is a handful of vectorized AND/OR
+operations and dense search only scores the rows selected by the mask.
+"""
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+import time
+import numpy as np
+from app.utils.bm25_index import BM25Index
+from app.utils.logger import logger
+
+# Metadata fields indexed as facets
+FACET_FIELDS = ("category", "type", "goal", "timing", "target")
+
+# Profile keys that describe user conditions matched against the `target` facet
+CONDITION_KEYS = ("allergies", "diseases", "medications", "conditions")
+
+
+def _normalize(value: Any) -> str:
+    return str(value).strip().lower().replace(" ", "_").replace("-", "_")
+
+
+def profile_conditions(user_profile: Optional[Dict[str, Any]]) -> List[str]:
+    """Collect normalized allergies/diseases/medications from a user profile."""
+    if not user_profile:
+        return []
+    conditions = []
+    for key in CONDITION_KEYS:
+        values = user_profile.get(key) or []
+        if isinstance(values, str):
+            values = [values]
+        conditions.extend(_normalize(v) for v in values if v)
+    return conditions
+
+
+def _terms(value: str) -> Tuple[str, ...]:
+    return tuple(term for term in value.split("_") if term)
+
+
+def _contains_terms(haystack: Tuple[str, ...], needle: Tuple[str, ...]) -> bool:
+    """Whether `needle` occurs in `haystack` as a run of whole terms."""
+    n = len(needle)
+    return n > 0 and any(haystack[i:i + n] == needle for i in range(len(haystack) - n + 1))
+
+
+def conditions_match(condition: str, target: str) -> bool:
+    """
+    Normalized condition vs document target, on whole terms in either direction:
+    "lactose" matches "lactose_intolerance", "ra" does not match "cardiac_arrhythmia".
+    """
+    condition_terms, target_terms = _terms(condition), _terms(target)
+    return _contains_terms(target_terms, condition_terms) or _contains_terms(condition_terms, target_terms)
+
+
+class FacetIndex:
+    """Facet value -> row bitmap index over document metadata."""
+
+    def __init__(
+        self,
+        metadatas: Sequence[Optional[Dict[str, Any]]],
+        fields: Iterable[str] = FACET_FIELDS,
+    ):
+        self.size = len(metadatas)
+        self.fields = tuple(fields)
+        self._bitmaps: Dict[str, Dict[str, np.ndarray]] = {field: {} for field in self.fields}
+        self._present: Dict[str, np.ndarray] = {
+            field: np.zeros(self.size, dtype=bool) for field in self.fields
+        }
+
+        for row, metadata in enumerate(metadatas):
+            if not metadata:
+                continue
+            for field in self.fields:
+                value = metadata.get(field)
+                if value is None:
+                    continue
+                value = _normalize(value)
+                bitmap = self._bitmaps[field].get(value)
+                if bitmap is None:
+                    bitmap = np.zeros(self.size, dtype=bool)
+                    self._bitmaps[field][value] = bitmap
+                bitmap[row] = True
+                self._present[field][row] = True
+
+    def all(self) -> np.ndarray:
+        return np.ones(self.size, dtype=bool)
+
+    def values(self, field: str) -> List[str]:
+        return list(self._bitmaps.get(field, {}).keys())
+
+    def match(self, field: str, values: Iterable[Any]) -> np.ndarray:
+        """Rows whose `field` equals any of `values`."""
+        mask = np.zeros(self.size, dtype=bool)
+        bitmaps = self._bitmaps.get(field, {})
+        for value in values:
+            bitmap = bitmaps.get(_normalize(value))
+            if bitmap is not None:
+                mask |= bitmap
+        return mask
+
+    def match_or_missing(self, field: str, values: Iterable[Any]) -> np.ndarray:
+        """Rows whose `field` equals any of `values` or that do not carry `field` at all."""
+        present = self._present.get(field)
+        if present is None:
+            return self.all()
+        return self.match(field, values) | ~present
+
+    def profile_mask(self, user_profile: Optional[Dict[str, Any]]) -> np.ndarray:
+        """
+        Restrict the collection to documents relevant for a user profile.
+
+        Documents tagged with a goal are kept only for users with that goal, and
+        documents targeting a condition (e.g. lactose_intolerance) only for users
+        whose allergies/diseases/medications mention it. Untagged documents are
+        always kept.
+        """
+        mask = self.all()
+        if not user_profile:
+            return mask
+
+        goal = user_profile.get("goal")
+        if goal:
+            mask &= self.match_or_missing("goal", [goal])
+
+        conditions = profile_conditions(user_profile)
+        matched_targets = [
+            target
+            for target in self.values("target")
+            if any(conditions_match(c, target) for c in conditions)
+        ]
+        mask &= self.match_or_missing("target", matched_targets)
+        return mask
+
+    def facet_mask(self, facets: Optional[Dict[str, Union[Any, List[Any]]]]) -> np.ndarray:
+        """AND of explicit facet filters, each given as a value or a list of values."""
+        mask = self.all()
+        for field, values in (facets or {}).items():
+            if not isinstance(values, (list, tuple, set)):
+                values = [values]
+            mask &= self.match(field, values)
+        return mask
+
+
+class KnowledgeIndex:
+    """Normalized embedding matrix, documents, facet bitmaps and BM25 index of one collection."""
+
+    def __init__(
+        self,
+        ids: Sequence[str],
+        documents: Sequence[str],
+        metadatas: Sequence[Optional[Dict[str, Any]]],
+        embeddings: Sequence[Sequence[float]],
+    ):
+        self.ids = list(ids)
+        self.documents = list(documents)
+        self.metadatas = [m or {} for m in metadatas]
+
+        matrix = np.asarray(embeddings, dtype=np.float32)
+        if matrix.size == 0:
+            matrix = np.zeros((len(self.ids), 0), dtype=np.float32)
+        elif matrix.ndim != 2:
+            matrix = matrix.reshape(len(self.ids), -1)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        self.embeddings = matrix / norms
+
+        self.facets = FacetIndex(self.metadatas)
+        self.lexical = BM25Index(self.documents)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def from_vector_store(cls, vector_store, collection_name: str) -> "KnowledgeIndex":
+        data = vector_store.get_all(collection_name)
+        embeddings = data.get("embeddings")
+        return cls(
+            ids=data.get("ids") or [],
+            documents=data.get("documents") or [],
+            metadatas=data.get("metadatas") or [],
+            embeddings=embeddings if embeddings is not None else [],
+        )
+
+    def build_mask(
+        self,
+        user_profile: Optional[Dict[str, Any]] = None,
+        facets: Optional[Dict[str, Any]] = None,
+    ) -> Optional[np.ndarray]:
+        """Combined profile and facet mask, or None when nothing restricts the search."""
+        if not user_profile and not facets:
+            return None
+        mask = self.facets.profile_mask(user_profile) & self.facets.facet_mask(facets)
+        if not mask.any():
+            # Never return an empty context because the filters were too strict
+            logger.debug("Facet filter matched no documents, searching the whole collection")
+            return None
+        return mask
+
+    def search(
+        self,
+        query_embedding: Sequence[float],
+        n_results: int = 3,
+        mask: Optional[np.ndarray] = None,
+    ) -> List[Tuple[int, float]]:
+        """
+        Cosine-similarity search restricted to the rows selected by `mask`.
+
+        Returns:
+            List of (row, score) pairs sorted by descending similarity.
+        """
+        if not len(self) or n_results <= 0:
+            return []
+
+        query = np.asarray(query_embedding, dtype=np.float32).ravel()
+        norm = np.linalg.norm(query)
+        if norm > 0:
+            query = query / norm
+
+        if mask is None:
+            rows = None
+            scores = self.embeddings @ query
+        else:
+            rows = np.flatnonzero(mask)
+            if rows.size == 0:
+                return []
+            scores = self.embeddings[rows] @ query
+
+        k = min(n_results, scores.shape[0])
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+
+        if rows is None:
+            return [(int(i), float(scores[i])) for i in top]
+        return [(int(rows[i]), float(scores[i])) for i in top]
+
+
+_knowledge_indexes: Dict[str, KnowledgeIndex] = {}
+_checked_at: Dict[str, float] = {}
+
+
+def get_knowledge_index(vector_store, collection_name: str, check_seconds: float = 0.0) -> KnowledgeIndex:
+    """
+    Return the cached in-memory index for a collection, loading it on first use.
+
+    Ingestion runs in another process, so with `check_seconds` > 0 the collection's
+    document count is compared with the index at most that often and a changed
+    collection is reloaded. Changes that keep the count (re-ingested documents) need
+    `invalidate_knowledge_index` (POST /admin/knowledge-index/reload).
+    """
+    index = _knowledge_indexes.get(collection_name)
+    now = time.monotonic()
+    if index is not None and check_seconds > 0 and now - _checked_at.get(collection_name, now) >= check_seconds:
+        _checked_at[collection_name] = now
+        try:
+            count = vector_store.count(collection_name)
+        except Exception as e:
+            logger.warning(f"Could not count documents in {collection_name}: {str(e)}")
+            count = len(index)
+        if count != len(index):
+            logger.info(f"Knowledge collection {collection_name} changed ({len(index)} -> {count} documents)")
+            index = None
+    if index is None:
+        index = KnowledgeIndex.from_vector_store(vector_store, collection_name)
+        _knowledge_indexes[collection_name] = index
+        _checked_at[collection_name] = now
+        logger.info(f"Loaded knowledge index for {collection_name} with {len(index)} documents")
+    return index
+
+
+def invalidate_knowledge_index(collection_name: Optional[str] = None) -> None:
+    """Drop cached indexes so the next query reloads them from the vector store."""
+    if collection_name is None:
+        _knowledge_indexes.clear()
+        _checked_at.clear()
+    else:
+        _knowledge_indexes.pop(collection_name, None)
+        _checked_at.pop(collection_name, None)
@@ -1,18 +1,237 @@
+"""
+Logging setup: loguru front end, non-blocking queued sinks
+
+Request handlers only put the log record into a bounded in-memory queue; a
+background writer thread formats it (text or JSON lines) and writes it to stdout
+and the daily log file. When the queue is full, records are dropped and counted
+instead of blocking the event loop (WARNING and above wait briefly first).
+
+High-frequency hot-path messages can be sampled per message type:
+
+    request_log = sampled_logger("recommendations.request")
+    request_log.info(...)        # kept according to LOG_SAMPLE_RATES
+
+`LOG_SAMPLE_RATES="recommendations.request=0.1"` keeps every 10th such record;
+keys without a rate are always kept. Counters are available via `log_stats()`.
+"""
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, TextIO
+import atexit
+import json
+import os
+import queue
 import sys
+import threading
+import traceback
 from loguru import logger
+from app.utils.metrics import LOG_DROPPED, LOG_SAMPLED_OUT
+
+TEXT_FORMAT = "{time} | {level: <8} | {name}:{function}:{line} - {message}"
+
+
+def parse_sample_rates(value: str) -> Dict[str, float]:
+    """"key=0.1,other=0.5" -> {"key": 0.1, "other": 0.5}"""
+    rates = {}
+    for part in (value or "").split(","):
+        key, _, rate = part.partition("=")
+        if key.strip() and rate.strip():
+            rates[key.strip()] = min(max(float(rate), 0.0), 1.0)
+    return rates
+
+
+def format_record(record: Dict, json_format: bool) -> str:
+    if json_format:
+        entry = {
+            "ts": record["time"].isoformat(),
+            "level": record["level"].name,
+            "logger": record["name"],
+            "function": record["function"],
+            "line": record["line"],
+            "message": record["message"],
+        }
+        extra = {k: v for k, v in record["extra"].items() if k != "log_key"}
+        if extra:
+            entry["extra"] = extra
+        if record["exception"] is not None:
+            entry["exception"] = "".join(traceback.format_exception(*record["exception"]))
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+    line = TEXT_FORMAT.format(
+        time=record["time"].strftime("%Y-%m-%d %H:%M:%S"),
+        level=record["level"].name,
+        name=record["name"],
+        function=record["function"],
+        line=record["line"],
+        message=record["message"],
+    )
+    if record["exception"] is not None:
+        line += "\n" + "".join(traceback.format_exception(*record["exception"])).rstrip()
+    return line
+
+
+class DailyFile:
+    """Append-only log file named by date (`{prefix}_YYYY-MM-DD.log`), pruned after `retention_days`."""
+
+    def __init__(self, directory: str, prefix: str, retention_days: int = 30):
+        self.directory = directory
+        self.prefix = prefix
+        self.retention_days = retention_days
+        self._day: Optional[str] = None
+        self._file: Optional[TextIO] = None
+
+    def write(self, text: str) -> None:
+        day = datetime.now().strftime("%Y-%m-%d")
+        if day != self._day:
+            self._rotate(day)
+        self._file.write(text)
+
+    def flush(self) -> None:
+        if self._file is not None:
+            self._file.flush()
+
+    def _rotate(self, day: str) -> None:
+        if self._file is not None:
+            self._file.close()
+        os.makedirs(self.directory, exist_ok=True)
+        self._file = open(os.path.join(self.directory, f"{self.prefix}_{day}.log"), "a", encoding="utf-8")
+        self._day = day
+        cutoff = (datetime.now() - timedelta(days=self.retention_days)).strftime("%Y-%m-%d")
+        for name in os.listdir(self.directory):
+            if name.startswith(self.prefix + "_") and name.endswith(".log") and name[len(self.prefix) + 1:-4] < cutoff:
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    pass
+
+
+class QueuedSink:
+    """
+    loguru sink that hands records to a writer thread through a bounded queue.
+
+    Args:
+        outputs: (stream, json_format) pairs; streams need write() and flush().
+        max_queue: Records buffered before new ones are dropped.
+        sample_rates: Per `log_key` fraction of records to keep.
+    """
+
+    def __init__(self, outputs: List, max_queue: int = 10000, sample_rates: Optional[Dict[str, float]] = None):
+        self.outputs = outputs
+        self.max_queue = max_queue
+        self.sample_rates = sample_rates or {}
+        self.written = 0
+        self.dropped: Dict[str, int] = {}
+        self.sampled_out: Dict[str, int] = {}
+        self._seen: Dict[str, int] = {}
+        self._start()
+        # A forked worker inherits the queue but not the writer thread
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._start)
+
+    def _start(self) -> None:
+        self._queue: queue.Queue = queue.Queue(maxsize=self.max_queue)
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+
+    def __call__(self, message) -> None:
+        record = message.record
+        key = record["extra"].get("log_key")
+        if key is not None and not self._keep(key):
+            return
+        try:
+            if record["level"].no >= 30:
+                # Warnings and errors are worth a short wait
+                self._queue.put(record, timeout=0.05)
+            else:
+                self._queue.put_nowait(record)
+        except queue.Full:
+            level = record["level"].name
+            self.dropped[level] = self.dropped.get(level, 0) + 1
+            LOG_DROPPED.inc(level=level)
+
+    def _keep(self, key: str) -> bool:
+        rate = self.sample_rates.get(key)
+        if rate is None or rate >= 1.0:
+            return True
+        seen = self._seen.get(key, 0)
+        self._seen[key] = seen + 1
+        # Deterministic 1-in-N: keep when the running count crosses the next multiple
+        if int((seen + 1) * rate) > int(seen * rate):
+            return True
+        self.sampled_out[key] = self.sampled_out.get(key, 0) + 1
+        LOG_SAMPLED_OUT.inc(key=key)
+        return False
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < 512:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            for stream, json_format in self.outputs:
+                try:
+                    stream.write("".join(format_record(r, json_format) + "\n" for r in batch))
+                    stream.flush()
+                except Exception:
+                    pass
+            self.written += len(batch)
+            for _ in batch:
+                self._queue.task_done()
+
+    def flush(self, timeout: float = 2.0) -> None:
+        """Wait (bounded) until everything queued so far has been written."""
+        done = threading.Event()
+        threading.Thread(target=lambda: (self._queue.join(), done.set()), daemon=True).start()
+        done.wait(timeout)
+
+    def stats(self) -> Dict:
+        return {
+            "queued": self._queue.qsize(),
+            "max_queue": self.max_queue,
+            "written": self.written,
+            "dropped": dict(self.dropped),
+            "sampled_out": dict(self.sampled_out),
+        }
+
+
+def _settings():
+    # Read lazily so that importing the logger never fails on a bad environment
+    try:
+        from app.config import get_settings
+
+        return get_settings()
+    except Exception:
+        return None
+
+
+def _configure() -> QueuedSink:
+    settings = _settings()
+    level = getattr(settings, "log_level", "INFO")
+    json_format = getattr(settings, "log_format", "text") == "json"
+    outputs = [(sys.stdout, json_format)]
+    if getattr(settings, "log_file_enabled", True):
+        outputs.append((DailyFile("logs", "ai-service", retention_days=30), True))
+
+    sink = QueuedSink(
+        outputs,
+        max_queue=getattr(settings, "log_queue_size", 10000),
+        sample_rates=parse_sample_rates(getattr(settings, "log_sample_rates", "")),
+    )
+    logger.remove()
+    # Formatting happens in the writer thread; loguru only builds the record
+    logger.add(sink, level=level, format="{message}", backtrace=False, diagnose=False, catch=True)
+    atexit.register(sink.flush)
+    return sink
+
+
+_sink = _configure()
+
+
+def sampled_logger(key: str):
+    """Logger whose records are sampled under `key` (see LOG_SAMPLE_RATES)."""
+    return logger.bind(log_key=key)
 
-logger.remove()
-logger.add(
-    sys.stdout,
-    format="<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level: <8}</level> | <cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>",
-    level="DEBUG" if __debug__ else "INFO",
-)
-
-logger.add(
-    "logs/ai-service_{time:YYYY-MM-DD}.log",
-    rotation="1 day",
-    retention="30 days",
-    level="INFO",
-    format="{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {name}:{function}:{line} - {message}",
-)
 
+def log_stats() -> Dict:
+    return _sink.stats()
@@ -1,21 +1,369 @@
+"""
+ML parameters: validated, compiled, versioned and hot-reloadable
+
+`app/ml_config.json` (or `ML_CONFIG_PATH`) is parsed into an immutable
+`CompiledMLConfig`: every section is validated, missing sections fall back to
+the built-in defaults, and goal-indexed lookups are precomputed as read-only
+numpy arrays (goal × product-type weights, goal × meal-type distribution).
+Its `version` is a hash of the normalized content.
+
+`MLConfigStore` holds the current version. `reload()` compiles the file and
+swaps the reference in one assignment, so a request that took `current()`
+keeps a consistent config to the end while new requests see the new one. An
+invalid file is rejected and the previous version stays in place. Changes are
+picked up by the optional mtime watcher (`ML_CONFIG_WATCH_SECONDS`) or the
+admin endpoint `POST /admin/ml-config/reload`.
+"""
+from datetime import time
 from functools import lru_cache
 from pathlib import Path
+from types import MappingProxyType
+from typing import Any, Dict, List, Optional, Tuple
+import copy
+import hashlib
 import json
-from typing import Dict, Any
+import os
+import threading
+import time as clock
+import numpy as np
+from app.utils.logger import logger
 
+DEFAULT_CONFIG_PATH = Path(__file__).resolve().parents[1] / "ml_config.json"
 
-@lru_cache()
-def get_ml_config() -> Dict[str, Any]:
-    """Load ML parameters from `app/ml_config.json`.
+# Product types of the backend catalog; batch scoring encodes types as indexes into
+# this list (unknown types are appended per batch)
+PRODUCT_TYPES = [
+    "protein", "creatine", "amino", "vitamin",
+    "pre_workout", "post_workout", "fat_burner", "other",
+]
+# GOAL_WEIGHTS key and default weight per product type; types outside the catalog list
+# weigh UNKNOWN_TYPE_WEIGHT for every goal
+TYPE_WEIGHT_KEYS = {product_type: (product_type, 0.1) for product_type in PRODUCT_TYPES}
+TYPE_WEIGHT_KEYS["other"] = ("general", 0.05)
+UNKNOWN_TYPE_WEIGHT = 0.05
 
-    Cached to avoid repeated disk reads. Returns an empty dict on error.
-    """
+MEAL_TYPES = ("breakfast", "lunch", "dinner", "snacks")
+FALLBACK_GOAL = "maintain"
+
+DEFAULTS: Dict[str, Any] = {
+    "GOAL_WEIGHTS": {
+        "mass": {"protein": 0.4, "calories": 0.3, "creatine": 0.2, "pre_workout": 0.1},
+        "cut": {"protein": 0.35, "fat_burner": 0.3, "low_calories": 0.25, "vitamin": 0.1},
+        "maintain": {"protein": 0.3, "balanced": 0.3, "vitamin": 0.2, "general": 0.2},
+        "endurance": {"amino": 0.3, "carbs": 0.25, "hydration": 0.25, "protein": 0.2},
+    },
+    "ACTIVITY_MULTIPLIERS": {"low": 0.8, "moderate": 1.0, "high": 1.2, "very_high": 1.4},
+    # Protein requirements per kg by goal (g/kg)
+    "PROTEIN_REQUIREMENTS": {"mass": 2.2, "cut": 2.5, "endurance": 1.8, "maintain": 2.0},
+    # Meal distribution (fractions) per goal
+    "MEAL_DISTRIBUTION": {
+        "mass": {"breakfast": 0.25, "lunch": 0.35, "dinner": 0.25, "snacks": 0.15},
+        "cut": {"breakfast": 0.30, "lunch": 0.35, "dinner": 0.25, "snacks": 0.10},
+        "maintain": {"breakfast": 0.25, "lunch": 0.35, "dinner": 0.25, "snacks": 0.15},
+        "endurance": {"breakfast": 0.20, "lunch": 0.30, "dinner": 0.25, "snacks": 0.25},
+    },
+    # Serbian meal times as HH:MM
+    "SERBIAN_MEAL_TIMES": {
+        "breakfast": "08:00", "snack1": "11:00", "lunch": "13:30", "snack2": "17:00", "dinner": "19:30",
+    },
+    # Price-value bonus: full points at or below the reference cost (RSD per gram of
+    # protein), falling linearly to zero at twice the reference
+    "PRICE_VALUE": {"reference_cost_per_gram_protein": 6.0, "max_points": 5.0},
+}
+PRICE_VALUE_KEYS = ("reference_cost_per_gram_protein", "max_points")
+
+
+class MLConfigError(ValueError):
+    """Raised for an ML config that fails validation; `errors` lists every problem."""
+
+    def __init__(self, errors: List[str]):
+        super().__init__("Invalid ML config: " + "; ".join(errors))
+        self.errors = errors
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _parse_time(value: Any) -> Optional[time]:
     try:
-        base = Path(__file__).resolve().parents[1]
-        cfg_path = base / "ml_config.json"
-        if not cfg_path.exists():
-            return {}
-        with cfg_path.open("r", encoding="utf-8") as f:
-            return json.load(f)
+        hh, mm = value.split(":")
+        return time(int(hh), int(mm))
     except Exception:
-        return {}
+        return None
+
+
+def _check_numbers(
+    errors: List[str], section: str, values: Any, low: float, high: float, path: str = ""
+) -> None:
+    if not isinstance(values, dict) or not values:
+        errors.append(f"{section}{path} must be a non-empty object")
+        return
+    for key, value in values.items():
+        if not _is_number(value) or not low <= value <= high:
+            errors.append(f"{section}{path}.{key} must be a number in [{low}, {high}], got {value!r}")
+
+
+def validate_ml_config(document: Any) -> Dict[str, Any]:
+    """
+    Validate a raw config document and fill in missing sections from DEFAULTS.
+
+    Raises MLConfigError listing every problem found.
+    """
+    if not isinstance(document, dict):
+        raise MLConfigError([f"config must be a JSON object, got {type(document).__name__}"])
+
+    errors: List[str] = []
+    unknown = sorted(set(document) - set(DEFAULTS))
+    if unknown:
+        errors.append(f"unknown sections {unknown}")
+    config = {section: copy.deepcopy(document.get(section, default)) for section, default in DEFAULTS.items()}
+
+    goal_weights = config["GOAL_WEIGHTS"]
+    if not isinstance(goal_weights, dict) or not goal_weights:
+        errors.append("GOAL_WEIGHTS must be a non-empty object")
+    else:
+        for goal, weights in goal_weights.items():
+            _check_numbers(errors, "GOAL_WEIGHTS", weights, 0.0, 1.0, f".{goal}")
+
+    _check_numbers(errors, "ACTIVITY_MULTIPLIERS", config["ACTIVITY_MULTIPLIERS"], 0.1, 5.0)
+    _check_numbers(errors, "PROTEIN_REQUIREMENTS", config["PROTEIN_REQUIREMENTS"], 0.1, 5.0)
+
+    distribution = config["MEAL_DISTRIBUTION"]
+    if not isinstance(distribution, dict) or not distribution:
+        errors.append("MEAL_DISTRIBUTION must be a non-empty object")
+    else:
+        for goal, fractions in distribution.items():
+            _check_numbers(errors, "MEAL_DISTRIBUTION", fractions, 0.0, 1.0, f".{goal}")
+            if not isinstance(fractions, dict):
+                continue
+            if set(fractions) != set(MEAL_TYPES):
+                errors.append(f"MEAL_DISTRIBUTION.{goal} must have exactly the meals {list(MEAL_TYPES)}")
+            elif all(_is_number(v) for v in fractions.values()) and abs(sum(fractions.values()) - 1.0) > 0.01:
+                errors.append(f"MEAL_DISTRIBUTION.{goal} must sum to 1, got {sum(fractions.values()):.3f}")
+
+    meal_times = config["SERBIAN_MEAL_TIMES"]
+    if not isinstance(meal_times, dict) or not meal_times:
+        errors.append("SERBIAN_MEAL_TIMES must be a non-empty object")
+    else:
+        for meal, value in meal_times.items():
+            if _parse_time(value) is None:
+                errors.append(f"SERBIAN_MEAL_TIMES.{meal} must be HH:MM, got {value!r}")
+
+    price_value = config["PRICE_VALUE"]
+    _check_numbers(errors, "PRICE_VALUE", price_value, 0.0, 1000.0)
+    if isinstance(price_value, dict) and price_value:
+        if set(price_value) != set(PRICE_VALUE_KEYS):
+            errors.append(f"PRICE_VALUE must have exactly the keys {list(PRICE_VALUE_KEYS)}")
+        elif price_value["reference_cost_per_gram_protein"] == 0:
+            errors.append("PRICE_VALUE.reference_cost_per_gram_protein must be positive")
+
+    for section in ("GOAL_WEIGHTS", "PROTEIN_REQUIREMENTS", "MEAL_DISTRIBUTION"):
+        if isinstance(config[section], dict) and config[section] and FALLBACK_GOAL not in config[section]:
+            errors.append(f"{section} must define the fallback goal {FALLBACK_GOAL!r}")
+
+    if errors:
+        raise MLConfigError(errors)
+    return config
+
+
+def _freeze(value: Any) -> Any:
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    return value
+
+
+def _read_only(array: np.ndarray) -> np.ndarray:
+    array.setflags(write=False)
+    return array
+
+
+class CompiledMLConfig:
+    """
+    One immutable, validated version of the ML parameters.
+
+    Mappings are read-only views and the lookup arrays are non-writable, so a
+    version can be shared between concurrent requests. Rows of the arrays follow
+    `goals`; `goal_index()` maps unknown goals to the "maintain" row.
+    """
+
+    __slots__ = (
+        "version", "source", "loaded_at", "_document",
+        "goal_weights", "activity_multipliers", "protein_requirements",
+        "meal_distribution", "meal_times", "goals", "_goal_index",
+        "goal_type_weights", "meal_distribution_matrix",
+        "price_reference_cost", "price_value_points", "_frozen",
+    )
+
+    def __init__(self, document: Dict[str, Any], source: str = "", loaded_at: Optional[float] = None):
+        config = validate_ml_config(document)
+        # Normalized content: the version, and what gets pickled for the process pool
+        self._document = json.dumps(config, sort_keys=True, separators=(",", ":"))
+        self.version = hashlib.sha256(self._document.encode("utf-8")).hexdigest()[:12]
+        self.source = source
+        self.loaded_at = clock.time() if loaded_at is None else loaded_at
+
+        self.goal_weights = _freeze(config["GOAL_WEIGHTS"])
+        self.activity_multipliers = _freeze(config["ACTIVITY_MULTIPLIERS"])
+        self.protein_requirements = _freeze(config["PROTEIN_REQUIREMENTS"])
+        self.meal_distribution = _freeze(config["MEAL_DISTRIBUTION"])
+        self.meal_times = MappingProxyType(
+            {meal: _parse_time(value) for meal, value in config["SERBIAN_MEAL_TIMES"].items()}
+        )
+
+        goals: List[str] = []
+        for section in ("GOAL_WEIGHTS", "PROTEIN_REQUIREMENTS", "MEAL_DISTRIBUTION"):
+            goals.extend(goal for goal in config[section] if goal not in goals)
+        self.goals: Tuple[str, ...] = tuple(goals)
+        self._goal_index = MappingProxyType({goal: i for i, goal in enumerate(goals)})
+
+        # Goals missing from a section use its "maintain" entry, as lookups always did
+        weights = np.zeros((len(goals), len(PRODUCT_TYPES)), dtype=np.float64)
+        distribution = np.zeros((len(goals), len(MEAL_TYPES)), dtype=np.float64)
+        for row, goal in enumerate(goals):
+            goal_weights = self.goal_weights.get(goal, self.goal_weights[FALLBACK_GOAL])
+            for col, product_type in enumerate(PRODUCT_TYPES):
+                key, default = TYPE_WEIGHT_KEYS[product_type]
+                weights[row, col] = goal_weights.get(key, default)
+            fractions = self.meal_distribution.get(goal, self.meal_distribution[FALLBACK_GOAL])
+            distribution[row] = [fractions[meal] for meal in MEAL_TYPES]
+        self.goal_type_weights = _read_only(weights)
+        self.meal_distribution_matrix = _read_only(distribution)
+        self.price_reference_cost = float(config["PRICE_VALUE"]["reference_cost_per_gram_protein"])
+        self.price_value_points = float(config["PRICE_VALUE"]["max_points"])
+        self._frozen = True
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        if getattr(self, "_frozen", False):
+            raise AttributeError("CompiledMLConfig is immutable")
+        object.__setattr__(self, name, value)
+
+    def __reduce__(self):
+        # Mapping proxies don't pickle; the process pool gets the document and recompiles
+        return _restore, (self._document, self.source, self.loaded_at)
+
+    def __repr__(self) -> str:
+        return f"CompiledMLConfig(version={self.version!r}, source={self.source!r})"
+
+    def goal_index(self, goal: str) -> int:
+        return self._goal_index.get(goal, self._goal_index[FALLBACK_GOAL])
+
+    def as_dict(self) -> Dict[str, Any]:
+        """The validated sections as a plain (mutable copy) dict."""
+        return json.loads(self._document)
+
+    def describe(self) -> Dict[str, Any]:
+        return {"version": self.version, "source": self.source, "loaded_at": self.loaded_at}
+
+
+def _restore(document: str, source: str, loaded_at: float) -> CompiledMLConfig:
+    return CompiledMLConfig(json.loads(document), source, loaded_at)
+
+
+def load_ml_config(path: Path) -> CompiledMLConfig:
+    """Compile the config file at `path`; a missing file means the built-in defaults."""
+    if not path.exists():
+        return CompiledMLConfig({}, source="defaults")
+    with path.open("r", encoding="utf-8") as f:
+        try:
+            document = json.load(f)
+        except json.JSONDecodeError as e:
+            raise MLConfigError([f"{path.name} is not valid JSON: {e}"])
+    return CompiledMLConfig(document, source=str(path))
+
+
+class MLConfigStore:
+    """Holds the current `CompiledMLConfig` and swaps in new versions."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.reloads = 0
+        self.failed_reloads = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._stamp = self._file_stamp()
+        try:
+            self._current = load_ml_config(path)
+        except Exception as e:
+            # Same as before validation existed: serve with the built-in defaults
+            logger.error(f"ML config {path} rejected, using defaults: {str(e)}")
+            self._current = CompiledMLConfig({}, source="defaults")
+
+    def current(self) -> CompiledMLConfig:
+        """The config to use for a whole request; take it once and pass it along."""
+        return self._current
+
+    def reload(self) -> CompiledMLConfig:
+        """
+        Compile the file again and make it current.
+
+        Raises MLConfigError (or OSError) and keeps the previous version if the
+        file is invalid.
+        """
+        with self._lock:
+            stamp = self._file_stamp()
+            try:
+                config = load_ml_config(self.path)
+            except Exception:
+                self.failed_reloads += 1
+                # Don't retry the same broken file on every watcher tick
+                self._stamp = stamp
+                raise
+            previous, self._current, self._stamp = self._current, config, stamp
+            self.reloads += 1
+        if config.version != previous.version:
+            logger.info(f"ML config reloaded: {previous.version} -> {config.version}")
+        return config
+
+    def check_for_changes(self) -> bool:
+        """Reload if the file changed since the last load; True if a new version is current."""
+        if self._file_stamp() == self._stamp:
+            return False
+        previous = self._current.version
+        try:
+            return self.reload().version != previous
+        except Exception as e:
+            logger.error(f"ML config change rejected, keeping {previous}: {str(e)}")
+            return False
+
+    def start_watcher(self, interval: float) -> None:
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._watch, args=(interval,), name="ml-config-watcher", daemon=True
+        )
+        self._thread.start()
+
+    def stop_watcher(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _watch(self, interval: float) -> None:
+        while not self._stop.wait(interval):
+            self.check_for_changes()
+
+    def _file_stamp(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+
+@lru_cache()
+def get_ml_config_store() -> MLConfigStore:
+    from app.config import get_settings
+
+    path = get_settings().ml_config_path
+    return MLConfigStore(Path(path) if path else DEFAULT_CONFIG_PATH)
+
+
+def current_ml_config() -> CompiledMLConfig:
+    return get_ml_config_store().current()
+
+
+def get_ml_config() -> Dict[str, Any]:
+    """Current ML parameters as a plain dict (validated, defaults filled in)."""
+    return current_ml_config().as_dict()
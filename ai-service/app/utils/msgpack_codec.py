@@ -0,0 +1,118 @@
+"""
+MessagePack as an alternative to JSON between the backend and the AI service
+
+Both directions negotiate the format through standard headers, so a peer that
+only speaks JSON keeps working unchanged:
+
+* Backend -> AI service: `AsyncHTTPClient(accept_msgpack=True)` sends
+  `Accept: application/msgpack, application/json;q=0.9`; if the backend answers
+  with `Content-Type: application/msgpack`, `decode_response()` decodes it.
+* Clients -> AI service routes: `NegotiatedRoute` accepts msgpack request bodies
+  (`Content-Type: application/msgpack`), and `negotiated_response()` answers in
+  msgpack when the `Accept` header prefers it over JSON, otherwise with
+  `FastJSONResponse`.
+
+Values are the same as in the JSON form (datetimes as ISO strings, as
+pydantic's JSON mode writes them), so decoding either body gives the same
+objects.
+"""
+from typing import Any, Callable, Optional
+import msgpack
+import pydantic_core
+from fastapi import Request, Response
+from fastapi.routing import APIRoute
+from pydantic import BaseModel
+from app.utils.fast_json import FastJSONResponse
+
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+# Older clients use the unregistered x- form
+MSGPACK_MEDIA_TYPES = frozenset({MSGPACK_MEDIA_TYPE, "application/x-msgpack"})
+ACCEPT_MSGPACK = f"{MSGPACK_MEDIA_TYPE}, application/json;q=0.9"
+
+
+def is_msgpack(content_type: Optional[str]) -> bool:
+    if not content_type:
+        return False
+    return content_type.split(";", 1)[0].strip().lower() in MSGPACK_MEDIA_TYPES
+
+
+def wants_msgpack(accept: Optional[str]) -> bool:
+    """Whether an Accept header ranks msgpack above JSON (ties go to JSON)."""
+    if not accept or "msgpack" not in accept:
+        return False
+    msgpack_q = json_q = 0.0
+    for item in accept.split(","):
+        media_type, *params = [part.strip() for part in item.split(";")]
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        media_type = media_type.lower()
+        if media_type in MSGPACK_MEDIA_TYPES:
+            msgpack_q = max(msgpack_q, q)
+        elif media_type in ("application/json", "application/*", "*/*"):
+            json_q = max(json_q, q)
+    return msgpack_q > json_q
+
+
+def _encode_default(value: Any) -> Any:
+    # Nested models go through their field dicts; datetimes, dates, sets etc. as in JSON mode
+    if isinstance(value, BaseModel):
+        return value.__dict__
+    return pydantic_core.to_jsonable_python(value)
+
+
+def packb(content: Any) -> bytes:
+    return msgpack.packb(content, default=_encode_default)
+
+
+def unpackb(body: bytes) -> Any:
+    return msgpack.unpackb(body)
+
+
+class MsgpackResponse(Response):
+    media_type = MSGPACK_MEDIA_TYPE
+
+    def render(self, content: Any) -> bytes:
+        return packb(content)
+
+
+def negotiated_response(model: BaseModel, accept: Optional[str]) -> Response:
+    """`model` as msgpack or JSON, whichever the client's Accept header prefers."""
+    response_class = MsgpackResponse if wants_msgpack(accept) else FastJSONResponse
+    response = response_class(model)
+    response.headers["Vary"] = "Accept"
+    return response
+
+
+class MsgpackRequest(Request):
+    """Request whose msgpack body FastAPI's body parsing reads like a JSON one."""
+
+    async def json(self) -> Any:
+        if not hasattr(self, "_json"):
+            self._json = unpackb(await self.body())
+        return self._json
+
+
+class NegotiatedRoute(APIRoute):
+    """APIRoute that also accepts `Content-Type: application/msgpack` request bodies."""
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+
+        async def negotiated_handler(request: Request) -> Response:
+            if is_msgpack(request.headers.get("content-type")):
+                # FastAPI only calls request.json() for JSON content types
+                scope = dict(request.scope)
+                scope["headers"] = [
+                    (name, b"application/json" if name == b"content-type" else value)
+                    for name, value in scope["headers"]
+                ]
+                request = MsgpackRequest(scope, request.receive)
+            return await handler(request)
+
+        return negotiated_handler
@@ -0,0 +1,64 @@
+"""
+Pre-fork loading of shared read-only resources
+
+Called in the gunicorn master before workers are forked (see gunicorn.conf.py).
+Everything loaded here — embedding model weights, the knowledge index arrays — is
+inherited by the workers and shared copy-on-write instead of being loaded once per
+worker.
+
+Two rules keep the pages shared and the workers healthy:
+
+* No inference in the master. Running the model starts the torch/OpenMP thread
+  pools, which do not survive fork; workers run their own warm-up encode.
+* `gc.freeze()` after loading moves every object into the permanent generation,
+  so collections in the workers don't write to (and thereby copy) the pages
+  holding the preloaded objects.
+"""
+import gc
+import time
+from typing import Dict
+from app.config import get_settings
+from app.utils.logger import logger
+
+
+def preload_shared_resources() -> Dict[str, float]:
+    """Load shared resources in the current (master) process; returns load timings."""
+    settings = get_settings()
+    features = {f.strip() for f in settings.enabled_features.split(",")}
+    timings: Dict[str, float] = {}
+
+    if "advice" in features:
+        from app.services.embedding_service import get_embedding_service
+        from app.services.rag_service import KNOWLEDGE_COLLECTION
+        from app.utils.knowledge_index import get_knowledge_index
+        from app.utils.vector_store import get_vector_store, reset_vector_store
+
+        if settings.embedding_backend == "onnx":
+            # onnxruntime starts its thread pools when the session is created, which is
+            # not fork-safe; the small ONNX model is loaded in each worker instead
+            logger.info("ONNX embedding backend: model is loaded per worker")
+        else:
+            started = time.perf_counter()
+            try:
+                get_embedding_service()
+                timings["embedding_model"] = time.perf_counter() - started
+            except Exception as e:
+                logger.error(f"Embedding model not preloaded, workers will load it: {str(e)}")
+
+        started = time.perf_counter()
+        try:
+            get_knowledge_index(get_vector_store(), KNOWLEDGE_COLLECTION)
+            timings["knowledge_index"] = time.perf_counter() - started
+        except Exception as e:
+            logger.warning(f"Knowledge index not preloaded, workers will load it: {str(e)}")
+        finally:
+            reset_vector_store()
+
+    gc.collect()
+    gc.freeze()
+    logger.info(
+        "Preloaded shared resources before fork: "
+        + ", ".join(f"{name} {seconds:.2f}s" for name, seconds in timings.items())
+        + f"; {gc.get_freeze_count()} objects frozen"
+    )
+    return timings
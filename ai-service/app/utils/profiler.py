@@ -0,0 +1,202 @@
+"""
+Statistical sampling profiler for live workers
+
+A dedicated thread wakes up every `interval` seconds, grabs the stacks of all
+other threads with `sys._current_frames()` (the event loop thread, `to_thread`
+and executor threads) and counts identical stacks. Nothing is hooked into the
+interpreter, so threads that aren't sampled run at full speed.
+
+Overhead is bounded by:
+* a minimum sampling interval and a maximum duration,
+* one profile at a time per process,
+* a cap on stack depth and on distinct stacks (the rest is counted as truncated).
+
+Results render as collapsed stacks (`thread;outer;...;inner count`, the input of
+flamegraph.pl / speedscope) or as speedscope JSON.
+"""
+from collections import Counter
+from types import CodeType
+from typing import Any, Dict, List, Optional, Tuple
+import os
+import sys
+import threading
+import time
+
+MIN_INTERVAL = 0.001
+TRUNCATED = "[truncated]"
+
+
+class ProfilerBusyError(Exception):
+    """Raised when a profile is requested while another one is running."""
+
+
+class ProfileResult:
+    def __init__(
+        self,
+        stacks: Counter,
+        samples: int,
+        duration: float,
+        interval: float,
+        sampler_cpu: float,
+        truncated: int,
+    ):
+        self.stacks = stacks
+        self.samples = samples
+        self.duration = duration
+        self.interval = interval
+        self.sampler_cpu = sampler_cpu
+        self.truncated = truncated
+
+    @property
+    def overhead(self) -> float:
+        """CPU time of the sampler thread relative to the wall time of the profile."""
+        return self.sampler_cpu / self.duration if self.duration else 0.0
+
+    def collapsed(self) -> str:
+        lines = [f"{';'.join(stack)} {count}" for stack, count in self.stacks.most_common()]
+        return "\n".join(lines) + "\n"
+
+    def speedscope(self, name: str = "ai-service") -> Dict[str, Any]:
+        """Speedscope file format: one sampled profile per thread."""
+        frames: List[Dict[str, str]] = []
+        frame_index: Dict[str, int] = {}
+        per_thread: Dict[str, Tuple[List[List[int]], List[float]]] = {}
+
+        for stack, count in self.stacks.items():
+            thread, calls = stack[0], stack[1:]
+            indices = []
+            for label in calls:
+                if label not in frame_index:
+                    frame_index[label] = len(frames)
+                    frames.append({"name": label})
+                indices.append(frame_index[label])
+            samples, weights = per_thread.setdefault(thread, ([], []))
+            samples.append(indices)
+            weights.append(count * self.interval)
+
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": "ai-service sampling profiler",
+            "shared": {"frames": frames},
+            "profiles": [
+                {
+                    "type": "sampled",
+                    "name": thread,
+                    "unit": "seconds",
+                    "startValue": 0,
+                    "endValue": sum(weights),
+                    "samples": samples,
+                    "weights": weights,
+                }
+                for thread, (samples, weights) in per_thread.items()
+            ],
+            "activeProfileIndex": 0,
+        }
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "samples": self.samples,
+            "distinct_stacks": len(self.stacks),
+            "truncated_samples": self.truncated,
+            "duration_seconds": round(self.duration, 3),
+            "interval_seconds": self.interval,
+            "sampler_overhead": round(self.overhead, 4),
+        }
+
+
+class SamplingProfiler:
+    def __init__(
+        self,
+        interval: float = 0.005,
+        max_seconds: float = 60.0,
+        max_depth: int = 64,
+        max_stacks: int = 5000,
+    ):
+        self.interval = max(interval, MIN_INTERVAL)
+        self.max_seconds = max_seconds
+        self.max_depth = max_depth
+        self.max_stacks = max_stacks
+        self._running = threading.Lock()
+        self._labels: Dict[CodeType, str] = {}
+
+    def profile(self, seconds: float) -> ProfileResult:
+        """Sample all other threads for `seconds` (capped at `max_seconds`); blocking."""
+        if not self._running.acquire(blocking=False):
+            raise ProfilerBusyError("A profile is already running")
+        try:
+            return self._sample(min(seconds, self.max_seconds))
+        finally:
+            self._running.release()
+
+    def _sample(self, seconds: float) -> ProfileResult:
+        own_ident = threading.get_ident()
+        stacks: Counter = Counter()
+        samples = truncated = 0
+        started = time.perf_counter()
+        cpu_started = time.thread_time()
+        deadline = started + seconds
+        next_tick = started
+
+        while True:
+            now = time.perf_counter()
+            if now >= deadline:
+                break
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own_ident:
+                    continue
+                stack = self._stack(names.get(ident, f"thread-{ident}"), frame)
+                if stack in stacks or len(stacks) < self.max_stacks:
+                    stacks[stack] += 1
+                else:
+                    stacks[(stack[0], TRUNCATED)] += 1
+                    truncated += 1
+                samples += 1
+            del frame
+            # Fixed-rate ticks; if sampling fell behind, skip ahead instead of bursting
+            next_tick = max(next_tick + self.interval, time.perf_counter())
+            time.sleep(max(0.0, min(next_tick, deadline) - time.perf_counter()))
+
+        return ProfileResult(
+            stacks=stacks,
+            samples=samples,
+            duration=time.perf_counter() - started,
+            interval=self.interval,
+            sampler_cpu=time.thread_time() - cpu_started,
+            truncated=truncated,
+        )
+
+    def _stack(self, thread_name: str, frame) -> Tuple[str, ...]:
+        calls: List[str] = []
+        while frame is not None and len(calls) < self.max_depth:
+            calls.append(self._label(frame.f_code))
+            frame = frame.f_back
+        calls.append(thread_name)
+        calls.reverse()
+        return tuple(calls)
+
+    def _label(self, code: CodeType) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            # Collapsed format separates frames with ";" and counts with a space
+            filename = os.path.basename(code.co_filename)
+            label = f"{code.co_name} ({filename}:{code.co_firstlineno})".replace(";", ":")
+            self._labels[code] = label
+        return label
+
+
+_profiler: Optional[SamplingProfiler] = None
+
+
+def get_profiler() -> SamplingProfiler:
+    global _profiler
+    if _profiler is None:
+        from app.config import get_settings
+
+        settings = get_settings()
+        _profiler = SamplingProfiler(
+            interval=settings.profiler_interval_ms / 1000,
+            max_seconds=settings.profiler_max_seconds,
+        )
+    return _profiler
@@ -0,0 +1,54 @@
+"""
+Readiness tracking for startup warm-up
+
+Liveness (`/health`) only says the process is up. Readiness (`/health/ready`)
+reports whether every registered component has finished warming up, so the
+load balancer only routes traffic to workers that can serve it quickly.
+"""
+from typing import Dict, Optional
+import threading
+import time
+
+PENDING = "pending"
+READY = "ready"
+FAILED = "failed"
+
+
+class Readiness:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._components: Dict[str, Dict[str, Optional[object]]] = {}
+        self._started_at = time.monotonic()
+
+    def register(self, name: str) -> None:
+        with self._lock:
+            self._components[name] = {"status": PENDING, "error": None, "seconds": None}
+
+    def mark_ready(self, name: str) -> None:
+        self._set(name, READY)
+
+    def mark_failed(self, name: str, error: str) -> None:
+        self._set(name, FAILED, error)
+
+    def is_pending(self, name: str) -> bool:
+        component = self._components.get(name)
+        return component is not None and component["status"] == PENDING
+
+    @property
+    def ready(self) -> bool:
+        return all(c["status"] == READY for c in self._components.values())
+
+    def snapshot(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "ready": self.ready,
+                "components": {name: dict(c) for name, c in self._components.items()},
+            }
+
+    def _set(self, name: str, status: str, error: Optional[str] = None) -> None:
+        with self._lock:
+            self._components[name] = {
+                "status": status,
+                "error": error,
+                "seconds": round(time.monotonic() - self._started_at, 3),
+            }
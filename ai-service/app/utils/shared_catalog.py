@@ -0,0 +1,300 @@
+"""
+Shared-memory catalog segment
+
+The product and meal catalogs are encoded once into numeric feature matrices
+(`ProductScorer.product_features`, `MealPlanner.meal_features`) and published
+into POSIX shared memory. Every worker on the host maps the same pages
+read-only, so catalog memory stays flat as workers are added, and nobody
+re-fetches or re-parses the catalog per worker.
+
+Layout:
+
+* Pointer segment `<name>` — tiny, fixed size, rewritten on every publish:
+  magic, layout version, sequence counter, generation, data segment name.
+  Writes are guarded by a seqlock (odd sequence = write in progress), so a reader
+  never acts on a half-written pointer.
+* Data segment `<name>_<generation>` — immutable once published: a header,
+  the float64 product and meal matrices (64-byte aligned) and a JSON trailer
+  with ids and type names.
+
+Publishing a new generation writes a complete new data segment, then flips the
+pointer and unlinks the previous segment. Readers that still map the old one
+keep valid memory until they drop it; new lookups see the new generation.
+"""
+from dataclasses import dataclass
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from typing import Dict, List, Optional, Sequence
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+import numpy as np
+from app.utils.logger import logger
+
+try:
+    import _posixshmem
+except ImportError:  # pragma: no cover - non-POSIX platforms
+    _posixshmem = None
+
+MAGIC = b"NCAT"
+LAYOUT_VERSION = 1
+ALIGNMENT = 64
+
+# magic, layout version, sequence, generation, data segment name
+POINTER_FORMAT = "<4sIQQ64s"
+POINTER_SIZE = struct.calcsize(POINTER_FORMAT)
+
+# magic, layout version, generation, created_at, n_products, product_cols,
+# n_meals, meal_cols, products_offset, meals_offset, meta_offset, meta_len
+HEADER_FORMAT = "<4sIQdQQQQQQQQ"
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+
+
+@dataclass
+class CatalogData:
+    """Catalog contents to publish."""
+    product_ids: List[str]
+    product_features: np.ndarray
+    type_names: List[str]
+    meal_ids: List[str]
+    meal_features: np.ndarray
+
+
+def _align(offset: int) -> int:
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def _untrack(shm: SharedMemory) -> None:
+    # The publisher unlinks segments explicitly; without this the resource tracker
+    # of the creating process would unlink the live catalog when that process exits
+    resource_tracker.unregister(shm._name, "shared_memory")
+
+
+def _unlink(shm: SharedMemory) -> None:
+    # SharedMemory.unlink() would unregister from the tracker a second time
+    try:
+        _posixshmem.shm_unlink(shm._name)
+    except FileNotFoundError:
+        pass
+
+
+def _map_readonly(name: str) -> mmap.mmap:
+    """Map an existing segment read-only (readers never register with a resource tracker)."""
+    if _posixshmem is None:
+        raise RuntimeError("POSIX shared memory is not available on this platform")
+    fd = _posixshmem.shm_open("/" + name, os.O_RDONLY, mode=0)
+    try:
+        return mmap.mmap(fd, os.fstat(fd).st_size, access=mmap.ACCESS_READ)
+    finally:
+        os.close(fd)
+
+
+class SharedCatalogPublisher:
+    """Writes catalog generations; exactly one publisher per catalog name per host."""
+
+    def __init__(self, name: str):
+        self.name = name
+        try:
+            self._pointer = SharedMemory(name=name, create=True, size=POINTER_SIZE)
+            self.generation = 0
+            previous = None
+        except FileExistsError:
+            # Left behind by a previous publisher: continue its generation sequence
+            self._pointer = SharedMemory(name=name)
+            _, _, sequence, self.generation, raw = struct.unpack_from(POINTER_FORMAT, self._pointer.buf)
+            previous = raw.rstrip(b"\0").decode() or None
+        _untrack(self._pointer)
+        # Continue the seqlock counter too, so readers never see an earlier value repeat
+        self._sequence = 0 if previous is None else sequence + sequence % 2
+        if previous is None:
+            self._write_pointer(0, "")
+        self._current: Optional[SharedMemory] = None
+        self._stale_name = previous
+        self._lock = threading.Lock()
+
+    def publish(self, catalog: CatalogData) -> int:
+        """Write a new generation and make it current; returns its number."""
+        products = np.ascontiguousarray(catalog.product_features, dtype=np.float64)
+        meals = np.ascontiguousarray(catalog.meal_features, dtype=np.float64)
+        if products.ndim != 2 or meals.ndim != 2:
+            raise ValueError("Catalog feature matrices must be 2-dimensional")
+        meta = json.dumps({
+            "product_ids": [str(i) for i in catalog.product_ids],
+            "type_names": list(catalog.type_names),
+            "meal_ids": [str(i) for i in catalog.meal_ids],
+        }).encode("utf-8")
+
+        products_offset = _align(HEADER_SIZE)
+        meals_offset = _align(products_offset + products.nbytes)
+        meta_offset = meals_offset + meals.nbytes
+        size = meta_offset + len(meta)
+
+        with self._lock:
+            generation = self.generation + 1
+            segment = SharedMemory(name=f"{self.name}_{generation}", create=True, size=size)
+            _untrack(segment)
+            struct.pack_into(
+                HEADER_FORMAT, segment.buf, 0,
+                MAGIC, LAYOUT_VERSION, generation, time.time(),
+                products.shape[0], products.shape[1], meals.shape[0], meals.shape[1],
+                products_offset, meals_offset, meta_offset, len(meta),
+            )
+            np.ndarray(products.shape, dtype=np.float64, buffer=segment.buf, offset=products_offset)[...] = products
+            np.ndarray(meals.shape, dtype=np.float64, buffer=segment.buf, offset=meals_offset)[...] = meals
+            segment.buf[meta_offset:meta_offset + len(meta)] = meta
+
+            self._write_pointer(generation, segment.name)
+            previous, self._current = self._current, segment
+            self.generation = generation
+
+        if previous is not None:
+            previous.close()
+            _unlink(previous)
+        if self._stale_name:
+            self._unlink_by_name(self._stale_name)
+            self._stale_name = None
+        logger.info(
+            f"Published catalog generation {generation}: {products.shape[0]} products, "
+            f"{meals.shape[0]} meals, {size / 1024:.1f} KiB"
+        )
+        return generation
+
+    def _write_pointer(self, generation: int, segment_name: str) -> None:
+        # Seqlock: odd while writing so readers retry instead of using a torn value
+        self._sequence += 1
+        struct.pack_into("<Q", self._pointer.buf, 8, self._sequence)
+        struct.pack_into(
+            POINTER_FORMAT, self._pointer.buf, 0,
+            MAGIC, LAYOUT_VERSION, self._sequence, generation, segment_name.encode(),
+        )
+        self._sequence += 1
+        struct.pack_into("<Q", self._pointer.buf, 8, self._sequence)
+
+    @staticmethod
+    def _unlink_by_name(name: str) -> None:
+        try:
+            segment = SharedMemory(name=name)
+            _untrack(segment)
+            segment.close()
+            _unlink(segment)
+        except FileNotFoundError:
+            pass
+
+    def close(self, unlink: bool = True) -> None:
+        """Release the segments; with `unlink` readers lose the catalog on next lookup."""
+        with self._lock:
+            if self._current is not None:
+                self._current.close()
+                if unlink:
+                    _unlink(self._current)
+                self._current = None
+            if unlink and self._stale_name:
+                # Handed over by a previous publisher and not replaced yet
+                self._unlink_by_name(self._stale_name)
+                self._stale_name = None
+            self._pointer.close()
+            if unlink:
+                _unlink(self._pointer)
+
+
+class CatalogSnapshot:
+    """Zero-copy, read-only views over one published generation."""
+
+    def __init__(self, generation: int, buffer: mmap.mmap):
+        (magic, layout, header_generation, created_at, n_products, product_cols,
+         n_meals, meal_cols, products_offset, meals_offset, meta_offset, meta_len
+         ) = struct.unpack_from(HEADER_FORMAT, buffer)
+        if magic != MAGIC or layout != LAYOUT_VERSION or header_generation != generation:
+            raise ValueError(f"Catalog segment for generation {generation} is invalid")
+
+        self.generation = generation
+        self.created_at = created_at
+        self.products = np.frombuffer(
+            buffer, dtype=np.float64, count=n_products * product_cols, offset=products_offset
+        ).reshape(n_products, product_cols)
+        self.meals = np.frombuffer(
+            buffer, dtype=np.float64, count=n_meals * meal_cols, offset=meals_offset
+        ).reshape(n_meals, meal_cols)
+        meta = json.loads(bytes(buffer[meta_offset:meta_offset + meta_len]))
+        self.product_ids: List[str] = meta["product_ids"]
+        self.type_names: List[str] = meta["type_names"]
+        self.meal_ids: List[str] = meta["meal_ids"]
+        self._product_index: Dict[str, int] = {pid: row for row, pid in enumerate(self.product_ids)}
+        self._meal_index: Dict[str, int] = {mid: row for row, mid in enumerate(self.meal_ids)}
+
+    @staticmethod
+    def _rows(index: Dict[str, int], ids: Sequence) -> Optional[np.ndarray]:
+        rows = [index.get(str(i)) for i in ids]
+        if any(row is None for row in rows):
+            return None
+        return np.array(rows, dtype=np.intp)
+
+    def product_rows(self, product_ids: Sequence) -> Optional[np.ndarray]:
+        """Rows of the given products, or None if any of them is not in this generation."""
+        return self._rows(self._product_index, product_ids)
+
+    def meal_rows(self, meal_ids: Sequence) -> Optional[np.ndarray]:
+        return self._rows(self._meal_index, meal_ids)
+
+
+class SharedCatalogReader:
+    """Maps the current generation and remaps when the publisher flips the pointer."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._pointer: Optional[mmap.mmap] = None
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._mapping: Optional[mmap.mmap] = None
+        # Mappings of replaced generations that still have views handed out
+        self._retired: List[mmap.mmap] = []
+        self._lock = threading.Lock()
+
+    def _read_pointer(self):
+        if self._pointer is None:
+            self._pointer = _map_readonly(self.name)
+        for _ in range(100):
+            magic, layout, sequence, generation, raw = struct.unpack_from(POINTER_FORMAT, self._pointer)
+            if sequence % 2 == 0 and struct.unpack_from("<Q", self._pointer, 8)[0] == sequence:
+                if magic == b"\0\0\0\0":
+                    # Created but never written
+                    return 0, ""
+                if magic != MAGIC or layout != LAYOUT_VERSION:
+                    raise ValueError(f"Catalog pointer {self.name} has an unknown layout")
+                return generation, raw.rstrip(b"\0").decode()
+            time.sleep(0.0001)
+        raise TimeoutError(f"Catalog pointer {self.name} is being rewritten")
+
+    def snapshot(self) -> Optional[CatalogSnapshot]:
+        """The current generation, or None when nothing has been published yet."""
+        with self._lock:
+            try:
+                generation, segment_name = self._read_pointer()
+            except FileNotFoundError:
+                return None
+            if generation == 0:
+                return None
+            if self._snapshot is not None and self._snapshot.generation == generation:
+                return self._snapshot
+            try:
+                mapping = _map_readonly(segment_name)
+            except FileNotFoundError:
+                # Replaced between reading the pointer and mapping; keep the old one
+                return self._snapshot
+            self._snapshot = CatalogSnapshot(generation, mapping)
+            if self._mapping is not None:
+                self._retired.append(self._mapping)
+            self._mapping = mapping
+            self._release_retired()
+            return self._snapshot
+
+    def _release_retired(self) -> None:
+        still_used = []
+        for mapping in self._retired:
+            try:
+                mapping.close()
+            except BufferError:
+                still_used.append(mapping)
+        self._retired = still_used
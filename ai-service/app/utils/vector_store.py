@@ -1,6 +1,4 @@
-import chromadb
-from chromadb.config import Settings as ChromaSettings
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 import os
 from app.utils.logger import logger
 
@@ -17,6 +15,9 @@ class VectorStore:
         os.makedirs(persist_directory, exist_ok=True)
         
         try:
+            # Imported here: chromadb is heavy and only needed by the RAG feature
+            import chromadb
+
             self.client = chromadb.PersistentClient(path=persist_directory)
             logger.info(f"ChromaDB initialized at {persist_directory}")
         except Exception as e:
@@ -53,6 +54,59 @@ class VectorStore:
             logger.error(f"Error adding documents to {collection_name}: {str(e)}")
             raise
 
+    def upsert_documents(
+        self,
+        collection_name: str,
+        ids: List[str],
+        embeddings: List[List[float]],
+        metadatas: List[Dict[str, Any]],
+        documents: List[str]
+    ):
+        """Insert new documents or overwrite existing ones with the same ids."""
+        try:
+            collection = self.get_or_create_collection(collection_name)
+            collection.upsert(
+                ids=ids,
+                embeddings=embeddings,
+                metadatas=metadatas,
+                documents=documents
+            )
+            logger.info(f"Upserted {len(ids)} documents into collection {collection_name}")
+        except Exception as e:
+            logger.error(f"Error upserting documents into {collection_name}: {str(e)}")
+            raise
+
+    def delete_documents(self, collection_name: str, ids: List[str]):
+        """Delete documents by id."""
+        if not ids:
+            return
+        try:
+            collection = self.get_or_create_collection(collection_name)
+            collection.delete(ids=ids)
+            logger.info(f"Deleted {len(ids)} documents from collection {collection_name}")
+        except Exception as e:
+            logger.error(f"Error deleting documents from {collection_name}: {str(e)}")
+            raise
+
+    def iter_metadatas(
+        self, collection_name: str, page_size: int = 5000
+    ) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Yield (id, metadata) for every document, reading the collection page by page."""
+        try:
+            collection = self.get_or_create_collection(collection_name)
+            offset = 0
+            while True:
+                page = collection.get(include=["metadatas"], limit=page_size, offset=offset)
+                ids = page.get("ids") or []
+                if not ids:
+                    break
+                for doc_id, metadata in zip(ids, page.get("metadatas") or []):
+                    yield doc_id, metadata or {}
+                offset += len(ids)
+        except Exception as e:
+            logger.error(f"Error reading metadata of {collection_name}: {str(e)}")
+            raise
+
     def query(
         self, 
         collection_name: str, 
@@ -72,6 +126,19 @@ class VectorStore:
             logger.error(f"Error querying collection {collection_name}: {str(e)}")
             raise
 
+    def get_all(self, collection_name: str) -> Dict[str, Any]:
+        """Fetch ids, embeddings, documents and metadatas of every document in a collection."""
+        try:
+            collection = self.get_or_create_collection(collection_name)
+            return collection.get(include=["embeddings", "documents", "metadatas"])
+        except Exception as e:
+            logger.error(f"Error reading collection {collection_name}: {str(e)}")
+            raise
+
+    def count(self, collection_name: str) -> int:
+        """Number of documents in a collection (cheap; no embeddings are read)."""
+        return self.get_or_create_collection(collection_name).count()
+
 _vector_store_instance = None
 
 def get_vector_store() -> VectorStore:
@@ -79,3 +146,20 @@ def get_vector_store() -> VectorStore:
     if _vector_store_instance is None:
         _vector_store_instance = VectorStore()
     return _vector_store_instance
+
+
+def reset_vector_store() -> None:
+    """
+    Drop the process-wide client so the next `get_vector_store` opens a new one.
+
+    Used after preloading in a pre-fork master: SQLite connections must not be
+    shared across fork, so every worker opens its own ChromaDB client.
+    """
+    global _vector_store_instance
+    _vector_store_instance = None
+    try:
+        from chromadb.api.client import SharedSystemClient
+
+        SharedSystemClient.clear_system_cache()
+    except (ImportError, AttributeError):
+        pass
@@ -0,0 +1,59 @@
+"""
+Compare two pytest-benchmark JSON result files and flag regressions.
+
+    python -m pytest benchmarks --benchmark-json=.benchmarks/base.json     # on the base commit
+    python -m pytest benchmarks --benchmark-json=.benchmarks/head.json     # on the change
+    python benchmarks/compare.py .benchmarks/base.json .benchmarks/head.json --threshold 10
+
+Exits with status 1 when any benchmark's statistic (median by default) got slower
+than the threshold, so CI can gate on it. Benchmarks present in only one file are
+listed but never fail the comparison.
+"""
+import argparse
+import json
+import sys
+from typing import Dict, Tuple
+
+
+def load(path: str, stat: str) -> Tuple[Dict[str, float], str]:
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    commit = (data.get("commit_info") or {}).get("id") or "?"
+    return {b["fullname"]: b["stats"][stat] for b in data.get("benchmarks", [])}, commit[:10]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("base", help="Baseline results (pytest --benchmark-json)")
+    parser.add_argument("head", help="Results to check against the baseline")
+    parser.add_argument("--stat", default="median", choices=["min", "median", "mean"], help="Statistic to compare")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Allowed slowdown in percent (default: 10)")
+    args = parser.parse_args()
+
+    base, base_commit = load(args.base, args.stat)
+    head, head_commit = load(args.head, args.stat)
+    print(f"{args.stat} times, base {base_commit} -> head {head_commit}, threshold +{args.threshold:.0f}%\n")
+    print(f"{'benchmark':<72} {'base ms':>10} {'head ms':>10} {'change':>8}")
+
+    regressions = 0
+    for name in sorted(set(base) | set(head)):
+        if name not in base or name not in head:
+            where = "head" if name in head else "base"
+            print(f"{name:<72} {'(only in ' + where + ')':>30}")
+            continue
+        change = (head[name] - base[name]) / base[name] * 100 if base[name] else 0.0
+        flag = ""
+        if change > args.threshold:
+            regressions += 1
+            flag = "  REGRESSION"
+        print(f"{name:<72} {base[name] * 1000:>10.3f} {head[name] * 1000:>10.3f} {change:>+7.1f}%{flag}")
+
+    if regressions:
+        print(f"\n{regressions} benchmark(s) slower than +{args.threshold:.0f}%")
+        return 1
+    print("\nNo regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
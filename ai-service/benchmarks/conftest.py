@@ -0,0 +1,19 @@
+"""
+Fixtures for the benchmark suite (run with `pytest benchmarks`, see README).
+"""
+import pytest
+from app.services import embedding_service
+from app.services.embedding_service import EmbeddingService
+from benchmarks.synthetic import StubEmbeddingBackend
+
+
+@pytest.fixture(scope="session")
+def stub_backend():
+    return StubEmbeddingBackend()
+
+
+@pytest.fixture
+def stub_embedding_service(monkeypatch, stub_backend):
+    """EmbeddingService wired to the deterministic stub model."""
+    monkeypatch.setattr(embedding_service, "create_backend", lambda *args, **kwargs: stub_backend)
+    return EmbeddingService(backend="stub")
@@ -0,0 +1,183 @@
+"""
+Deterministic synthetic data for the benchmark suite
+
+Catalogs, meals, recommendation payloads and a stub embedding model are all
+generated from a fixed seed, so two runs (or two commits) measure the same work.
+"""
+from typing import Dict, List
+import hashlib
+import random
+import re
+import numpy as np
+from app.ml.scoring import PRODUCT_TYPES
+from app.services.embedding_backends import EmbeddingBackend
+
+SEED = 1234
+GOALS = ["mass", "cut", "maintain", "endurance"]
+ACTIVITY_LEVELS = ["low", "moderate", "high", "very_high"]
+CUISINES = ["serbian", "balkan", "italian", "mediterranean", "asian", "american"]
+INGREDIENTS = [
+    "chicken", "beef", "pork", "fish", "egg", "milk", "cheese", "yogurt", "peanut",
+    "almond", "walnut", "soy", "wheat", "rice", "oats", "potato", "beans", "lentils",
+    "tomato", "pepper", "onion", "garlic", "spinach", "mushroom", "olive oil", "kajmak",
+]
+ALLERGENS = ["peanut", "milk", "egg", "soy", "wheat", "fish", "tree nuts"]
+MEAL_TYPES = ["breakfast", "lunch", "dinner", "snack"]
+WORDS = (
+    "protein creatine whey casein recovery muscle strength endurance hydration sleep "
+    "vitamin mineral iron calcium magnesium zinc omega fat carbohydrate glycogen timing "
+    "dose serving daily training session caffeine beta alanine electrolyte fiber digestion"
+).split()
+
+USER_PROFILE = {
+    "goal": "mass",
+    "activity_level": "high",
+    "age": 28,
+    "gender": "male",
+    "weight": 80,
+    "height": 180,
+}
+NUTRITIONAL_NEEDS = {"calories": 2800, "protein": 160, "carbs": 350, "fats": 93}
+
+
+def make_products(n: int, seed: int = SEED) -> List[Dict]:
+    rng = random.Random(seed)
+    products = []
+    for i in range(n):
+        product_type = rng.choice(PRODUCT_TYPES)
+        product = {
+            "id": f"prod-{i}",
+            "name": f"Product {i}",
+            "type": product_type,
+            "brand": {
+                "name": f"Brand {i % 50}",
+                "verified": rng.random() < 0.6,
+                "premium": rng.random() < 0.2,
+            },
+        }
+        # Vitamins and similar products usually come without macros
+        if product_type in ("protein", "amino", "post_workout", "other") or rng.random() < 0.3:
+            product["macros"] = {
+                "protein": rng.randint(0, 35),
+                "carbs": rng.randint(0, 60),
+                "fats": rng.randint(0, 15),
+                "calories": rng.randint(0, 450),
+            }
+        products.append(product)
+    return products
+
+
+def make_recommendations(n: int, seed: int = SEED) -> List[Dict]:
+    rng = random.Random(seed + 1)
+    return [
+        {
+            "product": product,
+            "score": rng.randint(30, 90),
+            "reasons": ["Matches your goal"] if rng.random() < 0.5 else [],
+            "warnings": [],
+        }
+        for product in make_products(n, seed)
+    ]
+
+
+def make_meals(n: int, seed: int = SEED) -> List[Dict]:
+    rng = random.Random(seed + 2)
+    meals = []
+    for i in range(n):
+        ingredients = rng.sample(INGREDIENTS, rng.randint(3, 8))
+        meals.append({
+            "id": f"meal-{i}",
+            "name_key": f"meal_{i}",
+            "meal_type": rng.choice(MEAL_TYPES),
+            "cuisine_type": rng.choice(CUISINES),
+            "ingredients": [{"name": name} for name in ingredients],
+            "allergens": [{"name": a} for a in ALLERGENS if a in ingredients or rng.random() < 0.05],
+            "total_macros": {
+                "calories": rng.randint(150, 1100),
+                "protein": rng.randint(5, 70),
+                "carbs": rng.randint(5, 120),
+                "fats": rng.randint(2, 45),
+            },
+        })
+    return meals
+
+
+def make_price_rows(n_products: int, n_stores: int, seed: int = SEED) -> List[Dict]:
+    """`PriceIndex` rows: each store sells about half of the products."""
+    rng = random.Random(seed + 5)
+    stores = [
+        {"delivery_fee": rng.choice([0, 250, 350, 450]), "min_order_amount": rng.choice([0, 3000, 5000])}
+        for _ in range(n_stores)
+    ]
+    rows = []
+    for p in range(n_products):
+        for s, store in enumerate(stores):
+            if rng.random() < 0.5 or s == p % n_stores:
+                rows.append({
+                    "product_id": f"prod-{p}",
+                    "store_id": f"store-{s}",
+                    "price": rng.randint(1500, 9000),
+                    "servings": rng.choice([30, 60, 100]),
+                    "in_stock": True,
+                    **store,
+                })
+    return rows
+
+
+def make_week_plan(n_supplements: int, days: int = 7, seed: int = SEED) -> List[Dict]:
+    """Daily plans (backend format) with four meals and `n_supplements` supplements each."""
+    meals = make_meals(days * 4, seed)
+    return [
+        {
+            "meals": [{"meal": meal, "servings": 1.5} for meal in meals[day * 4:(day + 1) * 4]],
+            "supplements": [
+                {"product_id": f"prod-{i}", "dosage_grams": 30, "product": {"serving_size": "30g"}}
+                for i in range(n_supplements)
+            ],
+        }
+        for day in range(days)
+    ]
+
+
+def make_documents(n: int, seed: int = SEED) -> List[str]:
+    rng = random.Random(seed + 3)
+    return [" ".join(rng.choices(WORDS, k=rng.randint(20, 60))) for _ in range(n)]
+
+
+def make_metadatas(n: int, seed: int = SEED) -> List[Dict]:
+    rng = random.Random(seed + 4)
+    return [
+        {"goal": rng.choice(GOALS), "category": rng.choice(["supplements", "nutrition", "training"])}
+        for _ in range(n)
+    ]
+
+
+class StubEmbeddingBackend(EmbeddingBackend):
+    """
+    Deterministic hashing embedder standing in for the sentence-transformers model.
+
+    Each token adds a fixed pseudo-random vector (seeded by its hash), so similar
+    texts get similar embeddings and the output never depends on downloaded weights.
+    """
+
+    name = "stub"
+
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+        self._token_vectors: Dict[str, np.ndarray] = {}
+
+    def _token_vector(self, token: str) -> np.ndarray:
+        vector = self._token_vectors.get(token)
+        if vector is None:
+            seed = int.from_bytes(hashlib.blake2b(token.encode(), digest_size=8).digest(), "little")
+            vector = np.random.default_rng(seed).standard_normal(self.dim).astype(np.float32)
+            self._token_vectors[token] = vector
+        return vector
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for token in re.findall(r"\w+", text.lower()):
+                out[row] += self._token_vector(token)
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        return out / np.clip(norms, 1e-12, None)
@@ -0,0 +1,100 @@
+"""
+Benchmarks for app.ml: product scoring and meal planning.
+"""
+import numpy as np
+import pytest
+from app.ml.meal_planner import MealPlanner
+from app.ml.pricing import PriceIndex
+from app.ml.scoring import ProductScorer
+from app.ml.shopping import aggregate_plan, cost_matrix, solve_store_selection
+from benchmarks.synthetic import (
+    NUTRITIONAL_NEEDS,
+    USER_PROFILE,
+    make_meals,
+    make_price_rows,
+    make_products,
+    make_week_plan,
+)
+
+CATALOG_SIZES = [10, 1_000, 100_000]
+MEAL_CATALOG_SIZES = [200, 2_000]
+
+
+@pytest.mark.parametrize("n", CATALOG_SIZES)
+def test_calculate_score(benchmark, n):
+    products = make_products(n)
+    scorer = ProductScorer()
+
+    def score_all():
+        return [scorer.calculate_score(p, USER_PROFILE, 50, NUTRITIONAL_NEEDS) for p in products]
+
+    # The 100k case takes about a second per round
+    scores = benchmark.pedantic(score_all, rounds=3 if n >= 100_000 else 20, warmup_rounds=1)
+    assert len(scores) == n
+
+
+@pytest.mark.parametrize("n", CATALOG_SIZES)
+def test_calculate_scores_batch(benchmark, n):
+    products = make_products(n)
+    features, type_names = ProductScorer.product_features(products, [50] * n)
+
+    scores = benchmark(
+        ProductScorer.calculate_scores_batch, features, type_names, USER_PROFILE, NUTRITIONAL_NEEDS
+    )
+    assert scores.shape == (n,)
+
+
+@pytest.mark.parametrize("n", [1_000, 100_000])
+def test_product_features(benchmark, n):
+    products = make_products(n)
+
+    features, _ = benchmark(ProductScorer.product_features, products, [50] * n)
+    assert features.shape[0] == n
+
+
+@pytest.mark.parametrize("n", MEAL_CATALOG_SIZES)
+def test_select_optimal_meals(benchmark, n):
+    meals = make_meals(n)
+    preferences = {"allergies": ["peanut"]}
+
+    selected = benchmark(
+        MealPlanner.select_optimal_meals,
+        meals, 700, 45, "lunch", "mass", preferences, ["mushroom"], meals[:3],
+    )
+    assert selected
+
+
+@pytest.mark.parametrize("n", MEAL_CATALOG_SIZES)
+def test_filter_meals_by_preferences(benchmark, n):
+    meals = make_meals(n)
+
+    filtered = benchmark(
+        MealPlanner.filter_meals_by_preferences,
+        meals, {"allergies": ["peanut", "milk"]}, ["mushroom", "pork"],
+    )
+    assert 0 < len(filtered) <= n
+
+
+@pytest.mark.parametrize("n", MEAL_CATALOG_SIZES)
+def test_best_meal_indices(benchmark, n):
+    features = MealPlanner.meal_features(make_meals(n))
+    calories = np.array([600.0, 800.0, 700.0, 300.0])
+    protein = np.array([35.0, 50.0, 45.0, 15.0])
+
+    best = benchmark(MealPlanner.best_meal_indices, features, calories, protein, "mass")
+    assert len(best) == 4
+
+
+@pytest.mark.parametrize("n_stores", [8, 25])
+def test_week_shopping_list(benchmark, n_stores):
+    index = PriceIndex()
+    index.apply(make_price_rows(6, n_stores), replace=True)
+    plans = make_week_plan(6)
+
+    def build():
+        _, needs = aggregate_plan(plans)
+        _, _, cost, _, fees, minimums = cost_matrix(needs, index.offers_for(list(needs)), index.stores())
+        return solve_store_selection(cost, fees, minimums, max_stores=3, time_budget=1.0)
+
+    selection = benchmark(build)
+    assert selection.complete
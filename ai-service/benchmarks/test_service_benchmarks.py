@@ -0,0 +1,178 @@
+"""
+Benchmarks for the service layer: recommendation enhancement, response serialization,
+backend payload decoding (JSON vs MessagePack), embeddings and retrieval.
+"""
+from datetime import date, datetime
+import asyncio
+import json
+import httpx
+import pytest
+from fastapi.responses import JSONResponse
+from fastapi.utils import create_response_field
+from app.models.meal_plan import MealPlanResponse
+from app.models.recommendation import ProductRecommendationRequest, RecommendationsResponse
+from app.services.recommendation_service import RecommendationService
+from app.utils.fast_json import FastJSONResponse
+from app.utils.http_client import decode_response
+from app.utils.msgpack_codec import MSGPACK_MEDIA_TYPE, packb
+from app.utils.knowledge_index import KnowledgeIndex
+from benchmarks.synthetic import (
+    NUTRITIONAL_NEEDS,
+    USER_PROFILE,
+    make_documents,
+    make_meals,
+    make_metadatas,
+    make_recommendations,
+)
+
+QUERY = "how much creatine and protein should I take after training"
+
+
+@pytest.fixture
+def request_model():
+    return ProductRecommendationRequest(user_id="bench-user", max_products=10, **USER_PROFILE)
+
+
+class StaticBackendClient:
+    """Stands in for AsyncHTTPClient with canned backend responses."""
+
+    def __init__(self, recommendations):
+        self.responses = {
+            "/api/v1/recommendations": {"success": True, "data": recommendations},
+            "/api/v1/nutrition/calculate": {"success": True, "data": NUTRITIONAL_NEEDS},
+        }
+
+    async def get(self, url, params=None, headers=None):
+        path = httpx.URL(url).path
+        return httpx.Response(200, json=self.responses[path])
+
+
+@pytest.mark.parametrize("n", [50, 1_000])
+def test_enhance_recommendations(benchmark, request_model, n):
+    service = RecommendationService("http://bench-backend")
+    recommendations = make_recommendations(n)
+
+    enhanced = benchmark(
+        service._enhance_recommendations, recommendations, request_model, NUTRITIONAL_NEEDS
+    )
+    assert len(enhanced) == 10
+
+
+@pytest.mark.parametrize("n", [50, 1_000])
+def test_get_ai_recommendations(benchmark, request_model, n):
+    """Whole request path with the backend replaced by canned responses."""
+    service = RecommendationService("http://bench-backend")
+    service.client = StaticBackendClient(make_recommendations(n))
+
+    response = benchmark(lambda: asyncio.run(service.get_ai_recommendations(request_model)))
+    assert len(response.recommendations) == 10
+
+
+def response_values(kind: str, request_model) -> dict:
+    if kind == "recommendations":
+        service = RecommendationService("http://bench-backend")
+        return {
+            "recommendations": service._enhance_recommendations(
+                make_recommendations(50), request_model, NUTRITIONAL_NEEDS
+            ),
+            "generated_at": datetime(2026, 1, 1, 12, 0, 0, 250000),
+            "user_profile_summary": {"goal": "mass", "activity_level": "high", "age": 28, "gender": "male"},
+            "ml_config_version": "bench",
+        }
+    meals = make_meals(6)
+    return {
+        "meal_plan_id": "bench-plan",
+        "date": date(2026, 1, 1),
+        "meals": [{"meal_type": m["meal_type"], "meal": m, "servings": 1, "scheduled_time": "08:00"} for m in meals],
+        "total_calories": 2400.0,
+        "total_protein": 160.0,
+        "total_carbs": 250.0,
+        "total_fats": 70.0,
+        "generated_at": datetime(2026, 1, 1, 12, 0, 0, 250000),
+        "preferences_applied": {"goal": "cut", "activity_level": "high"},
+        "ml_config_version": "bench",
+    }
+
+
+@pytest.mark.parametrize("fmt", ["json-stdlib", "json", "msgpack"])
+def test_decode_backend_candidates(benchmark, fmt):
+    """
+    Backend /recommendations body with 2,000 candidates: decode time, size in extra_info.
+    json-stdlib is httpx's `.json()`, the others `decode_response()` as the services use it.
+    """
+    payload = {"success": True, "data": make_recommendations(2_000)}
+    if fmt == "msgpack":
+        body = packb(payload)
+        content_type = MSGPACK_MEDIA_TYPE
+    else:
+        # Compact, as the Node backend's JSON.stringify writes it
+        body = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+        content_type = "application/json"
+    response = httpx.Response(200, content=body, headers={"content-type": content_type})
+    benchmark.extra_info["payload_bytes"] = len(body)
+
+    decode = response.json if fmt == "json-stdlib" else lambda: decode_response(response)
+    assert benchmark(decode) == payload
+
+
+@pytest.mark.parametrize("kind", ["recommendations", "meal_plan"])
+@pytest.mark.parametrize("path", ["default", "fast"])
+def test_serialize_response(benchmark, request_model, kind, path):
+    """Model construction + response body: response_model path vs FastJSONResponse."""
+    model_type = RecommendationsResponse if kind == "recommendations" else MealPlanResponse
+    values = response_values(kind, request_model)
+    field = create_response_field(name="response", type_=model_type)
+
+    def default():
+        value, _ = field.validate(model_type(**values), {}, loc=("response",))
+        return JSONResponse(field.serialize(value)).body
+
+    def fast():
+        return FastJSONResponse(model_type.model_construct(**values)).body
+
+    body = benchmark(default if path == "default" else fast)
+    assert body == default()
+
+
+def test_generate_embeddings(benchmark, stub_embedding_service):
+    texts = make_documents(64)
+
+    embeddings = benchmark(stub_embedding_service.generate_embeddings, texts)
+    assert len(embeddings) == 64
+
+
+@pytest.fixture(scope="module", params=[1_000, 20_000], ids=["1k_docs", "20k_docs"])
+def knowledge_index(request):
+    from benchmarks.synthetic import StubEmbeddingBackend
+
+    n = request.param
+    documents = make_documents(n)
+    embeddings = StubEmbeddingBackend().encode(documents)
+    return KnowledgeIndex(
+        ids=[f"doc-{i}" for i in range(n)],
+        documents=documents,
+        metadatas=make_metadatas(n),
+        embeddings=embeddings,
+    )
+
+
+def test_dense_search(benchmark, knowledge_index, stub_backend):
+    query = stub_backend.encode([QUERY])[0]
+
+    hits = benchmark(knowledge_index.search, query, 5)
+    assert len(hits) == 5
+
+
+def test_dense_search_with_profile_mask(benchmark, knowledge_index, stub_backend):
+    query = stub_backend.encode([QUERY])[0]
+
+    def search():
+        mask = knowledge_index.build_mask({"goal": "mass"})
+        return knowledge_index.search(query, 5, mask)
+
+    assert len(benchmark(search)) == 5
+
+
+def test_lexical_search(benchmark, knowledge_index):
+    hits = benchmark(knowledge_index.lexical.search, QUERY, 5)
+    assert hits
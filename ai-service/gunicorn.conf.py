@@ -0,0 +1,57 @@
+"""
+Gunicorn configuration for pre-fork serving.
+
+    gunicorn -c gunicorn.conf.py app.main:app
+
+The app is imported in the master (`preload_app`), then `on_starting` loads the
+embedding model and knowledge index once so all workers share them copy-on-write.
+Set PREFORK_PRELOAD=false to load them per worker instead.
+
+With SHARED_CATALOG_ENABLED=true the master publishes the first generation of
+the shared-memory catalog before forking workers, then spawns a separate
+refresher process that publishes a new one every SHARED_CATALOG_REFRESH_SECONDS.
+The master itself runs no extra threads.
+"""
+import multiprocessing
+import os
+from app.config import get_settings
+
+settings = get_settings()
+
+bind = os.getenv("GUNICORN_BIND", f"{settings.host}:{settings.port}")
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+graceful_timeout = 30
+keepalive = 5
+
+
+def on_starting(server):
+    if settings.prefork_preload:
+        from app.utils.prefork import preload_shared_resources
+
+        preload_shared_resources()
+
+
+_catalog_refresher_process = None
+
+
+def when_ready(server):
+    global _catalog_refresher_process
+    if settings.shared_catalog_enabled and settings.shared_catalog_publisher == "master":
+        from app.services.catalog_service import create_catalog_refresher, start_catalog_refresher_process
+
+        # First generation synchronously, so workers forked afterwards find it; the
+        # refresher process takes over the segments and continues the generations
+        refresher = create_catalog_refresher()
+        refresher.refresh()
+        refresher.publisher.close(unlink=False)
+        _catalog_refresher_process = start_catalog_refresher_process()
+
+
+def on_exit(server):
+    if _catalog_refresher_process is not None:
+        # The refresher unlinks the catalog on SIGTERM
+        _catalog_refresher_process.terminate()
+        _catalog_refresher_process.join(timeout=10)
@@ -0,0 +1,136 @@
+"""
+Stand-in for the Node backend API, for load-testing the AI service alone
+
+Serves the endpoints the AI service calls from synthetic catalogs
+(benchmarks/synthetic.py), with a configurable artificial latency:
+
+* GET  /api/v1/recommendations      — base recommendations for the whole catalog
+* GET  /api/v1/nutrition/calculate  — daily nutritional needs
+* POST /api/v1/meal-plan/generate   — a day plan drawn from the meal catalog
+* GET  /api/v1/products, /api/v1/products/brands — catalog pages (shared catalog refresher)
+
+Like the real backend, it answers in MessagePack when the Accept header prefers
+`application/msgpack` (see app/utils/msgpack_codec.py), otherwise in JSON.
+
+    python -m loadtest.fake_backend --port 3000 --products 2000 --meals 500 --latency-ms 20
+    BACKEND_API_URL=http://localhost:3000 python run.py
+"""
+from typing import Any, Dict, List, Optional
+import argparse
+import asyncio
+import random
+from fastapi import FastAPI, Header, Query, Request
+from app.utils.msgpack_codec import MsgpackResponse, wants_msgpack
+from benchmarks.synthetic import NUTRITIONAL_NEEDS, make_meals, make_recommendations
+
+MEAL_SLOTS = [("breakfast", "08:00"), ("lunch", "13:00"), ("snack", "16:30"), ("dinner", "19:30")]
+
+
+def negotiated(payload: Dict, accept: Optional[str]) -> Any:
+    return MsgpackResponse(payload) if wants_msgpack(accept) else payload
+
+
+def create_fake_backend(
+    products: int = 2000,
+    meals: int = 500,
+    latency_ms: float = 20.0,
+    jitter_ms: float = 5.0,
+    seed: int = 1234,
+) -> FastAPI:
+    app = FastAPI(title="Fake backend API")
+    recommendations = make_recommendations(products, seed)
+    catalog = [rec["product"] for rec in recommendations]
+    brands = list({p["brand"]["name"]: {"id": p["brand"]["name"], **p["brand"]} for p in catalog}.values())
+    meal_catalog = make_meals(meals, seed)
+    by_type: Dict[str, List[Dict]] = {}
+    for meal in meal_catalog:
+        by_type.setdefault(meal["meal_type"], []).append(meal)
+    rng = random.Random(seed)
+    app.state.requests = 0
+
+    @app.middleware("http")
+    async def simulated_latency(request: Request, call_next):
+        app.state.requests += 1
+        delay = latency_ms + rng.uniform(-jitter_ms, jitter_ms)
+        if delay > 0:
+            await asyncio.sleep(delay / 1000)
+        return await call_next(request)
+
+    @app.get("/api/v1/recommendations")
+    async def get_recommendations(
+        x_user_id: Optional[str] = Header(None, alias="X-User-ID"), accept: Optional[str] = Header(None)
+    ):
+        return negotiated({"success": True, "data": recommendations}, accept)
+
+    @app.get("/api/v1/nutrition/calculate")
+    async def calculate_nutrition(
+        x_user_id: Optional[str] = Header(None, alias="X-User-ID"), accept: Optional[str] = Header(None)
+    ):
+        return negotiated({"success": True, "data": NUTRITIONAL_NEEDS}, accept)
+
+    @app.post("/api/v1/meal-plan/generate")
+    async def generate_meal_plan(
+        body: Dict,
+        x_user_id: Optional[str] = Header(None, alias="X-User-ID"),
+        accept: Optional[str] = Header(None),
+    ):
+        items = []
+        for order, (meal_type, time) in enumerate(MEAL_SLOTS):
+            candidates = by_type.get(meal_type) or meal_catalog
+            meal = candidates[rng.randrange(len(candidates))]
+            items.append({
+                "id": f"item-{order}",
+                "meal_id": meal["id"],
+                "meal_type": meal_type,
+                "scheduled_time": time,
+                "servings": 1,
+                "order_index": order,
+                "meal": meal,
+            })
+        return negotiated({
+            "success": True,
+            "data": {
+                "id": f"plan-{x_user_id or 'anonymous'}",
+                "date": body.get("date"),
+                "meals": items,
+                "total_calories": sum(i["meal"]["total_macros"]["calories"] for i in items),
+                "total_protein": sum(i["meal"]["total_macros"]["protein"] for i in items),
+                "total_carbs": sum(i["meal"]["total_macros"]["carbs"] for i in items),
+                "total_fats": sum(i["meal"]["total_macros"]["fats"] for i in items),
+            },
+        }, accept)
+
+    @app.get("/api/v1/products")
+    async def list_products(
+        limit: int = Query(20, ge=1), offset: int = Query(0, ge=0), accept: Optional[str] = Header(None)
+    ):
+        page = catalog[offset:offset + limit]
+        meta = {"total": len(catalog), "limit": limit, "offset": offset}
+        return negotiated({"success": True, "data": page, "meta": meta}, accept)
+
+    @app.get("/api/v1/products/brands")
+    async def list_brands(accept: Optional[str] = Header(None)):
+        return negotiated({"success": True, "data": brands}, accept)
+
+    return app
+
+
+def main() -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=3000)
+    parser.add_argument("--products", type=int, default=2000, help="Products in the catalog")
+    parser.add_argument("--meals", type=int, default=500, help="Meals in the catalog")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="Added latency per request")
+    parser.add_argument("--jitter-ms", type=float, default=5.0, help="Uniform +/- jitter on the latency")
+    parser.add_argument("--seed", type=int, default=1234)
+    args = parser.parse_args()
+
+    app = create_fake_backend(args.products, args.meals, args.latency_ms, args.jitter_ms, args.seed)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+"""
+Open-loop load generator for the AI service
+
+Sends requests at a fixed target rate regardless of how fast responses come back
+(open model), so a slow server shows up as growing latency instead of a silently
+lower request rate. Latency is measured from each request's scheduled start,
+which also counts the time a request waited for a free connection slot.
+
+    python -m loadtest.fake_backend --port 3000 &
+    BACKEND_API_URL=http://localhost:3000 python run.py &
+    python -m loadtest.load_generator --url http://localhost:8000 --rps 50 --duration 30 \
+        --mix recommendations=6,meal_plan=3,advice=1 --json results.json
+"""
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+import httpx
+
+GOALS = ["mass", "cut", "maintain", "endurance"]
+ACTIVITY_LEVELS = ["low", "moderate", "high", "very_high"]
+QUESTIONS = [
+    "How much creatine should I take per day?",
+    "Is whey protein better after training or before sleep?",
+    "What should I eat before a morning run?",
+    "Do I need electrolytes for a one hour session?",
+]
+
+
+@dataclass
+class Scenario:
+    name: str
+    method: str
+    path: str
+    payload: Callable[[random.Random, int], Dict]
+
+
+def _recommendations_payload(rng: random.Random, i: int) -> Dict:
+    return {
+        "user_id": f"load-user-{i % 1000}",
+        "goal": rng.choice(GOALS),
+        "activity_level": rng.choice(ACTIVITY_LEVELS),
+        "age": rng.randint(18, 60),
+        "gender": rng.choice(["male", "female"]),
+        "weight": rng.randint(55, 110),
+        "height": rng.randint(155, 200),
+        "max_products": 10,
+    }
+
+
+def _meal_plan_payload(rng: random.Random, i: int) -> Dict:
+    return {
+        "user_id": f"load-user-{i % 1000}",
+        "date": "2026-01-15",
+        "target_calories": rng.choice([1800, 2200, 2600, 3000]),
+        "target_protein": rng.choice([120, 150, 180]),
+        "target_carbs": 250,
+        "target_fats": 70,
+        "preferences": {"goal": rng.choice(GOALS), "allergies": rng.choice([[], ["peanut"], ["milk"]])},
+        "cuisine_types": rng.choice([None, ["serbian"]]),
+        "exclude_ingredients": rng.choice([None, ["mushroom"]]),
+    }
+
+
+def _advice_payload(rng: random.Random, i: int) -> Dict:
+    return {
+        "user_id": f"load-user-{i % 1000}",
+        "query": rng.choice(QUESTIONS),
+        "user_profile": {
+            "goal": rng.choice(GOALS),
+            "activity_level": rng.choice(ACTIVITY_LEVELS),
+            "age": rng.randint(18, 60),
+            "gender": rng.choice(["male", "female"]),
+        },
+    }
+
+
+SCENARIOS = {
+    "recommendations": Scenario("recommendations", "POST", "/recommendations/ai", _recommendations_payload),
+    "meal_plan": Scenario("meal_plan", "POST", "/meal-plan/generate/ai", _meal_plan_payload),
+    "advice": Scenario("advice", "POST", "/advice/personalized", _advice_payload),
+}
+
+
+@dataclass
+class ScenarioStats:
+    latencies: List[float] = field(default_factory=list)
+    statuses: Dict[str, int] = field(default_factory=dict)
+    errors: int = 0
+
+    def record(self, latency: float, status: str, ok: bool) -> None:
+        self.latencies.append(latency)
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        if not ok:
+            self.errors += 1
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile (q in 0..100)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * q // 100))
+    return ordered[int(rank) - 1]
+
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise ValueError(f"Unknown scenario {name!r}; expected one of {sorted(SCENARIOS)}")
+        weights[name] = float(weight or 1)
+    return weights
+
+
+async def run_load(
+    base_url: str,
+    mix: Dict[str, float],
+    rps: float,
+    duration: float,
+    concurrency: int = 256,
+    timeout: float = 30.0,
+    seed: int = 42,
+    client: Optional[httpx.AsyncClient] = None,
+) -> Dict:
+    """Drive the scenarios in `mix` at `rps` for `duration` seconds; returns the report."""
+    rng = random.Random(seed)
+    names = list(mix)
+    weights = [mix[n] for n in names]
+    stats = {name: ScenarioStats() for name in names}
+    slots = asyncio.Semaphore(concurrency)
+    owns_client = client is None
+    if client is None:
+        client = httpx.AsyncClient(
+            base_url=base_url,
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency),
+        )
+
+    async def fire(scenario: Scenario, payload: Dict, scheduled: float) -> None:
+        async with slots:
+            try:
+                response = await client.request(
+                    scenario.method,
+                    scenario.path,
+                    json=payload,
+                    headers={"X-User-ID": payload["user_id"]},
+                )
+                status, ok = str(response.status_code), response.status_code < 400
+            except httpx.HTTPError as e:
+                status, ok = type(e).__name__, False
+        stats[scenario.name].record(time.perf_counter() - scheduled, status, ok)
+
+    tasks = []
+    started = time.perf_counter()
+    total = int(rps * duration)
+    try:
+        for i in range(total):
+            scheduled = started + i / rps
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            scenario = SCENARIOS[rng.choices(names, weights)[0]]
+            tasks.append(asyncio.create_task(fire(scenario, scenario.payload(rng, i), scheduled)))
+        await asyncio.gather(*tasks)
+    finally:
+        if owns_client:
+            await client.aclose()
+    elapsed = time.perf_counter() - started
+
+    report = {
+        "target_rps": rps,
+        "duration_seconds": round(elapsed, 3),
+        "requests": total,
+        "achieved_rps": round(total / elapsed, 2) if elapsed else 0.0,
+        "scenarios": {},
+    }
+    for name, s in stats.items():
+        count = len(s.latencies)
+        report["scenarios"][name] = {
+            "requests": count,
+            "errors": s.errors,
+            "error_rate": round(s.errors / count, 4) if count else 0.0,
+            "throughput_rps": round((count - s.errors) / elapsed, 2) if elapsed else 0.0,
+            "statuses": s.statuses,
+            "latency_ms": {
+                "p50": round(percentile(s.latencies, 50) * 1000, 2),
+                "p90": round(percentile(s.latencies, 90) * 1000, 2),
+                "p99": round(percentile(s.latencies, 99) * 1000, 2),
+                "max": round(max(s.latencies, default=0.0) * 1000, 2),
+            },
+        }
+    return report
+
+
+def print_report(report: Dict) -> None:
+    print(
+        f"target {report['target_rps']} rps, achieved {report['achieved_rps']} rps, "
+        f"{report['requests']} requests in {report['duration_seconds']}s\n"
+    )
+    print(f"{'scenario':<16} {'requests':>8} {'errors':>7} {'ok rps':>8} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for name, s in report["scenarios"].items():
+        lat = s["latency_ms"]
+        print(
+            f"{name:<16} {s['requests']:>8} {s['errors']:>7} {s['throughput_rps']:>8} "
+            f"{lat['p50']:>9} {lat['p90']:>9} {lat['p99']:>9} {lat['max']:>9}"
+        )
+        if s["errors"]:
+            print(f"{'':<16} statuses: {s['statuses']}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000", help="AI service base URL")
+    parser.add_argument("--rps", type=float, default=20.0, help="Target requests per second")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds to send for")
+    parser.add_argument("--mix", default="recommendations=6,meal_plan=3,advice=1", help="Scenario weights")
+    parser.add_argument("--concurrency", type=int, default=256, help="Max requests in flight")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Per-request timeout (s)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", dest="json_path", help="Also write the report to this file")
+    args = parser.parse_args()
+
+    report = asyncio.run(
+        run_load(args.url, parse_mix(args.mix), args.rps, args.duration, args.concurrency, args.timeout, args.seed)
+    )
+    print_report(report)
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
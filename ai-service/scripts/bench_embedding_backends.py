@@ -0,0 +1,117 @@
+"""
+Parity and throughput benchmark for the embedding backends.
+
+Encodes the knowledge base plus sample queries with the torch backend and the ONNX
+backends (fp32 and, if exported, int8), then reports:
+
+* parity — cosine similarity of each ONNX embedding to the torch one (mean/min)
+* throughput — texts per second for batch encoding
+* latency — p50/p95 of single-query encodes (the advice request path)
+
+Exits with status 1 when a backend's minimum cosine falls below its threshold.
+
+    python scripts/bench_embedding_backends.py --texts 512
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from typing import Dict, List
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from app.config import get_settings
+from app.services.embedding_backends import EmbeddingBackend, OnnxBackend, TorchBackend
+
+SAMPLE_QUERIES = [
+    "How much protein should I eat after training?",
+    "Is creatine safe with hypertension?",
+    "Best pre-workout for endurance running",
+    "Vitamin D dosage in winter",
+    "Can I take a fat burner while cutting?",
+    "What to eat before a morning workout",
+]
+
+
+def load_corpus(limit: int) -> List[str]:
+    texts = list(SAMPLE_QUERIES)
+    knowledge = os.path.join("data", "knowledge", "initial_knowledge.jsonl")
+    if os.path.exists(knowledge):
+        with open(knowledge, encoding="utf-8") as f:
+            texts.extend(json.loads(line)["content"] for line in f if line.strip())
+    # Repeat with a suffix so batches are realistic without identical inputs
+    corpus = []
+    while len(corpus) < limit:
+        corpus.extend(f"{text} ({len(corpus) + i})" for i, text in enumerate(texts))
+    return corpus[:limit]
+
+
+def measure(backend: EmbeddingBackend, corpus: List[str], batch_size: int, latency_runs: int) -> Dict:
+    backend.encode(corpus[:batch_size])  # warm-up
+
+    started = time.perf_counter()
+    embeddings = np.vstack([
+        backend.encode(corpus[i:i + batch_size]) for i in range(0, len(corpus), batch_size)
+    ])
+    elapsed = time.perf_counter() - started
+
+    latencies = []
+    for i in range(latency_runs):
+        started = time.perf_counter()
+        backend.encode([SAMPLE_QUERIES[i % len(SAMPLE_QUERIES)]])
+        latencies.append((time.perf_counter() - started) * 1000)
+    latencies.sort()
+    return {
+        "embeddings": embeddings,
+        "texts_per_second": len(corpus) / elapsed,
+        "p50_ms": statistics.median(latencies),
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1],
+    }
+
+
+def main() -> int:
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=settings.embedding_model_name)
+    parser.add_argument("--onnx-path", default=settings.embedding_onnx_path)
+    parser.add_argument("--texts", type=int, default=512)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--latency-runs", type=int, default=50)
+    parser.add_argument("--threads", type=int, default=0, help="onnxruntime intra-op threads")
+    parser.add_argument("--min-cosine", type=float, default=0.99, help="Parity threshold for fp32 ONNX")
+    parser.add_argument("--min-cosine-quantized", type=float, default=0.95, help="Parity threshold for int8 ONNX")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.texts)
+    backends: Dict[str, EmbeddingBackend] = {"torch": TorchBackend(args.model)}
+    for name, quantized in (("onnx", False), ("onnx-int8", True)):
+        try:
+            backends[name] = OnnxBackend(
+                args.onnx_path, quantized=quantized, batch_size=args.batch_size, intra_op_threads=args.threads
+            )
+        except FileNotFoundError as e:
+            print(f"skipping {name}: {e}")
+
+    results = {name: measure(b, corpus, args.batch_size, args.latency_runs) for name, b in backends.items()}
+    reference = results["torch"]["embeddings"]
+
+    failed = False
+    print(f"{len(corpus)} texts, batch size {args.batch_size}\n")
+    print(f"{'backend':>10} {'texts/s':>9} {'speedup':>8} {'p50 ms':>8} {'p95 ms':>8} {'cos mean':>9} {'cos min':>8}")
+    for name, result in results.items():
+        cosines = np.sum(result["embeddings"] * reference, axis=1)
+        threshold = args.min_cosine_quantized if name == "onnx-int8" else args.min_cosine
+        ok = name == "torch" or cosines.min() >= threshold
+        failed = failed or not ok
+        print(f"{name:>10} {result['texts_per_second']:9.1f} "
+              f"{result['texts_per_second'] / results['torch']['texts_per_second']:7.2f}x "
+              f"{result['p50_ms']:8.2f} {result['p95_ms']:8.2f} "
+              f"{cosines.mean():9.5f} {cosines.min():8.5f}{'' if ok else '  FAIL < ' + str(threshold)}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
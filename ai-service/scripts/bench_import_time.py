@@ -0,0 +1,102 @@
+"""
+Import-time benchmark for the AI service.
+
+Runs `python -X importtime -c "import app.main"` in fresh interpreters, reports
+the median cumulative import time of `app.main` and the slowest modules, and exits
+with status 1 when the budget is exceeded or a heavy dependency (torch, chromadb,
+sentence_transformers, openai, ...) is imported at boot.
+
+    python scripts/bench_import_time.py --budget-ms 1000
+    ENABLED_FEATURES=recommendations,meal_plan python scripts/bench_import_time.py
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+SERVICE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that must only be imported on first use, never while booting a worker
+HEAVY_MODULES = (
+    "torch",
+    "sentence_transformers",
+    "transformers",
+    "chromadb",
+    "onnxruntime",
+    "openai",
+    "sklearn",
+    "pandas",
+)
+
+LINE_RE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def run_once(target: str) -> Tuple[Dict[str, Tuple[int, int]], List[str]]:
+    """Import `target` in a fresh interpreter; return {module: (self_us, cumulative_us)}."""
+    code = (
+        f"import {target}, sys; "
+        f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    )
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=SERVICE_ROOT,
+        capture_output=True,
+        text=True,
+        env={**os.environ, "PYTHONDONTWRITEBYTECODE": "0"},
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"Importing {target} failed:\n{proc.stderr[-2000:]}")
+
+    timings: Dict[str, Tuple[int, int]] = {}
+    for line in proc.stderr.splitlines():
+        match = LINE_RE.match(line)
+        if match:
+            timings[match.group(4)] = (int(match.group(1)), int(match.group(2)))
+    heavy = [m for m in proc.stdout.strip().split(",") if m]
+    return timings, heavy
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", default="app.main", help="Module to import (default: app.main)")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreter runs (default: 5)")
+    parser.add_argument("--budget-ms", type=float, default=1000.0, help="Max median import time in ms")
+    parser.add_argument("--top", type=int, default=15, help="How many slowest modules to list")
+    args = parser.parse_args()
+
+    # Warm-up run so .pyc compilation isn't measured
+    run_once(args.target)
+
+    totals: List[float] = []
+    last: Dict[str, Tuple[int, int]] = {}
+    heavy: List[str] = []
+    for _ in range(args.runs):
+        last, heavy = run_once(args.target)
+        if args.target not in last:
+            raise RuntimeError(f"{args.target} missing from -X importtime output")
+        totals.append(last[args.target][1] / 1000)
+
+    median_ms = statistics.median(totals)
+    print(f"{args.target}: median {median_ms:.1f} ms over {args.runs} runs "
+          f"(min {min(totals):.1f}, max {max(totals):.1f}), budget {args.budget_ms:.0f} ms")
+    print("\nSlowest modules by self time (last run):")
+    for name, (self_us, cumulative_us) in sorted(last.items(), key=lambda kv: -kv[1][0])[:args.top]:
+        print(f"  {self_us / 1000:8.1f} ms self  {cumulative_us / 1000:8.1f} ms cumulative  {name}")
+
+    failed = False
+    if heavy:
+        print(f"\nFAIL: heavy modules imported at boot: {', '.join(heavy)}")
+        failed = True
+    if median_ms > args.budget_ms:
+        print(f"\nFAIL: import time {median_ms:.1f} ms exceeds budget {args.budget_ms:.0f} ms")
+        failed = True
+    if not failed:
+        print("\nOK")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,154 @@
+"""
+Per-worker memory benchmark for pre-fork serving.
+
+Starts gunicorn with the given number of workers, waits until every worker reports
+ready, optionally sends a few advice requests, then reads /proc/<pid>/smaps_rollup
+of the master and each worker:
+
+* RSS — resident pages, shared ones counted in full in every process
+* PSS — shared pages divided between the processes sharing them
+* USS — pages private to the process (what a worker really costs)
+
+Compare the two modes to see how much the copy-on-write preload saves:
+
+    python scripts/bench_worker_memory.py --workers 8
+    python scripts/bench_worker_memory.py --workers 8 --no-preload
+
+Linux only (needs /proc/<pid>/smaps_rollup).
+"""
+import argparse
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+from typing import Dict, List
+import httpx
+
+SERVICE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def read_smaps_rollup(pid: int) -> Dict[str, int]:
+    """Memory counters of a process in KiB."""
+    values: Dict[str, int] = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 3 and parts[-1] == "kB":
+                values[parts[0].rstrip(":")] = int(parts[1])
+    return {
+        "rss": values.get("Rss", 0),
+        "pss": values.get("Pss", 0),
+        "uss": values.get("Private_Clean", 0) + values.get("Private_Dirty", 0),
+        "shared": values.get("Shared_Clean", 0) + values.get("Shared_Dirty", 0),
+    }
+
+
+def child_pids(pid: int) -> List[int]:
+    with open(f"/proc/{pid}/task/{pid}/children") as f:
+        return [int(p) for p in f.read().split()]
+
+
+def wait_until_ready(base_url: str, master_pid: int, workers: int, timeout: float, path: str) -> None:
+    """Wait until all workers are forked and the readiness probe keeps answering 200."""
+    deadline = time.monotonic() + timeout
+    consecutive = 0
+    while time.monotonic() < deadline:
+        try:
+            # A fresh connection per poll so the kernel spreads them across workers
+            ok = httpx.get(f"{base_url}{path}", timeout=2.0).status_code == 200
+        except httpx.HTTPError:
+            ok = False
+        consecutive = consecutive + 1 if ok else 0
+        if consecutive >= workers * 3 and len(child_pids(master_pid)) >= workers:
+            return
+        time.sleep(0.2)
+    raise TimeoutError(f"Workers not ready after {timeout:.0f}s")
+
+
+def send_load(base_url: str, requests: int) -> None:
+    payload = {
+        "user_id": "bench",
+        "query": "How much protein should I take after training?",
+        "user_profile": {"goal": "mass", "activity_level": "high", "age": 28, "gender": "male"},
+    }
+    with httpx.Client(base_url=base_url, timeout=30.0) as client:
+        for _ in range(requests):
+            client.post("/advice/personalized", json=payload)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--no-preload", action="store_true", help="Load resources per worker (PREFORK_PRELOAD=false)")
+    parser.add_argument("--requests", type=int, default=0, help="Advice requests to send before measuring")
+    parser.add_argument("--ready-path", default="/health/ready")
+    parser.add_argument("--timeout", type=float, default=180.0, help="Seconds to wait for readiness")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+    args = parser.parse_args()
+
+    port = free_port()
+    env = {
+        **os.environ,
+        "WEB_CONCURRENCY": str(args.workers),
+        "GUNICORN_BIND": f"127.0.0.1:{port}",
+        "PREFORK_PRELOAD": "false" if args.no_preload else "true",
+    }
+    master = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "app.main:app"],
+        cwd=SERVICE_ROOT,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        wait_until_ready(base_url, master.pid, args.workers, args.timeout, args.ready_path)
+        if args.requests:
+            send_load(base_url, args.requests)
+
+        master_mem = read_smaps_rollup(master.pid)
+        worker_mem = [read_smaps_rollup(pid) for pid in child_pids(master.pid)]
+    finally:
+        master.send_signal(signal.SIGTERM)
+        try:
+            master.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            master.kill()
+
+    totals = {key: master_mem[key] + sum(w[key] for w in worker_mem) for key in ("rss", "pss", "uss")}
+    result = {
+        "mode": "per-worker" if args.no_preload else "preload",
+        "workers": len(worker_mem),
+        "master_kib": master_mem,
+        "worker_kib": worker_mem,
+        "avg_worker_uss_kib": sum(w["uss"] for w in worker_mem) // max(len(worker_mem), 1),
+        "avg_worker_pss_kib": sum(w["pss"] for w in worker_mem) // max(len(worker_mem), 1),
+        "total_kib": totals,
+    }
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return 0
+
+    mib = lambda kib: f"{kib / 1024:8.1f}"
+    print(f"mode={result['mode']} workers={result['workers']}")
+    print(f"{'process':>10} {'RSS MiB':>9} {'PSS MiB':>9} {'USS MiB':>9}")
+    print(f"{'master':>10} {mib(master_mem['rss'])} {mib(master_mem['pss'])} {mib(master_mem['uss'])}")
+    for i, mem in enumerate(worker_mem):
+        print(f"{'worker ' + str(i):>10} {mib(mem['rss'])} {mib(mem['pss'])} {mib(mem['uss'])}")
+    print(f"{'total':>10} {mib(totals['rss'])} {mib(totals['pss'])} {mib(totals['uss'])}")
+    print(f"avg worker USS {result['avg_worker_uss_kib'] / 1024:.1f} MiB, "
+          f"avg worker PSS {result['avg_worker_pss_kib'] / 1024:.1f} MiB; total PSS is the pod's real footprint")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
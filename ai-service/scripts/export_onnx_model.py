@@ -0,0 +1,73 @@
+"""
+Export the sentence-transformers embedding model to ONNX for the onnx backend.
+
+Writes model.onnx (and model_quantized.onnx with --quantize, int8 dynamic
+quantization) plus tokenizer.json into the output directory. Run once on a machine
+with torch/transformers installed; the service then loads these files offline:
+
+    python scripts/export_onnx_model.py --quantize
+    EMBEDDING_BACKEND=onnx EMBEDDING_ONNX_QUANTIZED=true python run.py
+"""
+import argparse
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config import get_settings
+from app.services.embedding_backends import ONNX_MODEL_FILE, ONNX_QUANTIZED_MODEL_FILE
+from app.utils.logger import logger
+
+
+def export(model_name: str, output_dir: str, opset: int, quantize: bool) -> None:
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+
+    hub_name = model_name if "/" in model_name else f"sentence-transformers/{model_name}"
+    tokenizer = AutoTokenizer.from_pretrained(hub_name)
+    model = AutoModel.from_pretrained(hub_name).eval()
+    os.makedirs(output_dir, exist_ok=True)
+
+    sample = tokenizer(["dummy sentence for tracing"], return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+
+    model_path = os.path.join(output_dir, ONNX_MODEL_FILE)
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            tuple(sample[name] for name in input_names),
+            model_path,
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes,
+            opset_version=opset,
+        )
+    # Fast tokenizers serialize to tokenizer.json, which the `tokenizers` package loads
+    tokenizer.save_pretrained(output_dir)
+    logger.info(f"Exported {hub_name} to {model_path} ({os.path.getsize(model_path) / 1e6:.1f} MB)")
+
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        quantized_path = os.path.join(output_dir, ONNX_QUANTIZED_MODEL_FILE)
+        quantize_dynamic(model_path, quantized_path, weight_type=QuantType.QInt8)
+        logger.info(f"Quantized model written to {quantized_path} "
+                    f"({os.path.getsize(quantized_path) / 1e6:.1f} MB)")
+
+
+def main():
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=settings.embedding_model_name)
+    parser.add_argument("--output", default=settings.embedding_onnx_path)
+    parser.add_argument("--opset", type=int, default=14)
+    parser.add_argument("--quantize", action="store_true", help="Also write an int8-quantized model")
+    args = parser.parse_args()
+
+    export(args.model, args.output, args.opset, args.quantize)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""
+Replay captured requests with two ML configurations and compare the rankings.
+
+Reads capture files (`.jsonl`, `.jsonl.gz`, `.parquet`; format in app/ml/replay.py),
+re-scores every request with config A and config B in parallel batches and
+reports rank correlation (Spearman, Kendall tau-b), top-K churn, top-1 changes
+and timing:
+
+    python scripts/replay.py captures/*.jsonl.gz --config-b candidate_ml_config.json
+    python scripts/replay.py captures/ --baseline served        # code change vs. what was served
+    python scripts/replay.py --synthetic 200000 --config-b candidate_ml_config.json
+
+`--config-a` defaults to the bundled app/ml_config.json. With `--baseline served`
+side A is the score served at capture time, so run it on the changed code to see
+what a change to the scorer itself (e.g. the macro bands) does to live rankings.
+"""
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import islice
+from pathlib import Path
+from typing import Iterable, Iterator, List
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.ml.replay import CAPTURE_VERSION, ReplayStats, iter_raw_records, replay_batch
+from app.utils.ml_config import DEFAULT_CONFIG_PATH, load_ml_config
+
+
+def capture_files(inputs: List[str]) -> List[str]:
+    """Files given directly, plus every capture file inside given directories."""
+    files = []
+    for item in inputs:
+        path = Path(item)
+        if path.is_dir():
+            files.extend(
+                str(p) for p in sorted(path.rglob("*"))
+                if p.name.endswith((".jsonl", ".jsonl.gz", ".parquet"))
+            )
+        else:
+            files.append(item)
+    return files
+
+
+def synthetic_lines(n: int, candidates: int = 30, seed: int = 42) -> Iterator[bytes]:
+    """Capture lines drawn from the benchmark catalog (3 of 4 are recommendation requests)."""
+    from benchmarks.synthetic import ACTIVITY_LEVELS, GOALS, make_meals, make_products
+
+    rng = random.Random(seed)
+    # Catalog entries are serialized once and spliced into the lines
+    products = [json.dumps(p) for p in make_products(2000, seed)]
+    meals = [json.dumps(m) for m in make_meals(500, seed)]
+    for i in range(n):
+        goal, activity_level = rng.choice(GOALS), rng.choice(ACTIVITY_LEVELS)
+        if i % 4:
+            record = {
+                "v": CAPTURE_VERSION,
+                "kind": "recommendations",
+                "profile": {
+                    "goal": goal, "activity_level": activity_level, "age": rng.randint(18, 60),
+                    "gender": rng.choice(["male", "female"]), "weight": rng.randint(55, 110), "height": 178,
+                },
+                "needs": None,
+                "base_scores": [rng.randint(30, 90) for _ in range(candidates)],
+            }
+            pool, size = products, candidates
+        else:
+            record = {
+                "v": CAPTURE_VERSION,
+                "kind": "meal_plan",
+                "goal": goal,
+                "activity_level": activity_level,
+                "target_calories": rng.randint(1800, 3400),
+                "target_protein": rng.randint(100, 200),
+                "slots": ["breakfast", "lunch", "dinner", "snacks"],
+            }
+            pool, size = meals, 40
+        line = json.dumps(record)[:-1] + ', "candidates": [' + ", ".join(rng.sample(pool, size)) + "]}"
+        yield line.encode("utf-8")
+
+
+def batches(items: Iterable, size: int) -> Iterator[list]:
+    iterator = iter(items)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def tune_gc() -> None:
+    """
+    Parsed capture records are many small acyclic containers; default GC
+    thresholds rescan them over and over while a batch is held in memory.
+    """
+    gc.freeze()
+    gc.set_threshold(100_000, 50, 100)
+
+
+def run(raw_records: Iterable, config_a, config_b, baseline: str, k: int, workers: int, batch_size: int) -> ReplayStats:
+    stats = ReplayStats()
+    if workers <= 1:
+        for batch in batches(raw_records, batch_size):
+            stats.merge(replay_batch(batch, config_a, config_b, baseline, k))
+        return stats
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=tune_gc) as pool:
+        pending = set()
+        for batch in batches(raw_records, batch_size):
+            # Bounded window: reading never runs far ahead of scoring
+            if len(pending) >= workers * 2:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    stats.merge(future.result())
+            pending.add(pool.submit(replay_batch, batch, config_a, config_b, baseline, k))
+        for future in pending:
+            stats.merge(future.result())
+    return stats
+
+
+def print_report(report: dict) -> None:
+    print(f"config A: {report['config_a']}   config B: {report['config_b']}   baseline: {report['baseline']}")
+    print(
+        f"{report['records']} records ({report['by_kind']}), {report['rankings']} rankings, "
+        f"{report['skipped']} skipped"
+    )
+    for name in ("spearman", "kendall_tau_b", "top_k_churn"):
+        values = report[name]
+        print(f"  {name:<14} mean {values['mean']}   p10 {values['p10']}   p50 {values['p50']}")
+    print(f"  top-1 changed in {report['top1_changed_rate']} of rankings (K = {report['top_k']})")
+    print(
+        f"wall {report['wall_seconds']}s, {report['records_per_second']:.0f} records/s "
+        f"({report['records_per_second'] * 60 / 1e6:.2f}M/min) on {report['workers']} workers; "
+        f"encode {report['encode_seconds']}s, score A {report['score_seconds']['a']}s, "
+        f"B {report['score_seconds']['b']}s (summed over workers)"
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("inputs", nargs="*", help="Capture files or directories")
+    parser.add_argument("--config-a", default=str(DEFAULT_CONFIG_PATH), help="ML config file of side A")
+    parser.add_argument("--config-b", default=str(DEFAULT_CONFIG_PATH), help="ML config file of side B")
+    parser.add_argument("--baseline", choices=["config", "served"], default="config",
+                        help="Side A: re-score with --config-a, or the scores served at capture time")
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--batch-size", type=int, default=2000, help="Records per worker task")
+    parser.add_argument("--synthetic", type=int, default=0, help="Replay N generated records instead of files")
+    parser.add_argument("--json", dest="json_path", help="Also write the report to this file")
+    args = parser.parse_args()
+
+    if args.synthetic:
+        raw_records = synthetic_lines(args.synthetic)
+    else:
+        files = capture_files(args.inputs)
+        if not files:
+            parser.error("no capture files given (or use --synthetic N)")
+        raw_records = iter_raw_records(files)
+
+    config_a = load_ml_config(Path(args.config_a))
+    config_b = load_ml_config(Path(args.config_b))
+    tune_gc()
+    started = time.perf_counter()
+    stats = run(raw_records, config_a, config_b, args.baseline, args.top_k, args.workers, args.batch_size)
+    wall = time.perf_counter() - started
+
+    report = {
+        "config_a": "served" if args.baseline == "served" else config_a.version,
+        "config_b": config_b.version,
+        "baseline": args.baseline,
+        "top_k": args.top_k,
+        "workers": args.workers,
+        "wall_seconds": round(wall, 3),
+        "records_per_second": stats.records / wall if wall > 0 else 0.0,
+        **stats.summary(),
+    }
+    print_report(report)
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,93 @@
+"""
+Shared fixtures: a local fake OpenAI-compatible chat completions server.
+"""
+import asyncio
+import json
+import threading
+import time
+import pytest
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+FAKE_COMPLETION = "Take 5g of creatine daily."
+
+
+class FakeOpenAIState:
+    def __init__(self):
+        self.completion = FAKE_COMPLETION
+        self.delay = 0.0
+        self.active = 0
+        self.peak_active = 0
+        self.requests = []
+
+    def reset(self):
+        self.__init__()
+
+
+def create_fake_openai_app(state: FakeOpenAIState) -> FastAPI:
+    app = FastAPI()
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        state.requests.append(body)
+        state.active += 1
+        state.peak_active = max(state.peak_active, state.active)
+        try:
+            await asyncio.sleep(state.delay)
+        finally:
+            state.active -= 1
+
+        created = int(time.time())
+        if not body.get("stream"):
+            return JSONResponse({
+                "id": "chatcmpl-fake",
+                "object": "chat.completion",
+                "created": created,
+                "model": body["model"],
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": state.completion},
+                    "finish_reason": "stop",
+                }],
+                "usage": {"prompt_tokens": 10, "completion_tokens": 6, "total_tokens": 16},
+            })
+
+        async def events():
+            for token in state.completion.split(" "):
+                chunk = {
+                    "id": "chatcmpl-fake",
+                    "object": "chat.completion.chunk",
+                    "created": created,
+                    "model": body["model"],
+                    "choices": [{"index": 0, "delta": {"content": token + " "}, "finish_reason": None}],
+                }
+                yield f"data: {json.dumps(chunk)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return app
+
+
+@pytest.fixture(scope="session")
+def fake_openai_server():
+    """Run the fake server on a free localhost port for the whole test session."""
+    state = FakeOpenAIState()
+    config = uvicorn.Config(
+        create_fake_openai_app(state), host="127.0.0.1", port=0, log_level="warning"
+    )
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+
+    deadline = time.time() + 10
+    while not server.started and time.time() < deadline:
+        time.sleep(0.01)
+    port = server.servers[0].sockets[0].getsockname()[1]
+
+    yield f"http://127.0.0.1:{port}/v1", state
+
+    server.should_exit = True
+    thread.join(timeout=5)
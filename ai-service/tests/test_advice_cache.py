@@ -0,0 +1,127 @@
+"""
+Unit tests for the semantic personalized-advice cache.
+"""
+from unittest.mock import MagicMock
+import pytest
+from app.services.advice_cache import SemanticAdviceCache, age_band, profile_bucket
+from app.services.rag_service import RagService
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def cache(clock):
+    return SemanticAdviceCache(similarity_threshold=0.95, ttl_seconds=60, max_entries=3, clock=clock)
+
+
+@pytest.fixture
+def profile():
+    return {"goal": "mass", "activity_level": "high", "age": 28, "gender": "male"}
+
+
+RESPONSE = {"advice": "Take creatine daily.", "sources": ["kb_002"], "status": "success"}
+
+
+def test_age_bands():
+    assert age_band(16) == "<18"
+    assert age_band(28) == "25-34"
+    assert age_band(70) == "65+"
+    assert age_band(None) == "unknown"
+
+
+def test_profile_bucket_groups_similar_users(profile):
+    other = {**profile, "age": 31, "user_id": "someone-else"}
+    assert profile_bucket(profile) == profile_bucket(other)
+    assert profile_bucket(profile) != profile_bucket({**profile, "goal": "cut"})
+
+
+def test_conditions_split_buckets(cache, profile):
+    lactose = {**profile, "allergies": ["Lactose Intolerance"]}
+    assert profile_bucket(lactose) == profile_bucket({**profile, "allergies": ["lactose-intolerance"]})
+    cache.store(lactose, [1.0, 0.0], RESPONSE)
+
+    assert cache.lookup(profile, [1.0, 0.0]) is None
+    assert cache.lookup({**profile, "diseases": ["diabetes"]}, [1.0, 0.0]) is None
+    assert not cache.has_entries({**profile, "diseases": ["diabetes"]})
+    assert cache.lookup({**lactose, "age": 30}, [1.0, 0.0]) == RESPONSE
+
+
+def test_hit_for_similar_query_same_bucket(cache, profile):
+    cache.store(profile, [1.0, 0.0, 0.0], RESPONSE)
+
+    cached = cache.lookup({**profile, "age": 30}, [0.99, 0.05, 0.0])
+
+    assert cached == RESPONSE
+    assert cache.stats()["llm_calls_avoided"] == 1
+
+
+def test_miss_for_dissimilar_query_or_other_bucket(cache, profile):
+    cache.store(profile, [1.0, 0.0, 0.0], RESPONSE)
+
+    assert cache.lookup(profile, [0.0, 1.0, 0.0]) is None
+    assert cache.lookup({**profile, "gender": "female"}, [1.0, 0.0, 0.0]) is None
+    assert cache.stats()["misses"] == 2
+
+
+def test_cached_response_is_a_copy(cache, profile):
+    cache.store(profile, [1.0, 0.0], RESPONSE)
+    cached = cache.lookup(profile, [1.0, 0.0])
+    cached["sources"].append("mutated")
+
+    assert cache.lookup(profile, [1.0, 0.0])["sources"] == ["kb_002"]
+
+
+def test_entries_expire_after_ttl(cache, profile, clock):
+    cache.store(profile, [1.0, 0.0], RESPONSE)
+    clock.now = 61
+
+    assert cache.lookup(profile, [1.0, 0.0]) is None
+    assert len(cache) == 0
+    assert cache.stats()["expirations"] == 1
+
+
+def test_lru_eviction(cache, profile):
+    cache.store(profile, [1.0, 0.0, 0.0], {**RESPONSE, "advice": "a"})
+    cache.store(profile, [0.0, 1.0, 0.0], {**RESPONSE, "advice": "b"})
+    cache.store(profile, [0.0, 0.0, 1.0], {**RESPONSE, "advice": "c"})
+    # Touch "a" so "b" becomes least recently used
+    assert cache.lookup(profile, [1.0, 0.0, 0.0])["advice"] == "a"
+
+    cache.store({**profile, "goal": "cut"}, [1.0, 0.0, 0.0], {**RESPONSE, "advice": "d"})
+
+    assert len(cache) == 3
+    assert cache.lookup(profile, [0.0, 1.0, 0.0]) is None
+    assert cache.lookup(profile, [1.0, 0.0, 0.0])["advice"] == "a"
+    assert cache.stats()["evictions"] == 1
+
+
+async def test_lookup_embeds_only_when_bucket_has_entries(cache, profile):
+    embedding_service = MagicMock()
+    embedding_service.generate_embeddings.return_value = [1.0, 0.0]
+    rag = RagService(embedding_service, MagicMock(), advice_cache=cache)
+
+    # Empty bucket: no encode, so exact-term retrieval can still skip embedding
+    assert await rag._lookup_cached_advice(profile, "HMB") == (None, None)
+    assert embedding_service.generate_embeddings.call_count == 0
+    assert cache.stats()["misses"] == 1
+
+    # A successful answer is embedded when stored, and found by the next lookup
+    await rag._store_advice(profile, "HMB", None, RESPONSE)
+    embedding, cached = await rag._lookup_cached_advice(profile, "HMB")
+    assert embedding_service.generate_embeddings.call_count == 2
+    assert cached["advice"] == RESPONSE["advice"] and cached["cached"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
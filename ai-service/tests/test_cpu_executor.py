@@ -0,0 +1,135 @@
+"""
+Tests for the CPU process-pool executor and the batch scoring paths it runs.
+"""
+import asyncio
+import random
+import time
+import numpy as np
+import pytest
+from app.ml.meal_planner import MealPlanner
+from app.ml.scoring import PRODUCT_TYPES, ProductScorer
+from app.utils.cpu_executor import (
+    CpuExecutor,
+    ExecutorOverloadedError,
+    SharedArray,
+    call_with_shared_arrays,
+)
+
+
+@pytest.fixture
+def pool_executor():
+    executor = CpuExecutor(max_workers=1, max_pending=4, inline_threshold=0)
+    yield executor
+    executor.shutdown()
+
+
+def random_products(rng, count):
+    products, base_scores = [], []
+    for _ in range(count):
+        macros = rng.choice([
+            {},
+            {
+                "protein": rng.choice([0, rng.uniform(0, 60)]),
+                "calories": rng.choice([150, 250, 400, rng.uniform(0, 900)]),
+                "carbs": rng.choice([0, 20, rng.uniform(0, 80)]),
+                "fats": rng.uniform(0, 25),
+            },
+        ])
+        products.append({
+            "type": rng.choice(PRODUCT_TYPES + ["joint_support"]),
+            "macros": macros,
+            "brand": rng.choice([{}, {"verified": True}, {"verified": True, "premium": True}]),
+        })
+        base_scores.append(rng.choice([50, rng.uniform(0, 100)]))
+    return products, base_scores
+
+
+@pytest.mark.parametrize("goal", ["mass", "cut", "maintain", "endurance"])
+def test_batch_scores_match_scalar_scores(goal):
+    rng = random.Random(goal)
+    products, base_scores = random_products(rng, 200)
+    profile = {"goal": goal, "activity_level": "high", "age": 45, "gender": "female", "weight": 64, "height": 168}
+    needs = {"calories": 2100, "protein": 130, "carbs": 220, "fats": 60}
+
+    features, type_names = ProductScorer.product_features(products, base_scores)
+    batch = ProductScorer.calculate_scores_batch(features, type_names, profile, needs)
+
+    scalar = [ProductScorer.calculate_score(p, profile, b, needs) for p, b in zip(products, base_scores)]
+    assert batch.tolist() == scalar
+
+
+@pytest.mark.parametrize("goal", ["mass", "cut", "maintain"])
+def test_best_meal_matches_select_optimal_meals(goal):
+    rng = random.Random(goal)
+    meals = [
+        {
+            "id": i,
+            "total_macros": {"calories": rng.choice([0, 500, rng.uniform(100, 1200)]), "protein": rng.choice([0, 30, rng.uniform(0, 80)])},
+            "cuisine_type": rng.choice(["serbian", "italian", ""]),
+        }
+        for i in range(60)
+    ]
+    targets = [(450.0, 30.0), (700.0, 45.0), (250.0, 0.0)]
+
+    best = MealPlanner.best_meal_indices(
+        MealPlanner.meal_features(meals),
+        np.array([c for c, _ in targets]),
+        np.array([p for _, p in targets]),
+        goal,
+    )
+
+    for (calories, protein), index in zip(targets, best):
+        expected = MealPlanner.select_optimal_meals(meals, calories, protein, "lunch", goal)[0]
+        assert meals[index] is expected
+
+
+def test_shared_array_round_trip():
+    data = np.arange(12, dtype=np.float64).reshape(3, 4)
+    shared = SharedArray(data)
+    try:
+        assert call_with_shared_arrays(np.sum, [shared.handle], ()) == data.sum()
+    finally:
+        shared.close()
+
+
+async def test_small_inputs_run_inline():
+    executor = CpuExecutor(max_workers=1, inline_threshold=100)
+
+    result = await executor.run(np.sum, [np.ones(10)])
+
+    assert result == 10
+    assert executor.stats()["inline"] == 1
+    assert executor.stats()["submitted"] == 0
+
+
+async def test_process_pool_scoring_matches_inline(pool_executor):
+    products, base_scores = random_products(random.Random(7), 500)
+    profile = {"goal": "mass", "activity_level": "moderate", "age": 30, "gender": "male", "weight": 80, "height": 180}
+    features, type_names = ProductScorer.product_features(products, base_scores)
+
+    scores = await pool_executor.run(
+        ProductScorer.calculate_scores_batch, [features], type_names, profile, None
+    )
+
+    expected = ProductScorer.calculate_scores_batch(features, type_names, profile, None)
+    np.testing.assert_array_equal(scores, expected)
+    stats = pool_executor.stats()
+    assert stats["completed"] == 1 and stats["pending"] == 0
+
+
+async def test_admission_limit_rejects_when_full():
+    executor = CpuExecutor(max_workers=1, max_pending=1, inline_threshold=0)
+    try:
+        first = asyncio.create_task(executor.run(time.sleep, [], 0.5, size=1))
+        await asyncio.sleep(0)
+        with pytest.raises(ExecutorOverloadedError):
+            await executor.run(time.sleep, [], 0, size=1)
+        await first
+        assert executor.stats()["rejected"] == 1
+        assert executor.stats()["peak_pending"] == 1
+    finally:
+        executor.shutdown()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
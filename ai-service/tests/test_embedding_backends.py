@@ -0,0 +1,89 @@
+"""
+Tests for the embedding inference backends.
+"""
+import numpy as np
+import pytest
+from app.services.embedding_backends import (
+    ONNX_MODEL_FILE,
+    TOKENIZER_FILE,
+    OnnxBackend,
+    create_backend,
+    mean_pool_normalize,
+)
+
+
+def test_mean_pool_ignores_padding_and_normalizes():
+    tokens = np.array([[[1.0, 0.0], [3.0, 0.0], [100.0, 100.0]]], dtype=np.float32)
+    mask = np.array([[1, 1, 0]])
+
+    pooled = mean_pool_normalize(tokens, mask)
+
+    np.testing.assert_allclose(pooled, [[1.0, 0.0]], atol=1e-6)
+
+
+def test_unknown_backend_rejected():
+    with pytest.raises(ValueError):
+        create_backend("tensorflow", "all-MiniLM-L6-v2")
+
+
+def test_onnx_backend_requires_local_export(tmp_path):
+    with pytest.raises(FileNotFoundError, match="export_onnx_model"):
+        OnnxBackend(str(tmp_path))
+
+
+@pytest.fixture
+def tiny_onnx_model(tmp_path):
+    """An embedding-lookup "transformer" exported to ONNX with a word-level tokenizer."""
+    onnx = pytest.importorskip("onnx")
+    pytest.importorskip("onnxruntime")
+    tokenizers = pytest.importorskip("tokenizers")
+    from onnx import TensorProto, helper, numpy_helper
+
+    vocab = {"[PAD]": 0, "[UNK]": 1, "whey": 2, "protein": 3, "creatine": 4}
+    table = np.random.default_rng(0).normal(size=(len(vocab), 8)).astype(np.float32)
+    graph = helper.make_graph(
+        [helper.make_node("Gather", ["table", "input_ids"], ["last_hidden_state"])],
+        "tiny",
+        [
+            helper.make_tensor_value_info("input_ids", TensorProto.INT64, ["batch", "sequence"]),
+            helper.make_tensor_value_info("attention_mask", TensorProto.INT64, ["batch", "sequence"]),
+        ],
+        [helper.make_tensor_value_info("last_hidden_state", TensorProto.FLOAT, ["batch", "sequence", 8])],
+        initializer=[numpy_helper.from_array(table, "table")],
+    )
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", 14)])
+    model.ir_version = 8
+    onnx.save(model, str(tmp_path / ONNX_MODEL_FILE))
+
+    tokenizer = tokenizers.Tokenizer(tokenizers.models.WordLevel(vocab, unk_token="[UNK]"))
+    tokenizer.pre_tokenizer = tokenizers.pre_tokenizers.Whitespace()
+    tokenizer.enable_padding(pad_id=0, pad_token="[PAD]")
+    tokenizer.save(str(tmp_path / TOKENIZER_FILE))
+    return tmp_path, vocab, table
+
+
+def test_onnx_backend_pools_token_embeddings(tiny_onnx_model):
+    model_dir, vocab, table = tiny_onnx_model
+    backend = OnnxBackend(str(model_dir), batch_size=1)
+
+    embeddings = backend.encode(["whey protein", "creatine"])
+
+    expected = table[[vocab["whey"], vocab["protein"]]].mean(axis=0)
+    expected /= np.linalg.norm(expected)
+    assert embeddings.shape == (2, 8)
+    np.testing.assert_allclose(embeddings[0], expected, rtol=1e-5)
+    np.testing.assert_allclose(np.linalg.norm(embeddings, axis=1), 1.0, rtol=1e-5)
+
+
+def test_onnx_backend_padding_does_not_change_embeddings(tiny_onnx_model):
+    model_dir, _, _ = tiny_onnx_model
+    backend = OnnxBackend(str(model_dir))
+
+    alone = backend.encode(["creatine"])
+    padded = backend.encode(["creatine", "whey protein creatine whey"])
+
+    np.testing.assert_allclose(alone[0], padded[0], rtol=1e-5)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
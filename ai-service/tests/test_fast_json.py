@@ -0,0 +1,106 @@
+"""
+Tests for the fast JSON response path: same bytes as FastAPI's default path.
+"""
+from datetime import date, datetime, timezone
+from unittest.mock import AsyncMock, MagicMock
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+from fastapi.testclient import TestClient
+from fastapi.utils import create_response_field
+from benchmarks.synthetic import make_meals, make_recommendations
+from app.models.meal_plan import MealPlanResponse
+from app.models.recommendation import ProductRecommendationRequest, RecommendationsResponse
+from app.routers import meal_plan
+from app.services.recommendation_service import RecommendationService
+from app.utils.fast_json import FastJSONResponse, _may_diverge
+
+
+def default_body(model):
+    """Bytes of the pre-existing path: validated model -> response_model serialization -> JSONResponse."""
+    model_type = type(model)
+    validated = model_type.model_validate(model.model_dump())
+    field = create_response_field(name="response", type_=model_type)
+    value, errors = field.validate(validated, {}, loc=("response",))
+    assert not errors
+    return JSONResponse(field.serialize(value)).body
+
+
+def meal_plan_model(meals, **overrides):
+    values = dict(
+        meal_plan_id="plan-1",
+        date=date(2026, 3, 1),
+        meals=meals,
+        total_calories=2400.0,
+        total_protein=160.0,
+        total_carbs=250.0,
+        total_fats=70.0,
+        generated_at=datetime(2026, 3, 1, 8, 30, 15, 120000),
+        preferences_applied={"goal": "cut", "note": "без глютена   \"quoted\" \x1f"},
+        ml_config_version="abc123",
+    )
+    values.update(overrides)
+    return MealPlanResponse.model_construct(**values)
+
+
+def test_recommendations_match_default_path():
+    service = RecommendationService("http://backend")
+    request = ProductRecommendationRequest(
+        user_id="u1", goal="mass", activity_level="high", age=30, gender="male", weight=82, height=181
+    )
+    enhanced = service._enhance_recommendations(make_recommendations(40), request)
+    model = RecommendationsResponse.model_construct(
+        recommendations=enhanced,
+        generated_at=datetime(2026, 3, 1, 8, 30),
+        user_profile_summary={"goal": "mass", "age": 30},
+        ml_config_version=None,
+    )
+    body = FastJSONResponse(model).body
+    assert body == default_body(model)
+    # Served by orjson, not the fallback
+    assert not _may_diverge(body)
+
+
+@pytest.mark.parametrize("value", [0.5, 1e-05, 1e16, 1.5e300, -2.5e-7, 2 ** 70, 123456789.125])
+def test_divergent_numbers_fall_back_to_default(value):
+    meals = [{"meal": {"name": "x", "total_macros": {"calories": 500, "b12": value}}, "servings": 1}]
+    model = meal_plan_model(meals + [{"meal": m} for m in make_meals(5)])
+    assert FastJSONResponse(model).body == default_body(model)
+
+
+def test_values_orjson_cannot_encode_fall_back():
+    meals = [{"meal": {"tags": {"vegan"}, "ts": datetime(2026, 1, 1, tzinfo=timezone.utc)}}]
+    model = meal_plan_model(meals + [{"meal": m} for m in make_meals(5)])
+    assert FastJSONResponse(model).body == default_body(model)
+
+
+def test_meal_plan_endpoint_bytes(monkeypatch):
+    backend_plan = {
+        "id": "plan-7",
+        # Integer totals: the response still reads 2100.0 as with validation
+        "total_calories": 2100,
+        "meals": [{"meal_type": m["meal_type"], "meal": m, "servings": 1} for m in make_meals(8)],
+    }
+    backend_response = httpx.Response(200, json={"success": True, "data": backend_plan})
+    client = MagicMock()
+    client.post = AsyncMock(return_value=backend_response)
+    monkeypatch.setattr(meal_plan.meal_plan_service, "client", client)
+
+    app = FastAPI()
+    app.include_router(meal_plan.router)
+    body = {
+        "user_id": "u1", "date": "2026-03-01", "target_calories": 2400, "target_protein": 160,
+        "target_carbs": 250, "target_fats": 70, "preferences": {"goal": "cut"},
+    }
+    response = TestClient(app).post("/meal-plan/generate/ai", json=body)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/json"
+
+    model = MealPlanResponse.model_validate_json(response.content)
+    assert response.json()["total_calories"] == 2100.0 and b'"total_calories":2100.0' in response.content
+    assert response.content == default_body(model)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,51 @@
+"""
+Tests for liveness/readiness probes.
+"""
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.routers.health import router as health_router
+from app.utils.readiness import Readiness
+
+
+@pytest.fixture
+def app():
+    app = FastAPI()
+    app.include_router(health_router)
+    app.state.readiness = Readiness()
+    return app
+
+
+def test_liveness_does_not_wait_for_warmup(app):
+    app.state.readiness.register("rag")
+    client = TestClient(app)
+
+    assert client.get("/health").status_code == 200
+    assert client.get("/health/ready").status_code == 503
+
+
+def test_ready_after_warmup(app):
+    app.state.readiness.register("rag")
+    app.state.readiness.mark_ready("rag")
+
+    response = TestClient(app).get("/health/ready")
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["ready"] is True
+    assert body["components"]["rag"]["status"] == "ready"
+
+
+def test_failed_warmup_stays_unready(app):
+    app.state.readiness.register("rag")
+    app.state.readiness.mark_failed("rag", "model download failed")
+
+    response = TestClient(app).get("/health/ready")
+
+    assert response.status_code == 503
+    assert response.json()["components"]["rag"]["error"] == "model download failed"
+    assert not app.state.readiness.is_pending("rag")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,141 @@
+"""
+Tests for the incremental, content-hashed knowledge ingestion pipeline.
+"""
+import json
+import pytest
+from app.services.ingestion_service import (
+    HASH_METADATA_KEY,
+    IngestionPipeline,
+    iter_documents,
+)
+
+
+class InMemoryVectorStore:
+    """Minimal vector store keeping documents in a dict."""
+
+    def __init__(self):
+        self.rows = {}
+        self.upsert_calls = 0
+
+    def iter_metadatas(self, collection_name, page_size=5000):
+        for doc_id, row in list(self.rows.items()):
+            yield doc_id, row["metadata"]
+
+    def upsert_documents(self, collection_name, ids, embeddings, metadatas, documents):
+        self.upsert_calls += 1
+        for doc_id, embedding, metadata, document in zip(ids, embeddings, metadatas, documents):
+            self.rows[doc_id] = {"embedding": embedding, "metadata": metadata, "document": document}
+
+    def delete_documents(self, collection_name, ids):
+        for doc_id in ids:
+            self.rows.pop(doc_id, None)
+
+
+class CountingEmbeddingService:
+    def __init__(self):
+        self.embedded_texts = []
+
+    def generate_embeddings(self, texts):
+        self.embedded_texts.extend(texts)
+        return [[float(len(text)), 1.0] for text in texts]
+
+
+def write_jsonl(path, records):
+    with path.open("w", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+
+
+@pytest.fixture
+def records():
+    return [
+        {"id": f"kb_{i:03d}", "content": f"Knowledge document {i}", "metadata": {"category": "nutrition"}}
+        for i in range(10)
+    ]
+
+
+@pytest.fixture
+def store():
+    return InMemoryVectorStore()
+
+
+@pytest.fixture
+def embedder():
+    return CountingEmbeddingService()
+
+
+def make_pipeline(embedder, store):
+    return IngestionPipeline(embedder, store, batch_size=3, workers=2, chunk_size=4)
+
+
+def test_initial_run_embeds_everything(tmp_path, records, store, embedder):
+    write_jsonl(tmp_path / "kb.jsonl", records)
+
+    stats = make_pipeline(embedder, store).run([str(tmp_path)])
+
+    assert stats.new == 10
+    assert stats.embedded == 10
+    assert len(store.rows) == 10
+    assert all(HASH_METADATA_KEY in row["metadata"] for row in store.rows.values())
+    assert store.rows["kb_000"]["metadata"]["category"] == "nutrition"
+
+
+def test_rerun_without_changes_embeds_nothing(tmp_path, records, store, embedder):
+    write_jsonl(tmp_path / "kb.jsonl", records)
+    pipeline = make_pipeline(embedder, store)
+    pipeline.run([str(tmp_path)])
+    embedder.embedded_texts.clear()
+
+    stats = pipeline.run([str(tmp_path)])
+
+    assert stats.unchanged == 10
+    assert stats.embedded == 0
+    assert embedder.embedded_texts == []
+
+
+def test_changed_and_removed_documents(tmp_path, records, store, embedder):
+    write_jsonl(tmp_path / "kb.jsonl", records)
+    pipeline = make_pipeline(embedder, store)
+    pipeline.run([str(tmp_path)])
+    embedder.embedded_texts.clear()
+
+    updated = records[:8]
+    updated[0] = {**updated[0], "content": "Updated content"}
+    updated[1] = {**updated[1], "metadata": {"category": "supplements"}}
+    write_jsonl(tmp_path / "kb.jsonl", updated)
+
+    stats = pipeline.run([str(tmp_path)])
+
+    assert stats.changed == 2
+    assert stats.unchanged == 6
+    assert stats.deleted == 2
+    assert sorted(embedder.embedded_texts) == sorted(["Updated content", "Knowledge document 1"])
+    assert "kb_009" not in store.rows
+    assert store.rows["kb_000"]["document"] == "Updated content"
+
+
+def test_empty_source_does_not_prune(tmp_path, records, store, embedder):
+    write_jsonl(tmp_path / "kb.jsonl", records)
+    pipeline = make_pipeline(embedder, store)
+    pipeline.run([str(tmp_path / "kb.jsonl")])
+
+    stats = pipeline.run([str(tmp_path / "missing")])
+
+    assert stats.deleted == 0
+    assert len(store.rows) == 10
+
+
+def test_iter_documents_reads_text_files(tmp_path):
+    (tmp_path / "guides").mkdir()
+    (tmp_path / "guides" / "hydration.md").write_text("Drink water regularly.", encoding="utf-8")
+    (tmp_path / "notes.txt").write_text("  ", encoding="utf-8")
+
+    documents = list(iter_documents([str(tmp_path)]))
+
+    assert len(documents) == 1
+    assert documents[0].id == "guides/hydration"
+    assert documents[0].metadata == {"source": "guides/hydration.md"}
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
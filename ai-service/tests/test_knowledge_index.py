@@ -0,0 +1,176 @@
+"""
+Unit tests for the in-memory knowledge index, its facet bitmaps and BM25 index.
+"""
+import numpy as np
+import pytest
+from app.utils.bm25_index import BM25Index, reciprocal_rank_fusion, tokenize
+from app.utils import knowledge_index as knowledge_index_module
+from app.utils.knowledge_index import (
+    FacetIndex,
+    KnowledgeIndex,
+    conditions_match,
+    get_knowledge_index,
+    invalidate_knowledge_index,
+    profile_conditions,
+)
+
+
+@pytest.fixture
+def metadatas():
+    return [
+        {"category": "supplements", "type": "protein"},
+        {"category": "health", "target": "lactose_intolerance"},
+        {"category": "nutrition", "goal": "mass"},
+        {"category": "nutrition", "goal": "endurance"},
+        {"category": "supplements", "type": "pre_workout"},
+    ]
+
+
+@pytest.fixture
+def knowledge_index(metadatas):
+    embeddings = np.eye(len(metadatas), dtype=np.float32)
+    return KnowledgeIndex(
+        ids=[f"kb_{i}" for i in range(len(metadatas))],
+        documents=[f"doc {i}" for i in range(len(metadatas))],
+        metadatas=metadatas,
+        embeddings=embeddings,
+    )
+
+
+class TestFacetIndex:
+    def test_match_builds_bitmaps(self, metadatas):
+        facets = FacetIndex(metadatas)
+
+        assert facets.match("category", ["supplements"]).tolist() == [True, False, False, False, True]
+        assert facets.match("type", ["protein", "pre_workout"]).tolist() == [
+            True, False, False, False, True,
+        ]
+        assert not facets.match("goal", ["cut"]).any()
+
+    def test_profile_mask_filters_goal_and_conditions(self, metadatas):
+        facets = FacetIndex(metadatas)
+
+        mask = facets.profile_mask({"goal": "mass"})
+        # Other goals and condition-targeted documents are excluded
+        assert mask.tolist() == [True, False, True, False, True]
+
+        mask = facets.profile_mask({"goal": "mass", "allergies": ["Lactose"]})
+        assert mask.tolist() == [True, True, True, False, True]
+
+    def test_conditions_match_whole_terms(self):
+        assert conditions_match("lactose", "lactose_intolerance")
+        assert conditions_match("severe_lactose_intolerance", "lactose_intolerance")
+        assert not conditions_match("ra", "cardiac_arrhythmia")
+        assert not conditions_match("iron", "ironman_recovery")
+        assert not conditions_match("heart_disease", "kidney_disease")
+
+        facets = FacetIndex([{"target": "cardiac_arrhythmia"}, {"target": "diabetes"}])
+        assert facets.profile_mask({"diseases": ["RA"]}).tolist() == [False, False]
+
+    def test_profile_conditions_normalized(self):
+        conditions = profile_conditions(
+            {"allergies": ["Lactose Intolerance"], "diseases": "diabetes", "medications": None}
+        )
+        assert conditions == ["lactose_intolerance", "diabetes"]
+
+
+class FakeVectorStore:
+    def __init__(self, n):
+        self.n = n
+        self.loads = 0
+
+    def count(self, collection_name):
+        return self.n
+
+    def get_all(self, collection_name):
+        self.loads += 1
+        return {
+            "ids": [f"kb_{i}" for i in range(self.n)],
+            "documents": [f"doc {i}" for i in range(self.n)],
+            "metadatas": [{} for _ in range(self.n)],
+            "embeddings": np.eye(self.n, dtype=np.float32),
+        }
+
+
+def test_cached_index_reloads_when_collection_count_changes(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(knowledge_index_module.time, "monotonic", lambda: now[0])
+    store = FakeVectorStore(2)
+    invalidate_knowledge_index("test_kb")
+    try:
+        assert len(get_knowledge_index(store, "test_kb", check_seconds=60)) == 2
+        store.n = 3  # ingested by another process
+        now[0] = 30.0
+        assert len(get_knowledge_index(store, "test_kb", check_seconds=60)) == 2
+        now[0] = 61.0
+        assert len(get_knowledge_index(store, "test_kb", check_seconds=60)) == 3
+        now[0] = 200.0
+        get_knowledge_index(store, "test_kb", check_seconds=60)
+        assert store.loads == 2  # unchanged count: no reload
+    finally:
+        invalidate_knowledge_index("test_kb")
+
+
+class TestKnowledgeIndex:
+    def test_search_without_mask_ranks_by_similarity(self, knowledge_index):
+        query = np.array([0.1, 0.0, 0.9, 0.0, 0.3])
+        hits = knowledge_index.search(query, n_results=2)
+
+        assert [row for row, _ in hits] == [2, 4]
+        assert hits[0][1] > hits[1][1]
+
+    def test_search_only_scans_masked_rows(self, knowledge_index):
+        mask = knowledge_index.build_mask({"goal": "endurance"})
+        query = np.array([0.0, 0.0, 1.0, 0.0, 0.0])  # closest to the "mass" document
+        hits = knowledge_index.search(query, n_results=5, mask=mask)
+
+        rows = [row for row, _ in hits]
+        assert 2 not in rows
+        assert 1 not in rows
+        assert set(rows) == {0, 3, 4}
+
+    def test_empty_mask_falls_back_to_full_search(self, knowledge_index):
+        assert knowledge_index.build_mask(facets={"type": "creatine"}) is None
+        assert knowledge_index.build_mask() is None
+
+
+class TestBM25Index:
+    @pytest.fixture
+    def bm25(self):
+        return BM25Index([
+            "Whey protein is rapidly absorbed and ideal for post-workout recovery.",
+            "Beta-alanine helps buffer lactic acid during high-intensity exercise.",
+            "HMB may reduce muscle protein breakdown in older athletes.",
+            "ZMA combines zinc, magnesium and vitamin B6.",
+        ])
+
+    def test_tokenize_keeps_hyphenated_compounds(self):
+        tokens = tokenize("Is Beta-Alanine safe?")
+        assert "beta-alanine" in tokens
+        assert "alanine" in tokens
+        assert "is" not in tokens
+
+    def test_exact_short_names_ranked_first(self, bm25):
+        assert bm25.search("HMB", n_results=1)[0][0] == 2
+        assert bm25.search("zma", n_results=1)[0][0] == 3
+        assert bm25.search("beta-alanine", n_results=1)[0][0] == 1
+
+    def test_exact_term_query_detection(self, bm25):
+        assert bm25.is_exact_term_query("HMB")
+        assert bm25.is_exact_term_query("what is ZMA")
+        assert not bm25.is_exact_term_query("ashwagandha")
+        assert not bm25.is_exact_term_query("protein for recovery after intense exercise")
+
+    def test_search_respects_mask(self, bm25):
+        mask = np.array([True, False, False, True])
+        rows = [row for row, _ in bm25.search("protein", n_results=4, mask=mask)]
+        assert rows == [0]
+
+    def test_reciprocal_rank_fusion_rewards_agreement(self):
+        fused = reciprocal_rank_fusion([[(1, 9.0), (2, 5.0)], [(2, 0.9), (3, 0.8)]], k=60)
+        assert fused[0][0] == 2
+        assert {row for row, _ in fused} == {1, 2, 3}
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,97 @@
+"""
+Tests for the async LLM client against a local fake OpenAI-compatible server.
+"""
+import asyncio
+import pytest
+from app.services.llm_client import LLMClient, LLMUnavailableError
+
+MESSAGES = [{"role": "user", "content": "How much creatine should I take?"}]
+
+
+@pytest.fixture
+def fake_server(fake_openai_server):
+    base_url, state = fake_openai_server
+    state.reset()
+    return base_url, state
+
+
+def make_client(base_url, **kwargs):
+    return LLMClient(api_key="test-key", model="fake-model", base_url=base_url, **kwargs)
+
+
+@pytest.mark.asyncio
+async def test_complete_returns_full_text(fake_server):
+    base_url, state = fake_server
+    client = make_client(base_url)
+
+    advice = await client.complete(MESSAGES)
+
+    assert advice == state.completion
+    assert state.requests[0]["model"] == "fake-model"
+    await client.close()
+
+
+@pytest.mark.asyncio
+async def test_stream_yields_tokens_in_order(fake_server):
+    base_url, state = fake_server
+    client = make_client(base_url)
+
+    tokens = [token async for token in client.stream(MESSAGES)]
+
+    assert len(tokens) > 1
+    assert "".join(tokens).strip() == state.completion
+    assert client.in_flight == 0
+    await client.close()
+
+
+@pytest.mark.asyncio
+async def test_completion_does_not_block_event_loop(fake_server):
+    base_url, state = fake_server
+    state.delay = 0.3
+    client = make_client(base_url)
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.01)
+            ticks += 1
+
+    ticker_task = asyncio.create_task(ticker())
+    await client.complete(MESSAGES)
+    ticker_task.cancel()
+
+    assert ticks >= 10
+    await client.close()
+
+
+@pytest.mark.asyncio
+async def test_concurrency_limit(fake_server):
+    base_url, state = fake_server
+    state.delay = 0.1
+    client = make_client(base_url, max_concurrency=2)
+
+    results = await asyncio.gather(*(client.complete(MESSAGES) for _ in range(6)))
+
+    assert results == [state.completion] * 6
+    assert state.peak_active <= 2
+    await client.close()
+
+
+@pytest.mark.asyncio
+async def test_queue_timeout_raises(fake_server):
+    base_url, state = fake_server
+    state.delay = 0.5
+    client = make_client(base_url, max_concurrency=1, queue_timeout=0.05)
+
+    results = await asyncio.gather(
+        client.complete(MESSAGES), client.complete(MESSAGES), return_exceptions=True
+    )
+
+    assert state.completion in results
+    assert any(isinstance(r, LLMUnavailableError) for r in results)
+    await client.close()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
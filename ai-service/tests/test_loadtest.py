@@ -0,0 +1,70 @@
+"""
+Tests for the load-test harness: fake backend API and load generator.
+"""
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from loadtest.fake_backend import create_fake_backend
+from loadtest.load_generator import parse_mix, percentile, run_load
+
+
+@pytest.fixture(scope="module")
+def backend():
+    return TestClient(create_fake_backend(products=30, meals=40, latency_ms=0, jitter_ms=0))
+
+
+def test_fake_backend_serves_ai_service_endpoints(backend):
+    recommendations = backend.get("/api/v1/recommendations", headers={"X-User-ID": "u1"}).json()
+    needs = backend.get("/api/v1/nutrition/calculate").json()
+    plan = backend.post("/api/v1/meal-plan/generate", json={"date": "2026-01-15"}).json()
+
+    assert len(recommendations["data"]) == 30
+    assert {"product", "score", "reasons", "warnings"} <= set(recommendations["data"][0])
+    assert needs["data"]["protein"] > 0
+    assert [item["meal_type"] for item in plan["data"]["meals"]] == ["breakfast", "lunch", "snack", "dinner"]
+    assert all("total_macros" in item["meal"] for item in plan["data"]["meals"])
+
+
+def test_fake_backend_paginates_products(backend):
+    first = backend.get("/api/v1/products", params={"limit": 20, "offset": 0}).json()
+    rest = backend.get("/api/v1/products", params={"limit": 20, "offset": 20}).json()
+
+    assert first["meta"]["total"] == 30
+    assert len(first["data"]) + len(rest["data"]) == 30
+
+
+def test_percentile_and_mix():
+    values = [0.001 * i for i in range(1, 101)]
+
+    assert percentile(values, 50) == pytest.approx(0.05)
+    assert percentile(values, 99) == pytest.approx(0.099)
+    assert percentile([], 90) == 0.0
+    assert parse_mix("recommendations=3,advice") == {"recommendations": 3.0, "advice": 1.0}
+    with pytest.raises(ValueError):
+        parse_mix("unknown=1")
+
+
+async def test_run_load_reports_per_scenario():
+    app = FastAPI()
+
+    @app.post("/recommendations/ai")
+    async def recommendations():
+        return {"recommendations": []}
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://ai") as client:
+        report = await run_load(
+            "http://ai", {"recommendations": 1, "advice": 1}, rps=100, duration=0.2, client=client
+        )
+
+    assert report["requests"] == 20
+    scenarios = report["scenarios"]
+    assert scenarios["recommendations"]["requests"] + scenarios["advice"]["requests"] == 20
+    assert scenarios["recommendations"]["errors"] == 0
+    # /advice/personalized isn't mounted on this app
+    assert scenarios["advice"]["statuses"] == {"404": scenarios["advice"]["requests"]}
+    assert scenarios["recommendations"]["latency_ms"]["p99"] >= scenarios["recommendations"]["latency_ms"]["p50"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
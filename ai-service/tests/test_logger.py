@@ -0,0 +1,87 @@
+"""
+Tests for the queued, sampled logging sink.
+"""
+import io
+import json
+import threading
+import pytest
+from loguru import logger
+from app.utils.logger import QueuedSink, parse_sample_rates
+
+
+class BlockingStream(io.StringIO):
+    """Stream whose writes wait until released, to fill the queue."""
+
+    def __init__(self):
+        super().__init__()
+        self.release = threading.Event()
+
+    def write(self, text):
+        self.release.wait(5)
+        return super().write(text)
+
+
+@pytest.fixture
+def attach():
+    handler_ids = []
+
+    def _attach(sink, level="DEBUG"):
+        handler_ids.append(logger.add(sink, level=level, format="{message}"))
+        return sink
+
+    yield _attach
+    for handler_id in handler_ids:
+        logger.remove(handler_id)
+
+
+def test_json_lines_with_extra_fields(attach):
+    stream = io.StringIO()
+    sink = attach(QueuedSink([(stream, True)]))
+
+    logger.bind(user_id="u1").info("generated {} items", 3)
+    sink.flush()
+
+    entry = json.loads(stream.getvalue().splitlines()[-1])
+    assert entry["level"] == "INFO"
+    assert entry["message"] == "generated 3 items"
+    assert entry["extra"] == {"user_id": "u1"}
+    assert entry["function"] == "test_json_lines_with_extra_fields"
+
+
+def test_sampling_keeps_fraction_per_key(attach):
+    stream = io.StringIO()
+    sink = attach(QueuedSink([(stream, False)], sample_rates={"hot": 0.1}))
+
+    hot = logger.bind(log_key="hot")
+    for i in range(100):
+        hot.info(f"hot {i}")
+    logger.bind(log_key="other").info("unsampled key")
+    sink.flush()
+
+    lines = stream.getvalue().splitlines()
+    assert sum("hot" in line for line in lines) == 10
+    assert any("unsampled key" in line for line in lines)
+    assert sink.stats()["sampled_out"] == {"hot": 90}
+
+
+def test_full_queue_drops_and_counts(attach):
+    stream = BlockingStream()
+    sink = attach(QueuedSink([(stream, False)], max_queue=5))
+
+    for i in range(50):
+        logger.debug(f"message {i}")
+    stream.release.set()
+    sink.flush()
+
+    stats = sink.stats()
+    assert stats["dropped"]["DEBUG"] > 0
+    assert stats["written"] + stats["dropped"]["DEBUG"] == 50
+
+
+def test_parse_sample_rates():
+    assert parse_sample_rates("a=0.5, b=2,c=") == {"a": 0.5, "b": 1.0}
+    assert parse_sample_rates("") == {}
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
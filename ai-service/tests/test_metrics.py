@@ -0,0 +1,126 @@
+"""
+Tests for the in-process metrics, stage timers and the /metrics endpoint.
+"""
+import asyncio
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from app.routers.metrics import router as metrics_router
+from app.utils.metrics import (
+    HTTP_ERRORS,
+    HTTP_IN_FLIGHT,
+    HTTP_REQUESTS,
+    STAGE_DURATION,
+    MetricsMiddleware,
+    MetricsRegistry,
+    timed,
+)
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+    app.include_router(metrics_router)
+
+    @app.get("/items/{item_id}")
+    async def get_item(item_id: str):
+        return {"id": item_id}
+
+    @app.get("/broken")
+    async def broken():
+        raise HTTPException(status_code=502, detail="backend down")
+
+    return TestClient(app)
+
+
+def test_histogram_exposition_is_cumulative():
+    registry = MetricsRegistry()
+    histogram = registry.histogram("latency_seconds", "Latency.", ("stage",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 2.0):
+        histogram.observe(value, stage="a")
+
+    text = registry.render()
+
+    assert "# TYPE latency_seconds histogram" in text
+    assert 'latency_seconds_bucket{stage="a",le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{stage="a",le="1"} 2' in text
+    assert 'latency_seconds_bucket{stage="a",le="+Inf"} 3' in text
+    assert 'latency_seconds_sum{stage="a"} 2.55' in text
+    assert 'latency_seconds_count{stage="a"} 3' in text
+
+
+def test_label_values_are_escaped_and_checked():
+    registry = MetricsRegistry()
+    counter = registry.counter("events_total", "Events.", ("kind",))
+    counter.inc(kind='say "hi"\n')
+
+    assert 'events_total{kind="say \\"hi\\"\\n"} 1' in registry.render()
+    with pytest.raises(ValueError):
+        counter.inc(other="x")
+
+
+def test_timed_as_context_manager_and_decorators():
+    before = STAGE_DURATION.count(stage="test.block")
+    with timed("test.block"):
+        pass
+
+    @timed("test.sync")
+    def sync_stage(x):
+        return x * 2
+
+    @timed("test.async")
+    async def async_stage(x):
+        await asyncio.sleep(0)
+        return x + 1
+
+    assert sync_stage(2) == 4
+    assert asyncio.run(async_stage(1)) == 2
+    assert STAGE_DURATION.count(stage="test.block") == before + 1
+    assert STAGE_DURATION.count(stage="test.sync") >= 1
+    assert STAGE_DURATION.count(stage="test.async") >= 1
+
+
+def test_timed_records_failures_too():
+    before = STAGE_DURATION.count(stage="test.failing")
+
+    with pytest.raises(RuntimeError):
+        with timed("test.failing"):
+            raise RuntimeError("boom")
+
+    assert STAGE_DURATION.count(stage="test.failing") == before + 1
+
+
+def test_middleware_labels_by_route_template(client):
+    before = HTTP_REQUESTS.value(method="GET", route="/items/{item_id}", status="200")
+
+    client.get("/items/1")
+    client.get("/items/2")
+    client.get("/no-such-page")
+
+    assert HTTP_REQUESTS.value(method="GET", route="/items/{item_id}", status="200") == before + 2
+    assert HTTP_REQUESTS.value(method="GET", route="unmatched", status="404") >= 1
+    assert HTTP_IN_FLIGHT.value(route="/items/{item_id}") == 0
+
+
+def test_middleware_counts_server_errors(client):
+    before = HTTP_ERRORS.value(method="GET", route="/broken")
+
+    client.get("/broken")
+
+    assert HTTP_ERRORS.value(method="GET", route="/broken") == before + 1
+
+
+def test_metrics_endpoint_serves_prometheus_text(client):
+    client.get("/items/1")
+
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert 'http_requests_total{method="GET",route="/items/{item_id}",status="200"}' in response.text
+    assert "# TYPE http_request_duration_seconds histogram" in response.text
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,147 @@
+"""
+Tests for the compiled, versioned ML config and its hot reload.
+"""
+import copy
+import json
+import os
+import pickle
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.config import get_settings
+from app.ml.meal_planner import MealPlanner
+from app.ml.scoring import ProductScorer
+from app.routers import admin
+from app.utils.ml_config import (
+    DEFAULT_CONFIG_PATH,
+    DEFAULTS,
+    PRODUCT_TYPES,
+    CompiledMLConfig,
+    MLConfigError,
+    MLConfigStore,
+    load_ml_config,
+)
+
+
+@pytest.fixture
+def config_file(tmp_path):
+    path = tmp_path / "ml_config.json"
+    path.write_text(json.dumps(DEFAULTS), encoding="utf-8")
+    return path
+
+
+def write_config(path, document):
+    path.write_text(json.dumps(document), encoding="utf-8")
+    # Make sure the watcher sees a new mtime even on coarse-grained filesystems
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+
+def test_bundled_config_compiles_to_lookup_arrays():
+    config = load_ml_config(DEFAULT_CONFIG_PATH)
+
+    assert config.version == CompiledMLConfig(json.loads(DEFAULT_CONFIG_PATH.read_text())).version
+    mass = config.goal_type_weights[config.goal_index("mass")]
+    assert mass[PRODUCT_TYPES.index("protein")] == 0.4
+    assert mass[PRODUCT_TYPES.index("amino")] == 0.1  # not in GOAL_WEIGHTS.mass: default
+    maintain = config.goal_type_weights[config.goal_index("maintain")]
+    assert maintain[PRODUCT_TYPES.index("other")] == 0.2  # "other" reads the "general" weight
+    assert config.goal_index("unknown") == config.goal_index("maintain")
+    assert config.meal_distribution_matrix.sum(axis=1) == pytest.approx(1.0)
+
+    with pytest.raises(ValueError):
+        config.goal_type_weights[0, 0] = 1.0
+    with pytest.raises(TypeError):
+        config.goal_weights["mass"]["protein"] = 1.0
+    with pytest.raises(AttributeError):
+        config.version = "other"
+
+
+def test_validation_reports_every_problem():
+    document = copy.deepcopy(DEFAULTS)
+    document["MEAL_DISTRIBUTION"]["cut"]["lunch"] = 0.9
+    document["SERBIAN_MEAL_TIMES"]["lunch"] = "noon"
+    document["ACTIVITY_MULTIPLIERS"]["high"] = "1.2"
+    del document["PROTEIN_REQUIREMENTS"]["maintain"]
+    document["GOAL_WIEGHTS"] = {}
+
+    with pytest.raises(MLConfigError) as error:
+        CompiledMLConfig(document)
+
+    messages = " | ".join(error.value.errors)
+    assert "MEAL_DISTRIBUTION.cut must sum to 1" in messages
+    assert "SERBIAN_MEAL_TIMES.lunch" in messages
+    assert "ACTIVITY_MULTIPLIERS.high" in messages
+    assert "PROTEIN_REQUIREMENTS must define the fallback goal" in messages
+    assert "GOAL_WIEGHTS" in messages
+
+
+def test_reload_swaps_version_and_rejects_invalid_file(config_file):
+    store = MLConfigStore(config_file)
+    original = store.current()
+
+    document = copy.deepcopy(DEFAULTS)
+    document["PROTEIN_REQUIREMENTS"]["mass"] = 2.0
+    write_config(config_file, document)
+    assert store.check_for_changes()
+    reloaded = store.current()
+    assert reloaded.version != original.version
+    assert reloaded.protein_requirements["mass"] == 2.0
+    # A request holding the old version still sees the old values
+    assert original.protein_requirements["mass"] == 2.2
+
+    document["MEAL_DISTRIBUTION"]["mass"]["snacks"] = 0.5
+    write_config(config_file, document)
+    assert not store.check_for_changes()
+    assert store.current() is reloaded
+    assert store.failed_reloads == 1
+    with pytest.raises(MLConfigError):
+        store.reload()
+
+
+def test_config_is_used_per_call_and_survives_pickling():
+    document = copy.deepcopy(DEFAULTS)
+    document["MEAL_DISTRIBUTION"]["mass"] = {"breakfast": 0.4, "lunch": 0.3, "dinner": 0.2, "snacks": 0.1}
+    document["PROTEIN_REQUIREMENTS"]["cut"] = 3.0
+    config = pickle.loads(pickle.dumps(CompiledMLConfig(document)))
+
+    distribution = MealPlanner.calculate_meal_distribution(1000, "mass", "moderate", config)
+    assert distribution["breakfast"] == pytest.approx(400)
+    needs = ProductScorer._calculate_nutritional_needs({"goal": "cut"}, 80, 180, 30, "male", config)
+    assert needs["protein"] == pytest.approx(240)
+
+
+def test_meal_distribution_is_not_mutated_by_activity_shift():
+    first = MealPlanner.calculate_meal_distribution(2800, "mass", "high")
+    second = MealPlanner.calculate_meal_distribution(2800, "mass", "high")
+
+    assert first == second
+    assert sum(first.values()) == pytest.approx(2800)
+    assert first["lunch"] > MealPlanner.calculate_meal_distribution(2800, "mass", "moderate")["lunch"]
+
+
+def test_admin_reload_endpoint(monkeypatch, config_file):
+    monkeypatch.setattr(get_settings(), "admin_token", "secret")
+    store = MLConfigStore(config_file)
+    monkeypatch.setattr(admin, "get_ml_config_store", lambda: store)
+    app = FastAPI()
+    app.include_router(admin.router)
+    client = TestClient(app)
+    headers = {"X-Admin-Token": "secret"}
+
+    assert client.post("/admin/ml-config/reload").status_code == 403
+    assert client.post("/admin/ml-config/reload", headers=headers).json()["data"]["changed"] is False
+
+    write_config(config_file, {"ACTIVITY_MULTIPLIERS": {"low": 0.9, "moderate": 1.0}})
+    data = client.post("/admin/ml-config/reload", headers=headers).json()["data"]
+    assert data["changed"] is True
+    assert client.get("/admin/ml-config", headers=headers).json()["data"]["version"] == data["version"]
+
+    write_config(config_file, {"ACTIVITY_MULTIPLIERS": {"low": -1}})
+    response = client.post("/admin/ml-config/reload", headers=headers)
+    assert response.status_code == 422
+    assert store.current().version == data["version"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -2,8 +2,9 @@
 Unit tests for ML modules: ProductScorer and MealPlanner.
 """
 import pytest
-from app.ml.scoring import ProductScorer
+from app.ml.scoring import PRODUCT_TYPES, ProductScorer
 from app.ml.meal_planner import MealPlanner
+from app.utils.ml_config import current_ml_config
 
 
 class TestProductScorer:
@@ -153,6 +154,21 @@ class TestProductScorer:
         # Low score should have lower confidence
         assert confidence_low < confidence_high
 
+    def test_type_scores_from_goal_type_matrix(self, scorer):
+        """Matrix lookups match the per-type GOAL_WEIGHTS mapping, unknown types included."""
+        config = current_ml_config()
+        type_names = PRODUCT_TYPES + ["joint_support"]
+        for goal in ["mass", "cut", "maintain", "endurance", "unknown"]:
+            goal_weights = config.goal_weights.get(goal, config.goal_weights["maintain"])
+            expected = [
+                (goal_weights.get("general", 0.05) if t == "other" else goal_weights.get(t, 0.1)) * 20
+                if t in PRODUCT_TYPES else 0.05 * 20
+                for t in type_names
+            ]
+            table = scorer.type_score_table(goal, len(type_names), config)
+            assert table.tolist() == expected
+            assert [scorer._score_by_type(t, goal, config) for t in type_names] == expected
+
 
 class TestMealPlanner:
     """Tests for MealPlanner class."""
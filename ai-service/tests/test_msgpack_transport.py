@@ -0,0 +1,93 @@
+"""
+Tests for MessagePack content negotiation: backend client, AI service routes, capture.
+"""
+import gzip
+import json
+import os
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.routers import recommendations
+from app.utils.capture import CaptureMiddleware, RequestCapture, RotatingCaptureFile
+from app.utils.http_client import AsyncHTTPClient, decode_response
+from app.utils.msgpack_codec import ACCEPT_MSGPACK, MSGPACK_MEDIA_TYPE, packb, unpackb, wants_msgpack
+from loadtest.fake_backend import create_fake_backend
+
+REQUEST = {
+    "user_id": "user-42", "goal": "mass", "activity_level": "high",
+    "age": 28, "gender": "male", "weight": 80, "height": 180, "max_products": 5,
+}
+
+
+def backend_client(accept_msgpack):
+    client = AsyncHTTPClient(max_retries=1, accept_msgpack=accept_msgpack)
+    backend = create_fake_backend(products=40, meals=20, latency_ms=0, jitter_ms=0)
+    client._client = httpx.AsyncClient(transport=httpx.ASGITransport(app=backend))
+    return client
+
+
+def test_accept_negotiation():
+    assert wants_msgpack(ACCEPT_MSGPACK)
+    assert wants_msgpack("application/x-msgpack")
+    assert not wants_msgpack(None)
+    assert not wants_msgpack("application/json")
+    assert not wants_msgpack("application/json, application/msgpack")
+    assert not wants_msgpack("application/msgpack;q=0.5, */*")
+    assert wants_msgpack("application/json;q=0.2, application/msgpack;q=0.8")
+
+
+async def test_client_decodes_either_format():
+    bodies = {}
+    for accept_msgpack in (True, False):
+        client = backend_client(accept_msgpack)
+        response = await client.get("http://backend/api/v1/recommendations", headers={"X-User-ID": "u1"})
+        await client.close()
+        bodies[accept_msgpack] = response
+    assert bodies[True].headers["content-type"] == MSGPACK_MEDIA_TYPE
+    assert bodies[False].headers["content-type"] == "application/json"
+    assert len(bodies[True].content) < len(bodies[False].content)
+    assert decode_response(bodies[True]) == decode_response(bodies[False]) == bodies[False].json()
+    assert len(decode_response(bodies[True])["data"]) == 40
+
+
+def test_recommendations_route_end_to_end(tmp_path, monkeypatch):
+    monkeypatch.setattr(recommendations.recommendation_service, "client", backend_client(True))
+    capture = RequestCapture(RotatingCaptureFile(str(tmp_path)), sample_rate=1.0, hash_key=b"secret")
+    app = FastAPI()
+    app.include_router(recommendations.router)
+    app.add_middleware(CaptureMiddleware, capture=capture)
+    client = TestClient(app)
+
+    response = client.post(
+        "/recommendations/ai",
+        content=packb(REQUEST),
+        headers={"Content-Type": MSGPACK_MEDIA_TYPE, "Accept": ACCEPT_MSGPACK},
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"] == MSGPACK_MEDIA_TYPE
+    assert response.headers["vary"] == "Accept"
+    from_msgpack = unpackb(response.content)
+
+    # A JSON client gets the same values
+    from_json = client.post("/recommendations/ai", json=REQUEST).json()
+    assert from_msgpack["recommendations"] == from_json["recommendations"]
+    assert len(from_msgpack["recommendations"]) == 5
+    assert isinstance(from_msgpack["generated_at"], str)
+
+    # Capture records stay JSON, with the msgpack bodies decoded
+    capture.flush()
+    records = []
+    for name in os.listdir(tmp_path):
+        with gzip.open(os.path.join(tmp_path, name), "rt", encoding="utf-8") as f:
+            records.extend(json.loads(line) for line in f)
+    assert len(records) == 2
+    assert records[0]["request"]["goal"] == "mass"
+    assert records[0]["response"]["recommendations"] == from_msgpack["recommendations"]
+
+    malformed = client.post("/recommendations/ai", content=b"\xc1", headers={"Content-Type": MSGPACK_MEDIA_TYPE})
+    assert malformed.status_code == 400
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,115 @@
+"""
+Tests for the product price index and the price-value score.
+"""
+from datetime import datetime, timedelta
+import numpy as np
+import pytest
+from app.ml.pricing import PriceIndex, offer_from_row, parse_serving_grams
+from app.ml.scoring import PRICE_COLUMN, ProductScorer
+from app.services.price_service import PriceIndexRefresher
+from app.utils.ml_config import current_ml_config
+
+T0 = datetime(2026, 1, 1, 12, 0)
+
+
+def row(product_id, store_id, price, minutes=0, **extra):
+    values = {
+        "product_id": product_id,
+        "store_id": store_id,
+        "price": price,
+        "discount_price": None,
+        "in_stock": True,
+        "store_active": True,
+        "servings": 50,
+        "weight_grams": None,
+        "serving_size": "30g",
+        "changed_at": T0 + timedelta(minutes=minutes),
+    }
+    values.update(extra)
+    return values
+
+
+def test_offer_servings_and_discounts():
+    assert parse_serving_grams("1 scoop (30 g)") == 30.0
+    assert parse_serving_grams("500mg") is None
+
+    offer = offer_from_row(row("p1", "s1", 5000, discount_price=4000))
+    assert offer.price_per_serving == 80.0
+    # No servings on the package: weight / serving size
+    offer = offer_from_row(row("p1", "s1", 3000, servings=None, weight_grams=900, serving_size="30 g"))
+    assert offer.servings == 30.0
+    assert offer_from_row(row("p1", "s1", 3000, servings=None, weight_grams=900, serving_size="1 scoop")) is None
+    assert offer_from_row(row("p1", "s1", 3000, in_stock=False)) is None
+    assert offer_from_row(row("p1", "s1", 3000, store_active=False)) is None
+
+
+def test_incremental_updates_track_cheapest_offer():
+    index = PriceIndex()
+    assert index.apply([row("p1", "s1", 5000), row("p1", "s2", 4000), row("p2", "s1", 2000)], replace=True) == 2
+    assert index.price_per_serving("p1") == 80.0
+    assert index.watermark == T0
+
+    # The cheapest store runs out: the next one takes over
+    assert index.apply([row("p1", "s2", 4000, minutes=5, in_stock=False)]) == 1
+    assert index.price_per_serving("p1") == 100.0
+    assert index.watermark == T0 + timedelta(minutes=5)
+    # Re-applying an unchanged row changes nothing
+    assert index.apply([row("p2", "s1", 2000, minutes=5)]) == 0
+
+    index.apply([row("p2", "s1", 2000, minutes=6, in_stock=False)])
+    assert index.price_per_serving("p2") is None
+    assert set(index.offers("p1")) == {"s1"}
+
+    lookup = index.lookup(["p1", "p2", "missing"])
+    assert lookup[0] == 100.0
+    assert np.isnan(lookup[1:]).all()
+
+    # A full reload drops products that are gone from the table
+    index.apply([row("p3", "s1", 1000, minutes=10)], replace=True)
+    assert len(index) == 1 and index.price_per_serving("p1") is None
+
+
+def test_refresher_reloads_fully_then_incrementally():
+    class Loader:
+        def __init__(self):
+            self.calls = []
+
+        def load(self, since=None):
+            self.calls.append(since)
+            return [row("p1", "s1", 5000)] if since is None else []
+
+    loader = Loader()
+    refresher = PriceIndexRefresher(PriceIndex(), loader, interval=60, full_interval=3600)
+    assert refresher.refresh() and refresher.refresh()
+    assert loader.calls == [None, T0]
+
+
+def test_price_value_score_batch_matches_scalar():
+    config = current_ml_config()
+    reference = config.price_reference_cost
+    protein = {"type": "protein", "macros": {"protein": 25, "calories": 120, "carbs": 3, "fats": 2}}
+    products = [
+        {**protein, "id": "cheap", "price_per_serving": reference * 25 * 0.8},
+        {**protein, "id": "mid", "price_per_serving": reference * 25 * 1.5},
+        {**protein, "id": "dear", "price_per_serving": reference * 25 * 3},
+        {**protein, "id": "unpriced"},
+        {"id": "creatine", "type": "creatine", "macros": {}, "price_per_serving": 20.0},
+    ]
+    profile = {"goal": "mass", "activity_level": "moderate", "age": 30, "gender": "male", "weight": 80}
+
+    features, type_names = ProductScorer.product_features(products, [50.0] * len(products))
+    assert np.isnan(features[3, PRICE_COLUMN])
+    batch = ProductScorer.calculate_scores_batch(features, type_names, profile, config=config)
+    scalar = [ProductScorer.calculate_score(p, profile, 50.0, config=config) for p in products]
+    assert batch.tolist() == scalar
+
+    unpriced = batch[3]
+    assert batch[0] == pytest.approx(unpriced + config.price_value_points)
+    assert batch[1] == pytest.approx(unpriced + config.price_value_points / 2)
+    assert batch[2] == unpriced
+    # No protein, no cost per gram of protein
+    assert ProductScorer._score_by_price_value(products[4], config) == 0.0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,108 @@
+"""
+Tests for the sampling profiler and the admin-only /debug/profile endpoint.
+"""
+import threading
+import time
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.config import get_settings
+from app.routers.debug import router as debug_router
+from app.utils.profiler import ProfilerBusyError, SamplingProfiler, TRUNCATED
+
+
+def busy_loop_for_profiler(stop: threading.Event) -> None:
+    while not stop.is_set():
+        sum(range(1000))
+
+
+@pytest.fixture
+def busy_thread():
+    stop = threading.Event()
+    thread = threading.Thread(target=busy_loop_for_profiler, args=(stop,), name="busy-worker")
+    thread.start()
+    yield thread
+    stop.set()
+    thread.join()
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(get_settings(), "admin_token", "secret")
+    app = FastAPI()
+    app.include_router(debug_router)
+    return TestClient(app)
+
+
+def test_samples_other_threads(busy_thread):
+    result = SamplingProfiler(interval=0.002).profile(0.2)
+
+    busy = [stack for stack in result.stacks if stack[0] == "busy-worker"]
+    assert busy
+    assert any("busy_loop_for_profiler" in frame for stack in busy for frame in stack)
+    assert result.samples == sum(result.stacks.values())
+    assert 0 <= result.overhead < 1
+
+
+def test_collapsed_and_speedscope_output(busy_thread):
+    result = SamplingProfiler(interval=0.002).profile(0.1)
+
+    line = result.collapsed().splitlines()[0]
+    stack, count = line.rsplit(" ", 1)
+    assert int(count) > 0 and ";" in stack
+
+    speedscope = result.speedscope()
+    frames = speedscope["shared"]["frames"]
+    profile = next(p for p in speedscope["profiles"] if p["name"] == "busy-worker")
+    assert profile["type"] == "sampled"
+    assert len(profile["samples"]) == len(profile["weights"])
+    assert all(0 <= i < len(frames) for sample in profile["samples"] for i in sample)
+
+
+def test_overhead_bounds(busy_thread):
+    profiler = SamplingProfiler(interval=0.0, max_seconds=0.05, max_depth=3, max_stacks=1)
+
+    started = time.perf_counter()
+    result = profiler.profile(10)
+
+    assert time.perf_counter() - started < 1
+    assert profiler.interval >= 0.001
+    assert all(len(stack) <= 4 for stack in result.stacks)
+    assert result.truncated == 0 or any(stack[-1] == TRUNCATED for stack in result.stacks)
+
+
+def test_one_profile_at_a_time():
+    profiler = SamplingProfiler()
+    profiler._running.acquire()
+    try:
+        with pytest.raises(ProfilerBusyError):
+            profiler.profile(0.01)
+    finally:
+        profiler._running.release()
+
+
+def test_endpoint_requires_admin_token(client):
+    assert client.get("/debug/profile", params={"seconds": 0.05}).status_code == 403
+    response = client.get(
+        "/debug/profile", params={"seconds": 0.05}, headers={"X-Admin-Token": "wrong"}
+    )
+    assert response.status_code == 403
+
+
+def test_endpoint_returns_profile(client):
+    headers = {"X-Admin-Token": "secret"}
+
+    collapsed = client.get("/debug/profile", params={"seconds": 0.05}, headers=headers)
+    speedscope = client.get(
+        "/debug/profile", params={"seconds": 0.05, "format": "speedscope"}, headers=headers
+    )
+    too_long = client.get("/debug/profile", params={"seconds": 3600}, headers=headers)
+
+    assert collapsed.status_code == 200
+    assert collapsed.headers["content-type"].startswith("text/plain")
+    assert speedscope.json()["profiles"]
+    assert too_long.status_code == 422
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
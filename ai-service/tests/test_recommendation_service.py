@@ -4,6 +4,7 @@ Tests retry logic, fallback behavior, and ML scoring.
 """
 import pytest
 import json
+import httpx
 from unittest.mock import AsyncMock, MagicMock, patch
 from app.services.recommendation_service import RecommendationService
 from app.models.recommendation import ProductRecommendationRequest
@@ -87,13 +88,9 @@ async def test_get_ai_recommendations_success(
     mock_client = AsyncMock()
     
     # Mock responses
-    mock_rec_response = MagicMock()
-    mock_rec_response.status_code = 200
-    mock_rec_response.json.return_value = sample_backend_response
+    mock_rec_response = httpx.Response(200, json=sample_backend_response)
     
-    mock_nutrition_response = MagicMock()
-    mock_nutrition_response.status_code = 200
-    mock_nutrition_response.json.return_value = sample_nutrition_response
+    mock_nutrition_response = httpx.Response(200, json=sample_nutrition_response)
     
     mock_client.get.side_effect = [mock_rec_response, mock_nutrition_response]
     
@@ -126,9 +123,7 @@ async def test_get_ai_recommendations_no_nutrition_data(
     mock_client = AsyncMock()
     
     # First call succeeds, second fails
-    mock_rec_response = MagicMock()
-    mock_rec_response.status_code = 200
-    mock_rec_response.json.return_value = sample_backend_response
+    mock_rec_response = httpx.Response(200, json=sample_backend_response)
     
     mock_nutrition_response = MagicMock()
     mock_nutrition_response.status_code = 500
@@ -146,6 +141,71 @@ async def test_get_ai_recommendations_no_nutrition_data(
     assert len(response.recommendations) > 0
 
 
+@pytest.mark.asyncio
+async def test_get_ai_recommendations_screens_contraindications(
+    recommendation_service, sample_request, sample_backend_response
+):
+    """Contraindicated and excluded products are never scored or returned."""
+    sample_backend_response["data"][0]["contraindications"] = [
+        {"id": "c-1", "name": "kidney_disease", "severity": "high"}
+    ]
+    sample_backend_response["data"].append({
+        "product": {"id": "prod-3", "name": "Pre Workout", "type": "pre_workout"},
+        "score": 60,
+        "reasons": [],
+        "warnings": [],
+    })
+    request = sample_request.model_copy(
+        update={"diseases": ["kidney_disease"], "exclude_product_ids": ["prod-3"]}
+    )
+    mock_client = AsyncMock()
+    mock_rec_response = httpx.Response(200, json=sample_backend_response)
+    mock_nutrition_response = MagicMock()
+    mock_nutrition_response.status_code = 500
+    mock_client.get.side_effect = [mock_rec_response, mock_nutrition_response]
+    recommendation_service.client = mock_client
+
+    with patch.object(
+        recommendation_service, "_score_products", wraps=recommendation_service._score_products
+    ) as score_products:
+        response = await recommendation_service.get_ai_recommendations(request)
+
+    assert [r.product_id for r in response.recommendations] == ["prod-2"]
+    scored = score_products.call_args[0][0]
+    assert [rec["product"]["id"] for rec in scored] == ["prod-2"]
+
+
+@pytest.mark.asyncio
+async def test_medium_disease_match_is_penalized_once(
+    recommendation_service, sample_request, sample_backend_response
+):
+    """The backend's score already carries the -30 for a disease match; no second deduction."""
+    creatine = sample_backend_response["data"][1]
+    creatine["contraindications"] = [{"id": "c-2", "name": "hypertension", "severity": "medium"}]
+    creatine["warnings"] = ["Medium severity contraindication: hypertension"]
+    creatine["score"] = 65 - 30
+
+    async def final_scores(**update):
+        rec_response = httpx.Response(200, json=sample_backend_response)
+        client = AsyncMock()
+        client.get.side_effect = [rec_response, MagicMock(status_code=500)]
+        recommendation_service.client = client
+        response = await recommendation_service.get_ai_recommendations(sample_request.model_copy(update=update))
+        return {r.product_id: r for r in response.recommendations}
+
+    unmatched = await final_scores()
+    disease = await final_scores(diseases=["Hypertension"])
+    medication = await final_scores(medications=["hypertension"])
+
+    base = recommendation_service.scorer.calculate_score(
+        creatine["product"], recommendation_service._build_user_profile(sample_request), 35, None
+    )
+    assert disease["prod-2"].score == unmatched["prod-2"].score == round(base, 2)
+    assert disease["prod-2"].warnings.count("Medium severity contraindication: hypertension") == 1
+    # Medications are not scored by the backend: the AI side deducts them
+    assert medication["prod-2"].score == round(max(0.0, base - 30), 2)
+
+
 @pytest.mark.asyncio
 async def test_get_ai_recommendations_empty_backend_response(
     recommendation_service, sample_request
@@ -155,9 +215,7 @@ async def test_get_ai_recommendations_empty_backend_response(
     mock_client = AsyncMock()
     
     # Empty recommendations
-    mock_rec_response = MagicMock()
-    mock_rec_response.status_code = 200
-    mock_rec_response.json.return_value = {"success": True, "data": []}
+    mock_rec_response = httpx.Response(200, json={"success": True, "data": []})
     
     mock_client.get.return_value = mock_rec_response
     
@@ -0,0 +1,132 @@
+"""
+Tests for the offline replay harness.
+"""
+import gzip
+import json
+import numpy as np
+import pytest
+from benchmarks.synthetic import make_meals, make_products
+from app.ml.meal_planner import MealPlanner
+from app.ml.replay import iter_raw_records, ranking_metrics, replay_batch
+from app.ml.scoring import ProductScorer
+from app.utils.ml_config import current_ml_config
+
+PROFILES = [
+    {"goal": "mass", "activity_level": "high", "age": 25, "gender": "male", "weight": 85, "height": 182},
+    {"goal": "cut", "activity_level": "low", "age": 52, "gender": "female", "weight": 70, "height": 165},
+    {"goal": "endurance", "activity_level": "very_high", "age": 31, "gender": "male", "weight": 68, "height": 175},
+]
+
+
+def recommendation_line(profile, products, **extra):
+    record = {
+        "v": 1,
+        "kind": "recommendations",
+        "profile": profile,
+        "needs": None,
+        "candidates": products,
+        "base_scores": [40 + i for i in range(len(products))],
+    }
+    record.update(extra)
+    return json.dumps(record)
+
+
+def meal_plan_line(meals, goal="cut"):
+    return json.dumps({
+        "v": 1,
+        "kind": "meal_plan",
+        "goal": goal,
+        "activity_level": "high",
+        "target_calories": 2400,
+        "target_protein": 160,
+        "slots": ["breakfast", "lunch", "dinner", "snacks"],
+        "candidates": meals,
+    })
+
+
+def test_ranking_metrics():
+    a = np.array([[1.0, 2.0, 3.0, 4.0], [1.0, 2.0, 3.0, 4.0], [1.0, 2.0, 2.0, 3.0]])
+    b = np.array([[1.0, 2.0, 3.0, 4.0], [4.0, 3.0, 2.0, 1.0], [1.0, 2.0, 3.0, 4.0]])
+    metrics = ranking_metrics(a, b, k=2)
+
+    assert metrics["spearman"][:2] == pytest.approx([1.0, -1.0])
+    assert metrics["kendall"][:2] == pytest.approx([1.0, -1.0])
+    # Ties: average ranks [1, 2.5, 2.5, 4]; tau-b = 5 / sqrt(5 * 6)
+    assert metrics["spearman"][2] == pytest.approx(np.corrcoef([1, 2.5, 2.5, 4], [1, 2, 3, 4])[0, 1])
+    assert metrics["kendall"][2] == pytest.approx(5 / np.sqrt(30))
+    assert metrics["churn"].tolist() == [0.0, 1.0, 0.5]
+    assert metrics["top1_changed"].tolist() == [False, True, False]
+
+    constant = ranking_metrics(np.ones((1, 3)), np.array([[1.0, 2.0, 3.0]]), k=2)
+    assert np.isnan(constant["spearman"][0]) and np.isnan(constant["kendall"][0])
+
+
+def test_grouped_scores_match_per_user_batches():
+    config = current_ml_config()
+    products = make_products(60)
+    features, type_names = ProductScorer.product_features(products, [50.0] * len(products))
+    groups = np.arange(len(products)) % len(PROFILES)
+
+    grouped = ProductScorer.calculate_scores_grouped(
+        features, type_names, groups, PROFILES, [None] * len(PROFILES), config
+    )
+    for user, profile in enumerate(PROFILES):
+        rows = groups == user
+        expected = ProductScorer.calculate_scores_batch(features[rows], type_names, profile, None, config)
+        assert grouped[rows].tolist() == expected.tolist()
+
+
+def test_meal_scores_broadcast_over_candidate_sets():
+    features = np.array([MealPlanner.meal_features(make_meals(20, seed)) for seed in (1, 2)])
+    calories = np.array([[500.0, 800.0], [650.0, 700.0]])
+    protein = np.array([[30.0, 50.0], [40.0, 45.0]])
+
+    batched = MealPlanner.score_meals_batch(features, calories, protein, "mass")
+    for i in range(2):
+        expected = MealPlanner.score_meals_batch(features[i], calories[i], protein[i], "mass")
+        assert batched[i].tolist() == expected.tolist()
+
+
+def test_replay_batch_same_config_is_identical():
+    config = current_ml_config()
+    products = make_products(25)
+    lines = [recommendation_line(profile, products) for profile in PROFILES]
+    lines += [meal_plan_line(make_meals(15)), "", '{"kind": "recommendations"}', "not json"]
+    lines += [b"[1,2]", "5", '"x"']
+
+    stats = replay_batch(lines, config, config, k=5)
+    summary = stats.summary()
+    assert summary["records"] == 4
+    assert summary["by_kind"] == {"recommendations": 3, "meal_plan": 1}
+    # Unparseable and non-object lines and the record without candidates; blank lines aren't records
+    assert summary["skipped"] == 5
+    assert summary["rankings"] == 3 + 4
+    assert summary["spearman"]["mean"] == 1.0
+    assert summary["top_k_churn"]["mean"] == 0.0
+    assert summary["top1_changed_rate"] == 0.0
+
+
+def test_replay_served_baseline(tmp_path):
+    config = current_ml_config()
+    products = make_products(20)
+    features, type_names = ProductScorer.product_features(products, [40 + i for i in range(len(products))])
+    served = ProductScorer.calculate_scores_batch(features, type_names, PROFILES[0], None, config)
+    reversed_scores = (100 - served).tolist()
+
+    path = tmp_path / "capture.jsonl.gz"
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        f.write(recommendation_line(PROFILES[0], products, served_scores=served.tolist()) + "\n")
+        f.write(recommendation_line(PROFILES[0], products, served_scores=reversed_scores) + "\n")
+        f.write(recommendation_line(PROFILES[0], products) + "\n")
+        f.write(meal_plan_line(make_meals(10)) + "\n")
+
+    stats = replay_batch(iter_raw_records([str(path)]), config, config, baseline="served", k=5)
+    # Without served scores neither record can be compared
+    assert stats.records == 2 and stats.skipped == 2
+    assert stats.spearman[0] == pytest.approx(1.0)
+    assert stats.spearman[1] < 0
+    assert stats.churn[0] == 0.0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,86 @@
+"""
+Tests for the contraindication screening index.
+"""
+import numpy as np
+import pytest
+from app.ml.screening import ScreeningIndex, screen_recommendations
+
+KIDNEY = {"id": "c-kidney", "name": "kidney_disease", "severity": "high"}
+PREGNANCY = {"id": "c-preg", "name": "pregnancy", "severity": "medium"}
+CAFFEINE = {"id": "c-caf", "name": "caffeine_sensitivity", "severity": "low"}
+WARFARIN = {"id": "c-warf", "name": "warfarin", "severity": "medium"}
+
+
+@pytest.fixture
+def index():
+    # 11 products so the bitmap spans two bytes
+    contraindications = [[] for _ in range(11)]
+    contraindications[0] = [KIDNEY]
+    contraindications[1] = [PREGNANCY, CAFFEINE]
+    contraindications[2] = [CAFFEINE]
+    contraindications[9] = [WARFARIN, KIDNEY]
+    contraindications[10] = [{"name": "lactose"}]  # no id, no severity
+    return ScreeningIndex.build([f"p{i}" for i in range(11)], contraindications)
+
+
+def test_bitmap_layout(index):
+    assert index.bitmap.shape == (5, 2)
+    assert index.condition_names == ["kidney_disease", "pregnancy", "caffeine_sensitivity", "warfarin", "lactose"]
+    kidney = np.unpackbits(index.bitmap[0], count=11).astype(bool)
+    assert np.flatnonzero(kidney).tolist() == [0, 9]
+
+
+def test_screen_excludes_high_and_penalizes_worst_severity(index):
+    result = index.screen(
+        medications=["Kidney", "pregnancy", "caffeine", "warfarin"],
+        exclude_product_ids=["p5", "unknown"],
+    )
+
+    assert np.flatnonzero(~result.keep).tolist() == [0, 5, 9]
+    assert result.penalty[1] == 30.0  # medium and low both match: the worst counts
+    assert result.penalty[2] == 10.0
+    assert result.penalty[0] == result.penalty[9] == 0.0  # excluded, not penalized
+    assert result.excluded == 3
+
+
+def test_disease_matches_are_not_penalized_twice(index):
+    # The backend already took 30 points off for the pregnancy match; only caffeine costs here
+    result = index.screen(diseases=["Kidney", "pregnancy"], medications=["caffeine"])
+
+    assert np.flatnonzero(~result.keep).tolist() == [0, 9]
+    assert result.penalty[1] == result.penalty[2] == 10.0
+    assert not index.screen(diseases=["pregnancy"], medications=["pregnancy"]).penalty.any()
+
+
+def test_screen_without_matches_keeps_everything(index):
+    result = index.screen(diseases=["asthma"], allergies=[""])
+
+    assert result.keep.all()
+    assert not result.penalty.any()
+    assert index.screen(allergies=["LACTOSE intolerance"]).penalty[10] == 30.0
+
+
+def test_screen_recommendations_drops_unsafe_and_adds_warnings():
+    recommendations = [
+        {"product": {"id": "a"}, "score": 70, "warnings": [], "contraindications": [KIDNEY]},
+        {"product": {"id": "b"}, "score": 60, "warnings": ["Low severity contraindication: caffeine_sensitivity"],
+         "contraindications": [CAFFEINE, PREGNANCY]},
+        {"product": {"id": "c"}, "score": 50, "warnings": []},
+    ]
+
+    kept, penalties = screen_recommendations(
+        recommendations, diseases=["kidney_disease", "pregnancy"], medications=["caffeine"]
+    )
+
+    assert [rec["product"]["id"] for rec in kept] == ["b", "c"]
+    # pregnancy is a disease match (deducted by the backend): only the caffeine match counts
+    assert penalties.tolist() == [10.0, 0.0]
+    assert kept[0]["warnings"] == [
+        "Low severity contraindication: caffeine_sensitivity",
+        "Medium severity contraindication: pregnancy",
+    ]
+    assert recommendations[1]["warnings"] == ["Low severity contraindication: caffeine_sensitivity"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,166 @@
+"""
+Tests for the shared-memory catalog segment.
+"""
+import os
+import subprocess
+import sys
+import threading
+import time
+import uuid
+import numpy as np
+import pytest
+from app.ml.scoring import ProductScorer
+from app.services.catalog_service import CatalogRefresher, build_catalog
+from app.utils.shared_catalog import SharedCatalogPublisher, SharedCatalogReader
+
+SERVICE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PRODUCTS = [
+    {"id": "p1", "type": "protein", "macros": {"protein": 25, "calories": 120}, "brand": {"verified": True}},
+    {"id": "p2", "type": "creatine", "macros": {}},
+    {"id": "p3", "type": "joint_support", "macros": {"protein": 2, "calories": 10}},
+]
+MEALS = [
+    {"id": "m1", "total_macros": {"calories": 650, "protein": 40}, "cuisine_type": "serbian"},
+    {"id": "m2", "total_macros": {"calories": 420, "protein": 22}, "cuisine_type": "italian"},
+]
+
+
+@pytest.fixture
+def publisher():
+    publisher = SharedCatalogPublisher(f"test_catalog_{uuid.uuid4().hex[:8]}")
+    yield publisher
+    publisher.close()
+
+
+def test_nothing_published_yet(publisher):
+    assert SharedCatalogReader(publisher.name).snapshot() is None
+    assert SharedCatalogReader("missing_catalog_segment").snapshot() is None
+
+
+def test_reader_maps_published_catalog_zero_copy(publisher):
+    catalog = build_catalog(PRODUCTS, MEALS)
+    publisher.publish(catalog)
+    reader = SharedCatalogReader(publisher.name)
+
+    snapshot = reader.snapshot()
+
+    np.testing.assert_array_equal(snapshot.products, catalog.product_features)
+    np.testing.assert_array_equal(snapshot.meals, catalog.meal_features)
+    assert snapshot.type_names[-1] == "joint_support"
+    assert not snapshot.products.flags.writeable
+    assert reader.snapshot() is snapshot
+    assert np.shares_memory(reader.snapshot().products, snapshot.products)
+
+
+def test_row_lookup(publisher):
+    publisher.publish(build_catalog(PRODUCTS, MEALS))
+    snapshot = SharedCatalogReader(publisher.name).snapshot()
+
+    assert snapshot.product_rows(["p3", "p1"]).tolist() == [2, 0]
+    assert snapshot.product_rows(["p1", "unknown"]) is None
+    assert snapshot.meal_rows(["m2"]).tolist() == [1]
+
+
+def test_catalog_rows_score_like_parsed_products(publisher):
+    publisher.publish(build_catalog(PRODUCTS, MEALS))
+    snapshot = SharedCatalogReader(publisher.name).snapshot()
+    profile = {"goal": "mass", "activity_level": "high", "age": 30, "gender": "male", "weight": 80, "height": 180}
+
+    features = snapshot.products[snapshot.product_rows(["p1", "p2", "p3"])]
+    features[:, 7] = [60, 40, 55]
+    from_catalog = ProductScorer.calculate_scores_batch(features, snapshot.type_names, profile)
+
+    parsed = [ProductScorer.calculate_score(p, profile, b) for p, b in zip(PRODUCTS, [60, 40, 55])]
+    assert from_catalog.tolist() == parsed
+
+
+def test_new_generation_replaces_old_segment(publisher):
+    reader = SharedCatalogReader(publisher.name)
+    first_generation = publisher.publish(build_catalog(PRODUCTS, MEALS))
+    old = reader.snapshot()
+
+    second_generation = publisher.publish(build_catalog(PRODUCTS[:1], []))
+    new = reader.snapshot()
+
+    assert second_generation == first_generation + 1
+    assert new.generation == second_generation
+    assert new.products.shape[0] == 1 and new.meals.shape[0] == 0
+    assert not os.path.exists(f"/dev/shm/{publisher.name}_{first_generation}")
+    # Views handed out before the swap stay valid
+    assert old.products.shape[0] == 3 and old.products[0, 2] == 25
+
+
+def test_restarted_publisher_continues_generations(publisher):
+    publisher.publish(build_catalog(PRODUCTS, MEALS))
+    restarted = SharedCatalogPublisher(publisher.name)
+
+    generation = restarted.publish(build_catalog(PRODUCTS, MEALS))
+
+    assert generation == 2
+    assert not os.path.exists(f"/dev/shm/{publisher.name}_1")
+    restarted.close()
+
+
+class StaticLoader:
+    def load(self):
+        return build_catalog(PRODUCTS, MEALS)
+
+
+def test_refresher_process_takes_over_published_catalog(publisher):
+    # Gunicorn master: first generation before forking, then hand the segments over
+    publisher.publish(build_catalog(PRODUCTS, MEALS))
+    publisher.close(unlink=False)
+
+    refresher = CatalogRefresher(SharedCatalogPublisher(publisher.name), StaticLoader(), interval=0.05)
+    serving = threading.Thread(target=refresher.serve)
+    serving.start()
+    reader = SharedCatalogReader(publisher.name)
+    deadline = time.monotonic() + 5
+    while reader.snapshot().generation < 3 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    refresher.stop()
+    serving.join(timeout=5)
+
+    assert not serving.is_alive()
+    assert not os.path.exists(f"/dev/shm/{publisher.name}_1")
+    generation = refresher.publisher.generation
+    assert generation >= 3
+    # Stopping unlinks the catalog, not leaving it behind for the next start
+    assert not os.path.exists(f"/dev/shm/{publisher.name}_{generation}")
+    assert not os.path.exists(f"/dev/shm/{publisher.name}")
+
+
+def test_refresher_stops_when_parent_exits(publisher):
+    publisher.publish(build_catalog(PRODUCTS, MEALS))
+    publisher.close(unlink=False)
+    refresher = CatalogRefresher(SharedCatalogPublisher(publisher.name), StaticLoader(), interval=0.05)
+
+    # A pid that is not our parent: as if the master had died and we were reparented
+    refresher.serve(parent_pid=-1)
+
+    assert refresher.publisher.generation == 1
+    # The generation it took over is unlinked even though it never published one
+    assert not os.path.exists(f"/dev/shm/{publisher.name}_1")
+    assert not os.path.exists(f"/dev/shm/{publisher.name}")
+
+
+def test_other_process_reads_same_generation(publisher):
+    publisher.publish(build_catalog(PRODUCTS, MEALS))
+    code = (
+        "from app.utils.shared_catalog import SharedCatalogReader; "
+        f"s = SharedCatalogReader({publisher.name!r}).snapshot(); "
+        "print(s.generation, s.products[:, 2].sum(), len(s.meal_ids))"
+    )
+
+    output = subprocess.run(
+        [sys.executable, "-c", code], cwd=SERVICE_ROOT, capture_output=True, text=True, check=True
+    ).stdout.split()
+
+    assert output == ["1", "27.0", "2"]
+    # The reader process exiting must not unlink the catalog
+    assert SharedCatalogReader(publisher.name).snapshot().generation == 1
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
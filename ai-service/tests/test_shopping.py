@@ -0,0 +1,169 @@
+"""
+Tests for the shopping list optimizer and endpoint.
+"""
+from itertools import combinations
+import numpy as np
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.ml.pricing import PriceIndex
+from app.ml.shopping import aggregate_plan, solve_store_selection
+from app.routers import meal_plan
+from app.services import price_service
+
+
+def price_row(product_id, store_id, price, servings=30, fee=0, minimum=0):
+    return {
+        "product_id": product_id,
+        "store_id": store_id,
+        "price": price,
+        "servings": servings,
+        "in_stock": True,
+        "store_name": store_id.upper(),
+        "delivery_fee": fee,
+        "min_order_amount": minimum,
+    }
+
+
+def brute_force(cost, fees, minimums):
+    best = np.inf
+    n_stores = cost.shape[1]
+    for k in range(1, n_stores + 1):
+        for subset in combinations(range(n_stores), k):
+            sub = cost[:, subset]
+            if not np.isfinite(sub.min(axis=1)).all():
+                continue
+            slot = sub.argmin(axis=1)
+            total = sub.min(axis=1).sum()
+            for j, col in enumerate(subset):
+                subtotal = sub[slot == j, j].sum()
+                if (slot == j).any():
+                    total += fees[col] + max(0.0, minimums[col] - subtotal)
+            best = min(best, total)
+    return best
+
+
+def test_aggregate_plan_scales_servings():
+    meal = {
+        "id": "m1",
+        "servings": 2,
+        "ingredients": [
+            {"ingredient_id": "i-chicken", "ingredient_name": "chicken", "quantity_grams": 300},
+            {"ingredient_id": "i-rice", "ingredient_name": "rice", "quantity_grams": 200},
+        ],
+    }
+    whey = {"product_id": "whey", "dosage_grams": 60, "product": {"serving_size": "30g"}}
+    plans = [
+        {"meals": [{"meal": meal, "servings": 1}], "supplements": [whey]},
+        {"meals": [{"meal": meal, "servings": 3}], "supplements": [whey, {"product_id": "vitamin-d"}]},
+    ]
+
+    ingredients, supplements = aggregate_plan(plans)
+    assert ingredients["i-chicken"]["grams"] == pytest.approx(600)
+    assert ingredients["i-rice"]["grams"] == pytest.approx(400)
+    assert supplements == {"whey": 4.0, "vitamin-d": 1.0}
+
+
+def test_solver_matches_brute_force():
+    rng = np.random.default_rng(7)
+    for _ in range(20):
+        cost = rng.uniform(500, 5000, size=(6, 6))
+        cost[rng.random(cost.shape) < 0.3] = np.inf
+        cost[np.arange(6), rng.integers(0, 6, size=6)] = rng.uniform(500, 5000, size=6)
+        fees = rng.choice([0.0, 250.0, 400.0], size=6)
+        minimums = rng.choice([0.0, 3000.0, 6000.0], size=6)
+
+        selection = solve_store_selection(cost, fees, minimums, max_stores=6, time_budget=5.0)
+        assert selection.complete and selection.method == "exact"
+        assert selection.total_cost == pytest.approx(brute_force(cost, fees, minimums))
+        assert np.isfinite(cost[np.arange(6), selection.assignment]).all()
+
+
+def test_solver_falls_back_to_greedy_without_budget():
+    cost = np.array([[1000.0, np.inf, 900.0], [np.inf, 800.0, 850.0]])
+    fees = np.array([300.0, 300.0, 300.0])
+
+    selection = solve_store_selection(cost, fees, np.zeros(3), max_stores=3, time_budget=0.0)
+    assert not selection.complete
+    # One store selling both beats two deliveries
+    assert selection.stores == [2]
+    assert selection.total_cost == pytest.approx(900 + 850 + 300)
+
+
+def test_solver_never_exceeds_max_stores():
+    # Every product sells in one store only; store 2 also charges delivery
+    cost = np.array([[100.0, np.inf, np.inf], [np.inf, 200.0, np.inf], [np.inf, np.inf, 300.0]])
+    fees = np.array([0.0, 0.0, 500.0])
+
+    for budget in (0.0, 5.0):
+        selection = solve_store_selection(cost, fees, np.zeros(3), max_stores=2, time_budget=budget)
+        assert selection.stores == [0, 1]
+        assert selection.covered.tolist() == [True, True, False]
+        assert selection.assignment.tolist() == [0, 1, -1]
+        assert selection.total_cost == pytest.approx(300.0)
+
+    rng = np.random.default_rng(11)
+    for _ in range(300):
+        cost = rng.uniform(500, 5000, size=(5, 6))
+        cost[rng.random(cost.shape) < 0.5] = np.inf
+        fees = rng.choice([0.0, 250.0, 400.0], size=6)
+        max_stores = int(rng.integers(1, 3))
+        selection = solve_store_selection(cost, fees, np.zeros(6), max_stores=max_stores, time_budget=5.0)
+        assert len(selection.stores) <= max_stores
+        assert set(selection.assignment[selection.covered].tolist()) == set(selection.stores)
+        assert np.isfinite(cost[selection.covered, selection.assignment[selection.covered]]).all()
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(meal_plan.router)
+    return TestClient(app)
+
+
+def test_shopping_list_endpoint(monkeypatch, client):
+    index = PriceIndex()
+    index.apply(
+        [
+            price_row("whey", "maxi", 6000, fee=300, minimum=5000),
+            price_row("whey", "sport", 5200, fee=400),
+            price_row("creatine", "sport", 2500, servings=100, fee=400),
+            price_row("creatine", "maxi", 2200, servings=100, fee=300, minimum=5000),
+        ],
+        replace=True,
+    )
+    monkeypatch.setattr(price_service, "_price_index", index)
+    day = {
+        "meals": [{"meal": {"ingredients": [{"ingredient_id": "i1", "ingredient_name": "oats", "quantity_grams": 80}]}}],
+        "supplements": [
+            {"product_id": "whey", "dosage_grams": 60, "product": {"serving_size": "30 g"}},
+            {"product_id": "creatine", "dosage_grams": 5, "product": {"serving_size": "5g"}},
+            {"product_id": "omega-3"},
+        ],
+    }
+
+    response = client.post("/meal-plan/shopping-list", json={"plans": [day] * 7})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["days"] == 7
+    assert data["ingredients"][0]["grams"] == 560.0
+    assert data["unavailable_product_ids"] == ["omega-3"]
+    # 14 servings of whey and 7 of creatine: one package each, both from "sport"
+    assert [store["store_id"] for store in data["stores"]] == ["sport"]
+    assert data["total_cost"] == 5200 + 2500 + 400
+    assert data["optimization"]["method"] == "exact"
+
+    excluded = client.post("/meal-plan/shopping-list", json={"plans": [day], "exclude_store_ids": ["sport"]}).json()
+    store = excluded["stores"][0]
+    assert store["store_id"] == "maxi" and store["min_order_top_up"] == 0
+    assert excluded["total_cost"] == 6000 + 2200 + 300
+
+
+def test_shopping_list_needs_price_index(monkeypatch, client):
+    monkeypatch.setattr(price_service, "_price_index", None)
+    response = client.post("/meal-plan/shopping-list", json={"plans": [{"meals": []}]})
+    assert response.status_code == 503
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,60 @@
+"""
+Cold-start tests: heavy dependencies must not be imported when the app boots.
+"""
+import gc
+import json
+import os
+import subprocess
+import sys
+import pytest
+from app.config import get_settings
+from app.utils.prefork import preload_shared_resources
+
+SERVICE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ["torch", "sentence_transformers", "chromadb", "onnxruntime", "openai"]
+
+
+def boot(features: str) -> dict:
+    code = (
+        "import json, sys, app.main; "
+        f"print(json.dumps({{'heavy': [m for m in {HEAVY_MODULES!r} if m in sys.modules], "
+        "'paths': sorted({r.path for r in app.main.app.routes})}))"
+    )
+    proc = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=SERVICE_ROOT,
+        capture_output=True,
+        text=True,
+        env={**os.environ, "ENABLED_FEATURES": features},
+        check=True,
+    )
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def test_full_app_defers_heavy_imports():
+    result = boot("recommendations,meal_plan,advice")
+
+    assert result["heavy"] == []
+    assert "/advice/personalized" in result["paths"]
+
+
+def test_role_without_advice_skips_rag_stack():
+    result = boot("recommendations,meal_plan")
+
+    assert result["heavy"] == []
+    assert "/recommendations/ai" in result["paths"]
+    assert not any(path.startswith("/advice") for path in result["paths"])
+    assert "/health/ready" in result["paths"]
+
+
+def test_prefork_preload_freezes_gc(monkeypatch):
+    monkeypatch.setattr(get_settings(), "enabled_features", "recommendations,meal_plan")
+    try:
+        assert preload_shared_resources() == {}
+        assert gc.get_freeze_count() > 0
+    finally:
+        gc.unfreeze()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])